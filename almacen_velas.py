@@ -0,0 +1,300 @@
+"""Almacén local de velas históricas por símbolo e intervalo
+
+Cada serie es un fichero binario de float64 con una fila por vela cerrada
+(timestamp, open, high, low, close, volume, turnover) que se abre con
+np.memmap, de modo que el bot y el backtester leen vistas sin copiar. Al
+arrancar solo se descargan las velas cerradas mientras el proceso estaba
+parado y los huecos internos, con get_kline paginado por start/end.
+
+El fichero termina en RESERVA filas a cero donde las velas nuevas se
+escriben en sitio, y el número de filas válidas se publica en memoria: las
+vistas ya entregadas no cambian y no se vuelve a mapear nada. Rellenar un
+hueco o agotar la reserva escribe una versión nueva del fichero
+(..._5.v1.f64, ...) en lugar de reemplazar uno que puede estar mapeado,
+cosa que Windows no permite; las versiones antiguas se borran cuando ya
+nadie las usa.
+
+Uso:
+    python almacen_velas.py OMUSDT --interval 5 --dias 90
+"""
+import threading
+import argparse
+import logging
+import glob
+import time
+import re
+import os
+
+import numpy as np
+
+from flujo_velas import Vela, intervalo_ms, parsear_velas
+
+DIRECTORIO = 'historico'
+ANCHO = len(Vela._fields)
+LIMITE_KLINE = 1000  # Máximo de velas por petición de get_kline
+RESERVA = 4096       # Filas vacías al final de cada fichero para añadir velas en sitio
+BYTES_FILA = ANCHO * 8
+
+_VERSION = re.compile(r'\.v(\d+)\.f64$')
+
+
+def _vacia():
+    return np.zeros((0, ANCHO), dtype=np.float64)
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        # Aún mapeado (Windows): se borrará en una apertura o reescritura posterior
+        pass
+
+
+class FicheroSerie:
+    """Versión vigente del fichero de una serie: mapa de solo lectura y filas válidas"""
+
+    def __init__(self, ruta=None, version=-1, mapa=None, filas=0):
+        self.ruta = ruta
+        self.version = version
+        self.mapa = mapa
+        self.filas = filas
+
+    @property
+    def libres(self):
+        return 0 if self.mapa is None else len(self.mapa) - self.filas
+
+    def serie(self):
+        return self.mapa[:self.filas] if self.filas else _vacia()
+
+
+class AlmacenVelas:
+    """Series de velas cerradas en disco, abiertas como memmap de solo lectura"""
+
+    def __init__(self, client, directorio=DIRECTORIO, category='linear'):
+        self.client = client
+        self.directorio = directorio
+        self.category = category
+        self.series = {}
+        self.sin_datos = set()  # Huecos (symbol, interval, inicio, fin) que el exchange devolvió vacíos
+        self.primeras = {}      # Primera vela que existe en el exchange, si ya se encontró
+        self.lock = threading.Lock()
+
+    def ruta(self, symbol, interval, version=0):
+        nombre = f"{self.category}_{symbol}_{interval}"
+        if version:
+            nombre += f".v{version}"
+        return os.path.join(self.directorio, nombre + '.f64')
+
+    def versiones(self, symbol, interval):
+        """{versión: ruta} de los ficheros de la serie que hay en disco"""
+        base = self.ruta(symbol, interval)
+        versiones = {0: base} if os.path.exists(base) else {}
+        for ruta in glob.glob(glob.escape(base[:-len('.f64')]) + '.v*.f64'):
+            encontrada = _VERSION.search(ruta)
+            if encontrada:
+                versiones[int(encontrada.group(1))] = ruta
+        return versiones
+
+    def fichero(self, symbol, interval):
+        """FicheroSerie vigente; llamar con self.lock adquirido"""
+        clave = (symbol, str(interval))
+        fichero = self.series.get(clave)
+        if fichero is None:
+            fichero = self._abrir(symbol, interval)
+            self.series[clave] = fichero
+        return fichero
+
+    def serie(self, symbol, interval):
+        """Matriz (n, 7) de velas cerradas ordenadas por timestamp, sin copiar"""
+        with self.lock:
+            return self.fichero(symbol, interval).serie()
+
+    def _abrir(self, symbol, interval):
+        versiones = self.versiones(symbol, interval)
+        if not versiones:
+            return FicheroSerie()
+        version = max(versiones)
+        for anterior, ruta in versiones.items():
+            if anterior < version:
+                _borrar(ruta)
+        return self._mapear(versiones[version], version)
+
+    def _mapear(self, ruta, version):
+        capacidad = os.path.getsize(ruta) // BYTES_FILA
+        if not capacidad:
+            return FicheroSerie(ruta, version)
+        mapa = np.memmap(ruta, dtype=np.float64, mode='r', shape=(capacidad, ANCHO))
+        # Las filas reservadas tienen timestamp 0; las válidas van antes
+        ocupadas = np.flatnonzero(mapa[:, 0])
+        return FicheroSerie(ruta, version, mapa, int(ocupadas[-1]) + 1 if len(ocupadas) else 0)
+
+    def columnas(self, symbol, interval, desde=None, hasta=None):
+        """Columnas con el formato de backtest.cargar_velas_csv, opcionalmente acotadas en ms"""
+        serie = self.serie(symbol, interval)
+        ts = serie[:, 0]
+        inicio = 0 if desde is None else int(np.searchsorted(ts, desde, side='left'))
+        fin = len(ts) if hasta is None else int(np.searchsorted(ts, hasta, side='right'))
+        tramo = serie[inicio:fin]
+        velas = {campo: tramo[:, i] for i, campo in enumerate(Vela._fields)}
+        velas['timestamp'] = velas['timestamp'].astype(np.int64)
+        return velas
+
+    def ultimas(self, symbol, interval, n):
+        """Últimas n velas cerradas como lista de Vela (para sembrar BufferVelas)"""
+        if n <= 0:
+            return []
+        return [Vela(int(fila[0]), *fila[1:].tolist()) for fila in self.serie(symbol, interval)[-n:]]
+
+    def agregar(self, symbol, interval, velas):
+        """Guardar velas cerradas; las posteriores a la última se escriben en la reserva del fichero"""
+        filas = np.asarray(velas, dtype=np.float64).reshape(-1, ANCHO)
+        if not len(filas):
+            return
+        os.makedirs(self.directorio, exist_ok=True)
+
+        with self.lock:
+            fichero = self.fichero(symbol, interval)
+            serie = fichero.serie()
+            filas = filas[np.argsort(filas[:, 0], kind='stable')]
+            if not len(serie) or filas[0, 0] > serie[-1, 0]:
+                _, unicos = np.unique(filas[:, 0], return_index=True)
+                nuevas = filas[unicos]
+                if len(nuevas) <= fichero.libres:
+                    with open(fichero.ruta, 'r+b') as f:
+                        f.seek(fichero.filas * BYTES_FILA)
+                        f.write(nuevas.tobytes())
+                    # El mapa ve lo escrito; se publica después de escribirlo
+                    fichero.filas += len(nuevas)
+                    return
+                combinadas = np.concatenate([np.asarray(serie), nuevas])
+            else:
+                # Relleno de huecos: fusionar dando prioridad a las velas nuevas
+                combinadas = np.concatenate([filas, np.asarray(serie)])
+                _, unicos = np.unique(combinadas[:, 0], return_index=True)
+                combinadas = combinadas[unicos]
+            del serie
+            self._reescribir(symbol, interval, fichero, combinadas)
+
+    def _reescribir(self, symbol, interval, fichero, filas):
+        """Escribir las filas y la reserva en una versión nueva y pasar a usarla"""
+        version = fichero.version + 1
+        ruta = self.ruta(symbol, interval, version)
+        temporal = ruta + '.tmp'
+        with open(temporal, 'wb') as f:
+            f.write(filas.tobytes())
+            f.write(bytes(RESERVA * BYTES_FILA))
+        # El destino es un nombre nuevo: nadie lo tiene abierto
+        os.replace(temporal, ruta)
+        self.series[(symbol, str(interval))] = self._mapear(ruta, version)
+        fichero.mapa = None
+        for anterior, ruta_anterior in self.versiones(symbol, interval).items():
+            if anterior < version:
+                _borrar(ruta_anterior)
+
+    def huecos(self, symbol, interval):
+        """Rangos [inicio, fin] en ms de velas que faltan entre la primera y la última guardada"""
+        paso = intervalo_ms(interval)
+        ts = self.serie(symbol, interval)[:, 0].astype(np.int64)
+        if len(ts) < 2 or not paso:
+            return []
+        saltos = np.flatnonzero(np.diff(ts) > paso)
+        return [(int(ts[i]) + paso, int(ts[i + 1]) - paso) for i in saltos]
+
+    def descargar(self, symbol, interval, inicio, fin):
+        """Velas con timestamp en [inicio, fin] (ms), paginando hacia atrás desde fin"""
+        bloques = []
+        hasta = fin
+        while hasta >= inicio:
+            response = self.client.get_kline(
+                category=self.category,
+                symbol=symbol,
+                interval=str(interval),
+                start=int(inicio),
+                end=int(hasta),
+                limit=LIMITE_KLINE
+            )
+            if response['retCode'] != 0:
+                raise Exception(f"Error histórico: {response['retMsg']}")
+
+            lista = response['result'].get('list', [])
+            velas = [v for v in parsear_velas(lista) if inicio <= v.timestamp <= hasta]
+            if not velas:
+                break
+            bloques.append(velas)
+            if len(lista) < LIMITE_KLINE:
+                break
+            hasta = velas[0].timestamp - 1
+
+        return [vela for bloque in reversed(bloques) for vela in bloque]
+
+    def actualizar(self, symbol, interval, minimo=0):
+        """Completar la serie hasta ahora y devolver la vela en curso (o None)
+
+        Descarga las velas cerradas desde la última guardada, rellena los
+        huecos internos y, si hay menos de `minimo` velas recientes, amplía
+        hacia atrás. Los huecos que el exchange devuelve vacíos y el inicio del
+        listado no se vuelven a pedir en este proceso.
+        """
+        paso = intervalo_ms(interval)
+        if not paso:
+            raise ValueError(f"Intervalo no soportado: {interval}")
+        ahora = int(time.time() * 1000)
+        serie = self.serie(symbol, interval)
+
+        rangos = []
+        if len(serie):
+            primera, ultima = int(serie[0, 0]), int(serie[-1, 0])
+            rangos.append((ultima + paso, ahora))
+            rangos.extend(self.huecos(symbol, interval))
+        else:
+            primera = ahora - paso + 1
+            rangos.append((primera, ahora))
+        clave = (symbol, str(interval))
+        if minimo and primera > ahora - minimo * paso and primera != self.primeras.get(clave):
+            rangos.append((ahora - minimo * paso, primera - 1))
+
+        cerradas, viva = [], None
+        for inicio, fin in rangos:
+            if fin < inicio or (*clave, inicio, fin) in self.sin_datos:
+                continue
+            velas = self.descargar(symbol, interval, inicio, fin)
+            if fin == primera - 1 and (not velas or velas[0].timestamp > inicio):
+                # El símbolo no tiene velas anteriores (listado reciente)
+                self.primeras[clave] = velas[0].timestamp if velas else primera
+            elif not velas and fin < ahora - paso:
+                self.sin_datos.add((*clave, inicio, fin))
+            for vela in velas:
+                if vela.timestamp + paso <= ahora:
+                    cerradas.append(vela)
+                else:
+                    viva = vela
+
+        self.agregar(symbol, interval, cerradas)
+        if cerradas:
+            logging.info(f"{len(cerradas)} velas {symbol} {interval} descargadas al almacén")
+        return viva
+
+
+def main():
+    from transporte import ClienteHTTP
+
+    parser = argparse.ArgumentParser(description="Descargar velas al almacén local")
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--interval', default='5')
+    parser.add_argument('--dias', type=float, default=30)
+    parser.add_argument('--directorio', default=DIRECTORIO)
+    parser.add_argument('--category', default='linear')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    almacen = AlmacenVelas(ClienteHTTP(), args.directorio, args.category)
+    minimo = int(args.dias * 86_400_000 / intervalo_ms(args.interval))
+    for symbol in args.symbols:
+        almacen.actualizar(symbol, args.interval, minimo)
+        with almacen.lock:
+            fichero = almacen.fichero(symbol, args.interval)
+        print(f"{symbol}: {fichero.filas} velas en {fichero.ruta}")
+
+
+if __name__ == "__main__":
+    main()
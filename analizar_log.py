@@ -0,0 +1,329 @@
+"""Análisis en streaming de trading_bot.log (y de sus copias rotadas .gz)
+
+Lee el log línea a línea con memoria constante, clasifica cada mensaje
+(sondeos de posición, errores de estrategia, órdenes, filtros de
+volatilidad, errores de conexión...) y resume tasas por ventana de tiempo,
+ráfagas de errores y paradas entre reinicios ("Iniciando bot"). Acepta los
+mensajes en español e inglés de todas las versiones del bot, texto latin-1 o
+UTF-8 y las líneas "(repetido N veces ...)" que escribe bitacora.py.
+
+Uso:
+    python analizar_log.py trading_bot.log --rotados
+    python analizar_log.py trading_bot.log.3.gz trading_bot.log --ventana 900 --json
+"""
+from collections import Counter
+import argparse
+import calendar
+import heapq
+import gzip
+import json
+import glob
+import time
+import sys
+import re
+import os
+
+VENTANA = 3600          # Segundos por ventana de tasas
+RAFAGA_PAUSA = 60       # Segundos sin errores que cierran una ráfaga
+RAFAGA_MINIMO = 20      # Errores para considerar ráfaga
+TOP = 10                # Elementos en cada ranking
+MAX_CACHE = 50000       # Mensajes distintos memorizados antes de vaciar las cachés
+MAX_MENSAJES = 10000    # Mensajes normalizados distintos que se cuentan
+
+# Se evalúan en orden: los errores de conexión ganan aunque vengan de cualquier etapa
+TIPOS = [
+    ('inicio', r'^(Iniciando bot|Starting trading bot)'),
+    ('conexion', r'HTTPSConnectionPool|Connection aborted|ConnectionReset|timed out|Max retries exceeded'
+                 r'|sin respuesta en|Circuito abierto|API sin respuesta|ClientConnector|ServerDisconnected'
+                 r'|Flujo .* no disponible'),
+    ('volatilidad', r'Volatilidad (por debajo|insuficiente)|Low volatility'),
+    ('posicion', r'Posici\S*n activa|Position monitoring|monitoreo|Position (detected|active)'),
+    ('orden', r'[Oo]rden|[Oo]rder|Tama\S*o de posici\S*n'),
+    ('saldo', r'[Bb]alance|[Ss]aldo'),
+    ('estrategia', r'[Ee]strategia|[Ss]trategy|[Dd]ata processing|procesamiento datos|[Dd]atos insuficientes'
+                   r'|[Cc]\S*lculo|[Hh]ist\S*rico|ATR|Bollinger'),
+    ('metricas', r'^Latencia '),
+]
+_TIPOS = [(nombre, re.compile(patron)) for nombre, patron in TIPOS]
+_REPETIDO = re.compile(r' \(repetido (\d+) veces en \d+s\)$')
+_NUMEROS = re.compile(r'\d+(?:\.\d+)?')
+NIVELES_ERROR = ('ERROR', 'CRITICAL')
+
+
+def clasificar(mensaje):
+    for nombre, patron in _TIPOS:
+        if patron.search(mensaje):
+            return nombre
+    return 'otro'
+
+
+def _texto(linea):
+    try:
+        return linea.decode('utf-8')
+    except UnicodeDecodeError:
+        return linea.decode('latin-1')
+
+
+def _fecha(t):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(t))
+
+
+class Analizador:
+    """Acumula contadores acotados a partir de líneas del log (bytes)"""
+
+    def __init__(self, ventana=VENTANA, rafaga_pausa=RAFAGA_PAUSA, rafaga_minimo=RAFAGA_MINIMO, top=TOP):
+        self.ventana = ventana
+        self.rafaga_pausa = rafaga_pausa
+        self.rafaga_minimo = rafaga_minimo
+        self.top = top
+
+        self.lineas = 0
+        self.continuaciones = 0
+        self.eventos = 0
+        self.primero = None
+        self.ultimo = None
+        self.por_tipo = Counter()
+        self.por_nivel = Counter()
+        self.errores_por_tipo = Counter()
+        self.mensajes = Counter()
+        self.ventanas = {}
+
+        self.rafaga = None  # [inicio, fin, errores, Counter de tipos]
+        self.rafagas = []   # montículo de las mayores (errores, inicio, fin, tipo principal)
+        self.reinicios = 0
+        self.parada_total = 0.0
+        self.paradas = []   # montículo de las mayores (segundos, momento del reinicio)
+
+        self._dia = None
+        self._epoch_dia = 0
+        self._cache = {}
+
+    def _tiempo(self, linea):
+        # Solo la fecha pasa por calendar; hora, minutos y ms son slices de la línea
+        dia = linea[:10]
+        if dia != self._dia:
+            self._epoch_dia = calendar.timegm((int(dia[:4]), int(dia[5:7]), int(dia[8:10]), 0, 0, 0))
+            self._dia = dia
+        return (self._epoch_dia + int(linea[11:13]) * 3600 + int(linea[14:16]) * 60 +
+                int(linea[17:19]) + int(linea[20:23]) / 1000)
+
+    def _mensaje(self, cola):
+        """(nivel, tipo, peso, clave normalizada) de "NIVEL - mensaje", con caché por texto exacto"""
+        datos = self._cache.get(cola)
+        if datos is None:
+            separador = cola.find(b' - ')
+            if separador < 0:
+                return None
+            if len(self._cache) >= MAX_CACHE:
+                self._cache.clear()
+            nivel = cola[:separador].decode('ascii', 'replace')
+            texto = _texto(cola[separador + 3:]).rstrip('\r\n')
+            peso = 1
+            repetido = _REPETIDO.search(texto)
+            if repetido:
+                texto = texto[:repetido.start()]
+                peso = int(repetido.group(1))
+            datos = (nivel, clasificar(texto), peso, (nivel, _NUMEROS.sub('#', texto)[:160]))
+            self._cache[cola] = datos
+        return datos
+
+    def procesar_linea(self, linea):
+        self.lineas += 1
+        # Cabecera "AAAA-MM-DD hh:mm:ss,mmm - NIVEL - mensaje"; el resto son tracebacks
+        if linea[23:26] != b' - ' or linea[4:5] != b'-':
+            self.continuaciones += 1
+            return
+        datos = self._mensaje(linea[26:])
+        if datos is None:
+            self.continuaciones += 1
+            return
+        try:
+            t = self._tiempo(linea)
+        except ValueError:
+            self.continuaciones += 1
+            return
+        nivel, tipo, peso, clave = datos
+
+        if self.primero is None:
+            self.primero = t
+        if tipo == 'inicio':
+            self._reinicio(t)
+        self.ultimo = t if self.ultimo is None else max(self.ultimo, t)
+
+        self.eventos += peso
+        self.por_tipo[tipo] += peso
+        self.por_nivel[nivel] += peso
+        contadores = self.ventanas.get(int(t // self.ventana))
+        if contadores is None:
+            contadores = self.ventanas[int(t // self.ventana)] = Counter()
+        contadores[tipo] += peso
+        if clave in self.mensajes or len(self.mensajes) < MAX_MENSAJES:
+            self.mensajes[clave] += peso
+        if nivel in NIVELES_ERROR:
+            contadores['errores'] += peso
+            self.errores_por_tipo[tipo] += peso
+            self._error(t, tipo, peso)
+
+    def _reinicio(self, t):
+        self.reinicios += 1
+        if self.ultimo is None:
+            return
+        parada = max(t - self.ultimo, 0.0)
+        self.parada_total += parada
+        self._mayores(self.paradas, (parada, t))
+
+    def _error(self, t, tipo, peso):
+        rafaga = self.rafaga
+        if rafaga is not None and t - rafaga[1] <= self.rafaga_pausa:
+            rafaga[1] = max(rafaga[1], t)
+            rafaga[2] += peso
+            rafaga[3][tipo] += peso
+            return
+        self._cerrar_rafaga()
+        self.rafaga = [t, t, peso, Counter({tipo: peso})]
+
+    def _cerrar_rafaga(self):
+        rafaga = self.rafaga
+        self.rafaga = None
+        if rafaga is not None and rafaga[2] >= self.rafaga_minimo:
+            self._mayores(self.rafagas, (rafaga[2], rafaga[0], rafaga[1], rafaga[3].most_common(1)[0][0]))
+
+    def _mayores(self, monticulo, elemento):
+        if len(monticulo) < self.top:
+            heapq.heappush(monticulo, elemento)
+        else:
+            heapq.heappushpop(monticulo, elemento)
+
+    def procesar(self, flujo):
+        for linea in flujo:
+            self.procesar_linea(linea)
+
+    def resumen(self):
+        self._cerrar_rafaga()
+        duracion = (self.ultimo - self.primero) if self.primero is not None else 0.0
+        horas = duracion / 3600 if duracion else 0.0
+        ventanas = []
+        for clave in sorted(self.ventanas):
+            contadores = self.ventanas[clave]
+            ventanas.append({
+                'inicio': _fecha(clave * self.ventana),
+                'eventos': sum(v for k, v in contadores.items() if k != 'errores'),
+                'errores': contadores['errores'],
+                'por_tipo': {k: v for k, v in contadores.most_common() if k != 'errores'}
+            })
+        return {
+            'lineas': self.lineas,
+            'eventos': self.eventos,
+            'continuaciones': self.continuaciones,
+            'desde': _fecha(self.primero) if self.primero is not None else None,
+            'hasta': _fecha(self.ultimo) if self.ultimo is not None else None,
+            'horas': horas,
+            'por_tipo': dict(self.por_tipo.most_common()),
+            'tasa_por_hora': {k: v / horas for k, v in self.por_tipo.most_common()} if horas else {},
+            'por_nivel': dict(self.por_nivel.most_common()),
+            'errores_por_tipo': dict(self.errores_por_tipo.most_common()),
+            'mensajes_top': [
+                {'nivel': nivel, 'mensaje': mensaje, 'n': n}
+                for (nivel, mensaje), n in self.mensajes.most_common(self.top)
+            ],
+            'ventana_s': self.ventana,
+            'ventanas': ventanas,
+            'rafagas': [
+                {'inicio': _fecha(inicio), 'duracion_s': fin - inicio, 'errores': n, 'tipo': tipo}
+                for n, inicio, fin, tipo in sorted(self.rafagas, reverse=True)
+            ],
+            'reinicios': self.reinicios,
+            'parada_total_s': self.parada_total,
+            'paradas': [
+                {'reinicio': _fecha(t), 'parada_s': parada}
+                for parada, t in sorted(self.paradas, reverse=True)
+            ]
+        }
+
+
+def abrir(ruta):
+    if ruta == '-':
+        return sys.stdin.buffer
+    if ruta.endswith('.gz'):
+        return gzip.open(ruta, 'rb')
+    return open(ruta, 'rb', buffering=1 << 20)
+
+
+def con_rotados(ruta):
+    """Copias rotadas (de la más antigua a la más reciente) seguidas del fichero actual"""
+    copias = []
+    for copia in glob.glob(glob.escape(ruta) + '.*'):
+        numero = copia[len(ruta) + 1:].split('.')[0]
+        if numero.isdigit():
+            copias.append((int(numero), copia))
+    return [copia for _, copia in sorted(copias, reverse=True)] + ([ruta] if os.path.exists(ruta) else [])
+
+
+def _duracion(segundos):
+    horas, resto = divmod(int(segundos), 3600)
+    return f"{horas}h{resto // 60:02d}m{resto % 60:02d}s"
+
+
+def imprimir(resumen):
+    print(f"Líneas: {resumen['lineas']}  eventos: {resumen['eventos']}  "
+          f"continuaciones: {resumen['continuaciones']}")
+    print(f"Periodo: {resumen['desde']} -> {resumen['hasta']} ({resumen['horas']:.1f} h)")
+    print("\nEventos por tipo (total, por hora, errores):")
+    for tipo, n in resumen['por_tipo'].items():
+        tasa = resumen['tasa_por_hora'].get(tipo, 0.0)
+        print(f"  {tipo:>12}: {n:>8} {tasa:>10.1f}/h {resumen['errores_por_tipo'].get(tipo, 0):>8}")
+    print("\nNiveles: " + ", ".join(f"{k}={v}" for k, v in resumen['por_nivel'].items()))
+
+    print("\nMensajes más frecuentes:")
+    for m in resumen['mensajes_top']:
+        print(f"  {m['n']:>8} {m['nivel']:<7} {m['mensaje'][:100]}")
+
+    print(f"\nTasas por ventana de {resumen['ventana_s']}s:")
+    for v in resumen['ventanas']:
+        tipos = ' '.join(f"{k}={n}" for k, n in list(v['por_tipo'].items())[:4])
+        print(f"  {v['inicio']} eventos={v['eventos']:>6} errores={v['errores']:>6}  {tipos}")
+
+    print("\nRáfagas de errores:")
+    for r in resumen['rafagas']:
+        print(f"  {r['inicio']} {r['errores']:>6} errores en {_duracion(r['duracion_s'])} ({r['tipo']})")
+    if not resumen['rafagas']:
+        print("  ninguna")
+
+    print(f"\nReinicios: {resumen['reinicios']}  parada total: {_duracion(resumen['parada_total_s'])}")
+    for p in resumen['paradas']:
+        print(f"  {p['reinicio']} tras {_duracion(p['parada_s'])} sin actividad")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumen de trading_bot.log en una sola pasada")
+    parser.add_argument('logs', nargs='+', help="Ficheros en orden cronológico (.gz admitido, '-' para stdin)")
+    parser.add_argument('--rotados', action='store_true', help="Incluir antes las copias rotadas .N.gz de cada fichero")
+    parser.add_argument('--ventana', type=float, default=VENTANA, help="Segundos por ventana de tasas")
+    parser.add_argument('--rafaga-pausa', type=float, default=RAFAGA_PAUSA,
+                        help="Segundos sin errores que separan dos ráfagas")
+    parser.add_argument('--rafaga-minimo', type=int, default=RAFAGA_MINIMO, help="Errores mínimos por ráfaga")
+    parser.add_argument('--top', type=int, default=TOP)
+    parser.add_argument('--json', action='store_true', help="Salida JSON en lugar de texto")
+    args = parser.parse_args()
+
+    rutas = []
+    for ruta in args.logs:
+        rutas.extend(con_rotados(ruta) if args.rotados and ruta != '-' else [ruta])
+
+    inicio = time.perf_counter()
+    analizador = Analizador(args.ventana, args.rafaga_pausa, args.rafaga_minimo, args.top)
+    for ruta in rutas:
+        with abrir(ruta) as flujo:
+            analizador.procesar(flujo)
+    resumen = analizador.resumen()
+    resumen['segundos_analisis'] = time.perf_counter() - inicio
+
+    if args.json:
+        print(json.dumps(resumen, ensure_ascii=False, indent=2))
+    else:
+        imprimir(resumen)
+        print(f"\nAnalizado en {resumen['segundos_analisis']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,581 @@
+"""Backtesting por eventos: reproduce velas grabadas a través de TradingBot sin claves ni red
+
+El bot se ejecuta sin cambios contra ClienteSimulado, que implementa los
+métodos de pybit HTTP que usan los bots, y RelojSimulado sustituye a
+time.time/time.sleep para que un mes de velas se recorra en segundos.
+
+Uso:
+    python backtest.py velas.csv --symbol OMUSDT --interval 5 --balance 1000
+"""
+from collections import namedtuple
+import contextlib
+import itertools
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from flujo_velas import intervalo_ms
+
+COMISION_MAKER = 0.0002
+COMISION_TAKER = 0.00055
+APALANCAMIENTO = 10
+
+Operacion = namedtuple('Operacion', ['symbol', 'side', 'qty', 'entrada', 'salida', 'apertura', 'cierre', 'pnl'])
+ResultadoBacktest = namedtuple('ResultadoBacktest', ['operaciones', 'curva', 'resumen'])
+
+
+class RelojSimulado:
+    """Sustituto del módulo time: sleep avanza el reloj sin esperar"""
+
+    def __init__(self, inicio):
+        self.ahora = float(inicio)
+
+    def time(self):
+        return self.ahora
+
+    def monotonic(self):
+        return self.ahora
+
+    def perf_counter(self):
+        return self.ahora
+
+    def sleep(self, segundos):
+        self.ahora += max(0.0, segundos)
+
+    def __getattr__(self, nombre):
+        return getattr(time, nombre)
+
+
+@contextlib.contextmanager
+def reloj_simulado(reloj, modulos):
+    """Sustituir el atributo `time` de los módulos dados durante el bloque"""
+    originales = [(modulo, modulo.time) for modulo in modulos]
+    for modulo in modulos:
+        modulo.time = reloj
+    try:
+        yield reloj
+    finally:
+        for modulo, original in originales:
+            modulo.time = original
+
+
+def cargar_velas_csv(ruta):
+    """Leer velas de un CSV timestamp,open,high,low,close,volume[,turnover] (timestamp en ms)"""
+    datos = np.loadtxt(ruta, delimiter=',', skiprows=1, ndmin=2)
+    if datos.shape[1] < 6:
+        raise ValueError("El CSV de velas necesita al menos timestamp,open,high,low,close,volume")
+    velas = {
+        'timestamp': datos[:, 0].astype(np.int64),
+        'open': datos[:, 1],
+        'high': datos[:, 2],
+        'low': datos[:, 3],
+        'close': datos[:, 4],
+        'volume': datos[:, 5],
+        'turnover': datos[:, 6] if datos.shape[1] > 6 else datos[:, 4] * datos[:, 5]
+    }
+    orden = np.argsort(velas['timestamp'], kind='stable')
+    return {campo: valores[orden] for campo, valores in velas.items()}
+
+
+def cargar_velas(args):
+    """Velas del CSV indicado o, con --almacen, de la serie guardada por AlmacenVelas"""
+    if args.almacen:
+        from almacen_velas import AlmacenVelas
+        velas = AlmacenVelas(None, args.almacen).columnas(args.symbol, args.interval)
+        if not len(velas['close']):
+            raise ValueError(f"No hay velas de {args.symbol} {args.interval} en {args.almacen}")
+        return velas
+    if not args.velas:
+        raise ValueError("Indica un CSV de velas o --almacen")
+    return cargar_velas_csv(args.velas)
+
+
+def cargar_tickers_csv(ruta):
+    """Leer tickers grabados de un CSV timestamp,lastPrice (timestamp en ms)"""
+    datos = np.loadtxt(ruta, delimiter=',', skiprows=1, ndmin=2)
+    orden = np.argsort(datos[:, 0], kind='stable')
+    return datos[orden, 0].astype(np.int64), datos[orden, 1]
+
+
+class MercadoSimulado:
+    """Velas de un símbolo y el camino de precios dentro de cada vela
+
+    Sin tickers grabados, cada vela se recorre como O -> L -> H -> C (o
+    O -> H -> L -> C si cierra a la baja) para no mirar el futuro: la vela en
+    curso solo muestra el máximo y mínimo alcanzados hasta el instante simulado.
+    """
+
+    def __init__(self, symbol, velas, timeframe, tick_size='0.0001', qty_step='1', tickers=None):
+        self.symbol = symbol
+        self.timeframe = str(timeframe)
+        self.intervalo = intervalo_ms(timeframe)
+        if not self.intervalo:
+            raise ValueError(f"Intervalo no soportado: {timeframe}")
+        self.tick_size = tick_size
+        self.qty_step = qty_step
+        self.velas = velas
+        self.ts = velas['timestamp']
+        self.filas = [
+            [str(int(t)), repr(float(o)), repr(float(h)), repr(float(l)), repr(float(c)),
+             repr(float(v)), repr(float(tv))]
+            for t, o, h, l, c, v, tv in zip(
+                velas['timestamp'], velas['open'], velas['high'], velas['low'],
+                velas['close'], velas['volume'], velas['turnover']
+            )
+        ]
+        if tickers is None:
+            self._camino_sintetico()
+        else:
+            self.ts_camino, self.precio_camino = tickers
+        self._extremos_camino()
+
+    def _camino_sintetico(self):
+        o, h, l, c = (self.velas[k] for k in ('open', 'high', 'low', 'close'))
+        alcista = c >= o
+        primero = np.where(alcista, l, h)
+        segundo = np.where(alcista, h, l)
+        cuarto = self.intervalo // 4
+        self.ts_camino = np.stack([self.ts, self.ts + cuarto, self.ts + 2 * cuarto, self.ts + 3 * cuarto], axis=1).ravel()
+        self.precio_camino = np.stack([o, primero, segundo, c], axis=1).ravel()
+
+    def _extremos_camino(self):
+        # Máximo y mínimo acumulados dentro de la vela para cada punto del camino
+        self.vela_camino = np.searchsorted(self.ts, self.ts_camino, side='right') - 1
+        self.max_camino = np.empty_like(self.precio_camino)
+        self.min_camino = np.empty_like(self.precio_camino)
+        vela_actual, maximo, minimo = -1, 0.0, 0.0
+        for i, (k, precio) in enumerate(zip(self.vela_camino.tolist(), self.precio_camino.tolist())):
+            if k != vela_actual:
+                vela_actual = k
+                apertura = self.velas['open'][k] if k >= 0 else precio
+                maximo = minimo = apertura
+            maximo = max(maximo, precio)
+            minimo = min(minimo, precio)
+            self.max_camino[i] = maximo
+            self.min_camino[i] = minimo
+
+    def indice_camino(self, t_ms):
+        return int(np.searchsorted(self.ts_camino, t_ms, side='right')) - 1
+
+    def precio(self, t_ms):
+        i = self.indice_camino(t_ms)
+        return float(self.precio_camino[max(i, 0)])
+
+    def indice_vela(self, t_ms):
+        return int(np.searchsorted(self.ts, t_ms, side='right')) - 1
+
+    def fila_viva(self, t_ms):
+        k = self.indice_vela(t_ms)
+        i = self.indice_camino(t_ms)
+        if k < 0:
+            return None
+        if i < 0 or self.vela_camino[i] != k:
+            precio = self.velas['open'][k]
+            maximo = minimo = precio
+        else:
+            precio, maximo, minimo = self.precio_camino[i], self.max_camino[i], self.min_camino[i]
+        fraccion = min(1.0, (t_ms - self.ts[k]) / self.intervalo)
+        return [
+            str(int(self.ts[k])), repr(float(self.velas['open'][k])), repr(float(maximo)),
+            repr(float(minimo)), repr(float(precio)),
+            repr(float(self.velas['volume'][k] * fraccion)),
+            repr(float(self.velas['turnover'][k] * fraccion))
+        ]
+
+    def klines(self, t_ms, limit=200, start=None, end=None):
+        """Velas hasta t_ms, la más reciente primero, como get_kline"""
+        k = self.indice_vela(t_ms)
+        if k < 0:
+            return []
+        hasta, viva = k, True
+        if end is not None:
+            limite_end = int(np.searchsorted(self.ts, end, side='right'))
+            if limite_end <= k:
+                hasta, viva = limite_end, False
+        desde = 0 if start is None else int(np.searchsorted(self.ts, start, side='left'))
+        filas = self.filas[max(desde, hasta - limit + viva):hasta]
+        if viva:
+            filas = filas + [self.fila_viva(t_ms)]
+        return filas[::-1]
+
+
+def _respuesta(resultado, ret_code=0, ret_msg='OK'):
+    return {'retCode': ret_code, 'retMsg': ret_msg, 'result': resultado, 'retExtInfo': {}, 'time': 0}
+
+
+def _error(mensaje, ret_code=10001):
+    return _respuesta({}, ret_code, mensaje)
+
+
+class ClienteSimulado:
+    """Exchange simulado con los métodos de pybit HTTP que usan los bots
+
+    Las órdenes Limit quedan en reposo y se ejecutan cuando el camino de
+    precios las toca (comisión maker); las Market y los TP/SL se ejecutan
+    como taker. Modo one-way: una posición neta por símbolo.
+    """
+
+    def __init__(self, reloj, mercados, balance=1000.0, apalancamiento=APALANCAMIENTO):
+        self.reloj = reloj
+        self.mercados = {m.symbol: m for m in mercados}
+        self.balance = float(balance)
+        self.apalancamiento = apalancamiento
+        self.posiciones = {}
+        self.ordenes = {}
+        self.operaciones = []
+        self.comisiones = 0.0
+        self.ids = itertools.count(1)
+        self.procesado = self._t_ms()
+
+    def _t_ms(self):
+        return int(self.reloj.time() * 1000)
+
+    def _mercado(self, symbol):
+        mercado = self.mercados.get(symbol)
+        if mercado is None:
+            raise KeyError(symbol)
+        return mercado
+
+    # Motor de ejecución
+
+    def avanzar(self):
+        """Recorrer el camino de precios desde el último instante procesado hasta ahora"""
+        ahora = self._t_ms()
+        if ahora <= self.procesado:
+            return
+        activos = {o['symbol'] for o in self.ordenes.values()} | set(self.posiciones)
+        for symbol in activos:
+            mercado = self.mercados[symbol]
+            desde = int(np.searchsorted(mercado.ts_camino, self.procesado, side='right'))
+            hasta = int(np.searchsorted(mercado.ts_camino, ahora, side='right'))
+            for i in range(desde, hasta):
+                self._procesar_precio(symbol, float(mercado.precio_camino[i]), int(mercado.ts_camino[i]))
+        self.procesado = ahora
+
+    def _procesar_precio(self, symbol, precio, t_ms):
+        for orden in [o for o in self.ordenes.values() if o['symbol'] == symbol]:
+            limite = orden['precio']
+            if (orden['side'] == 'Buy' and precio <= limite) or (orden['side'] == 'Sell' and precio >= limite):
+                del self.ordenes[orden['orderId']]
+                self._ejecutar(symbol, orden['side'], orden['qty'], limite, COMISION_MAKER, t_ms,
+                               orden.get('takeProfit'), orden.get('stopLoss'))
+
+        posicion = self.posiciones.get(symbol)
+        if posicion is None:
+            return
+        tp, sl = posicion.get('takeProfit'), posicion.get('stopLoss')
+        salida = 'Sell' if posicion['side'] == 'Buy' else 'Buy'
+        if posicion['side'] == 'Buy':
+            if tp and precio >= tp:
+                self._ejecutar(symbol, salida, posicion['size'], tp, COMISION_TAKER, t_ms)
+            elif sl and precio <= sl:
+                self._ejecutar(symbol, salida, posicion['size'], min(precio, sl), COMISION_TAKER, t_ms)
+        else:
+            if tp and precio <= tp:
+                self._ejecutar(symbol, salida, posicion['size'], tp, COMISION_TAKER, t_ms)
+            elif sl and precio >= sl:
+                self._ejecutar(symbol, salida, posicion['size'], max(precio, sl), COMISION_TAKER, t_ms)
+
+    def _ejecutar(self, symbol, side, qty, precio, comision, t_ms, take_profit=None, stop_loss=None):
+        fee = qty * precio * comision
+        self.balance -= fee
+        self.comisiones += fee
+        posicion = self.posiciones.get(symbol)
+
+        if posicion is None or posicion['side'] == side:
+            if posicion is None:
+                posicion = {'side': side, 'size': 0.0, 'avgPrice': 0.0, 'apertura': t_ms}
+                self.posiciones[symbol] = posicion
+            total = posicion['size'] + qty
+            posicion['avgPrice'] = (posicion['avgPrice'] * posicion['size'] + precio * qty) / total
+            posicion['size'] = total
+        else:
+            cerrado = min(qty, posicion['size'])
+            signo = 1 if posicion['side'] == 'Buy' else -1
+            pnl = (precio - posicion['avgPrice']) * cerrado * signo
+            self.balance += pnl
+            self.operaciones.append(Operacion(
+                symbol, posicion['side'], cerrado, posicion['avgPrice'], precio,
+                posicion['apertura'], t_ms, pnl
+            ))
+            posicion['size'] -= cerrado
+            restante = qty - cerrado
+            if posicion['size'] <= 0:
+                del self.posiciones[symbol]
+                if restante > 0:
+                    self.posiciones[symbol] = {
+                        'side': side, 'size': restante, 'avgPrice': precio, 'apertura': t_ms
+                    }
+                    posicion = self.posiciones[symbol]
+                else:
+                    return
+
+        if take_profit:
+            posicion['takeProfit'] = take_profit
+        if stop_loss:
+            posicion['stopLoss'] = stop_loss
+
+    def equity(self):
+        ahora = self._t_ms()
+        no_realizado = sum(
+            (self.mercados[s].precio(ahora) - p['avgPrice']) * p['size'] * (1 if p['side'] == 'Buy' else -1)
+            for s, p in self.posiciones.items()
+        )
+        return self.balance + no_realizado
+
+    # Métodos de pybit HTTP
+
+    def get_kline(self, symbol, interval=None, limit=200, start=None, end=None, category='linear', **kwargs):
+        self.avanzar()
+        try:
+            mercado = self._mercado(symbol)
+        except KeyError:
+            return _error("Not supported symbols", 10001)
+        lista = mercado.klines(self._t_ms(), min(int(limit), 1000), start, end)
+        return _respuesta({'category': category, 'symbol': symbol, 'list': lista})
+
+    def get_tickers(self, category='linear', symbol=None, **kwargs):
+        self.avanzar()
+        ahora = self._t_ms()
+        simbolos = [symbol] if symbol else list(self.mercados)
+        lista = []
+        for s in simbolos:
+            if s not in self.mercados:
+                continue
+            precio = repr(self.mercados[s].precio(ahora))
+            lista.append({
+                'symbol': s, 'lastPrice': precio, 'bid1Price': precio, 'ask1Price': precio,
+                'markPrice': precio, 'volume24h': '0', 'turnover24h': '0'
+            })
+        return _respuesta({'category': category, 'list': lista})
+
+    def get_instruments_info(self, category='linear', symbol=None, limit=None, cursor=None, **kwargs):
+        simbolos = [symbol] if symbol else list(self.mercados)
+        lista = [{
+            'symbol': s,
+            'status': 'Trading',
+            'priceScale': str(max(0, -int(np.floor(np.log10(float(self.mercados[s].tick_size)))))),
+            'priceFilter': {'tickSize': self.mercados[s].tick_size},
+            'lotSizeFilter': {'qtyStep': self.mercados[s].qty_step, 'minOrderQty': self.mercados[s].qty_step}
+        } for s in simbolos if s in self.mercados]
+        return _respuesta({'category': category, 'list': lista, 'nextPageCursor': ''})
+
+    def get_wallet_balance(self, accountType='UNIFIED', coin=None, **kwargs):
+        self.avanzar()
+        equity = repr(self.equity())
+        return _respuesta({'list': [{
+            'accountType': accountType,
+            'totalEquity': equity,
+            'coin': [{
+                'coin': 'USDT',
+                'equity': equity,
+                'walletBalance': repr(self.balance),
+                'availableToWithdraw': repr(self.balance)
+            }]
+        }]})
+
+    def get_positions(self, category='linear', symbol=None, settleCoin=None, **kwargs):
+        self.avanzar()
+        simbolos = [symbol] if symbol else list(self.posiciones)
+        lista = []
+        for s in simbolos:
+            posicion = self.posiciones.get(s)
+            lista.append({
+                'symbol': s,
+                'positionIdx': 0,
+                'side': posicion['side'] if posicion else '',
+                'size': repr(posicion['size']) if posicion else '0',
+                'avgPrice': repr(posicion['avgPrice']) if posicion else '0',
+                'takeProfit': repr(posicion.get('takeProfit') or 0) if posicion else '0',
+                'stopLoss': repr(posicion.get('stopLoss') or 0) if posicion else '0'
+            })
+        return _respuesta({'category': category, 'list': lista, 'nextPageCursor': ''})
+
+    def get_open_orders(self, category='linear', symbol=None, settleCoin=None, **kwargs):
+        self.avanzar()
+        lista = [{
+            'orderId': o['orderId'], 'symbol': o['symbol'], 'side': o['side'],
+            'orderType': 'Limit', 'price': repr(o['precio']), 'qty': repr(o['qty']),
+            'orderStatus': 'New'
+        } for o in self.ordenes.values() if symbol is None or o['symbol'] == symbol]
+        return _respuesta({'category': category, 'list': lista, 'nextPageCursor': ''})
+
+    def place_order(self, symbol, side, orderType, qty, price=None, takeProfit=None, stopLoss=None,
+                    timeInForce=None, reduceOnly=False, category='linear', **kwargs):
+        self.avanzar()
+        if symbol not in self.mercados:
+            return _error("Not supported symbols", 10001)
+        try:
+            qty = float(qty)
+            precio = float(price) if price not in (None, '') else None
+            take_profit = float(takeProfit) if takeProfit not in (None, '') else None
+            stop_loss = float(stopLoss) if stopLoss not in (None, '') else None
+        except (TypeError, ValueError):
+            return _error("params error", 10001)
+        if qty <= 0:
+            return _error("Qty invalid", 10001)
+
+        ahora = self._t_ms()
+        ultimo = self.mercados[symbol].precio(ahora)
+        if orderType == 'Limit' and precio is None:
+            return _error("Price invalid", 10001)
+        if qty * (precio or ultimo) > self.equity() * self.apalancamiento:
+            return _error("ab not enough for new order", 110007)
+
+        order_id = f"sim-{next(self.ids)}"
+        if orderType == 'Market':
+            self._ejecutar(symbol, side, qty, ultimo, COMISION_TAKER, ahora, take_profit, stop_loss)
+        else:
+            cruza = (side == 'Buy' and precio > ultimo) or (side == 'Sell' and precio < ultimo)
+            if cruza and timeInForce == 'PostOnly':
+                return _error("PostOnly order would take liquidity", 170218)
+            self.ordenes[order_id] = {
+                'orderId': order_id, 'symbol': symbol, 'side': side, 'qty': qty, 'precio': precio,
+                'takeProfit': take_profit, 'stopLoss': stop_loss
+            }
+        return _respuesta({'orderId': order_id, 'orderLinkId': ''})
+
+    def cancel_order(self, symbol, orderId=None, category='linear', **kwargs):
+        self.avanzar()
+        if self.ordenes.pop(orderId, None) is None:
+            return _error("order not exists or too late to cancel", 110001)
+        return _respuesta({'orderId': orderId, 'orderLinkId': ''})
+
+    def set_trading_stop(self, symbol, takeProfit=None, stopLoss=None, category='linear', **kwargs):
+        self.avanzar()
+        posicion = self.posiciones.get(symbol)
+        if posicion is None:
+            return _error("can not set tp/sl/ts for zero position", 10001)
+        if takeProfit not in (None, ''):
+            posicion['takeProfit'] = float(takeProfit)
+        if stopLoss not in (None, ''):
+            posicion['stopLoss'] = float(stopLoss)
+        return _respuesta({})
+
+    def set_leverage(self, symbol, buyLeverage=None, sellLeverage=None, category='linear', **kwargs):
+        self.apalancamiento = float(buyLeverage or self.apalancamiento)
+        return _respuesta({})
+
+
+def resumir(operaciones, curva, balance_inicial, comisiones):
+    """Métricas básicas de una ejecución"""
+    pnl = np.array([o.pnl for o in operaciones]) if operaciones else np.zeros(0)
+    equity = curva[:, 1] if len(curva) else np.array([balance_inicial])
+    picos = np.maximum.accumulate(equity)
+    drawdown = float(((picos - equity) / picos).max()) if len(equity) else 0.0
+    return {
+        'operaciones': len(operaciones),
+        'ganadoras': int((pnl > 0).sum()),
+        'tasa_acierto': float((pnl > 0).mean()) if len(pnl) else 0.0,
+        'pnl': float(pnl.sum()),
+        'comisiones': comisiones,
+        'equity_final': float(equity[-1]),
+        'retorno_pct': float((equity[-1] / balance_inicial - 1) * 100),
+        'max_drawdown_pct': drawdown * 100
+    }
+
+
+class Backtest:
+    """Ejecuta TradingBot (bot_mejorado4) sin cambios sobre velas grabadas"""
+
+    def __init__(self, mercado, balance=1000.0, paso=None, calentamiento=200, inicio=None, fin=None,
+                 nivel_log=logging.CRITICAL, alineado=False, diario=None):
+        self.mercado = mercado
+        self.balance = balance
+        # Por defecto un paso por punto del camino sintético (4 por vela)
+        self.paso = paso or mercado.intervalo / 4000
+        self.calentamiento = calentamiento
+        self.inicio = inicio
+        self.fin = fin
+        self.nivel_log = nivel_log
+        # Con alineado el bot duerme como en vivo: hasta el cierre de vela o el tick intrabarra
+        self.alineado = alineado
+        self.ciclos = 0
+        self.diario = diario  # Directorio para el diario de decisiones (None: sin diario)
+
+    def ejecutar(self):
+        import bot_mejorado4
+        import estado_cuenta
+        import instantanea_mercado
+        import flujo_velas
+        import registro_instrumentos
+        from diario import DiarioDecisiones
+
+        ts = self.mercado.ts
+        if len(ts) <= self.calentamiento:
+            raise ValueError("No hay suficientes velas para el calentamiento")
+        inicio = self.inicio or ts[self.calentamiento] / 1000
+        fin = self.fin or (ts[-1] + self.mercado.intervalo) / 1000
+
+        reloj = RelojSimulado(inicio)
+        cliente = ClienteSimulado(reloj, [self.mercado], self.balance)
+        modulos = [bot_mejorado4, estado_cuenta, instantanea_mercado, flujo_velas, registro_instrumentos]
+        curva = []
+        diario = DiarioDecisiones(self.diario) if self.diario else None
+
+        logging.disable(self.nivel_log)
+        try:
+            with reloj_simulado(reloj, modulos):
+                registro = registro_instrumentos.RegistroInstrumentos(cliente, ruta=None)
+                registro.cargar()
+                bot = bot_mejorado4.TradingBot(self.mercado.symbol, client=cliente, registro=registro,
+                                               timeframe=self.mercado.timeframe)
+                if diario is not None:
+                    diario.iniciar()
+                    bot.diario = diario
+
+                # Mismo ciclo que TradingBot.run, con el reloj simulado
+                while reloj.time() < fin:
+                    bot.ciclo()
+                    self.ciclos += 1
+                    reloj.sleep(bot.espera_siguiente_ciclo() if self.alineado else self.paso)
+                    cliente.avanzar()
+                    curva.append((reloj.time(), cliente.equity()))
+        finally:
+            logging.disable(logging.NOTSET)
+            if diario is not None:
+                diario.detener()
+
+        curva = np.array(curva) if curva else np.zeros((0, 2))
+        resumen = resumir(cliente.operaciones, curva, self.balance, cliente.comisiones)
+        return ResultadoBacktest(cliente.operaciones, curva, resumen)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest de TradingBot sobre velas grabadas")
+    parser.add_argument('velas', nargs='?', help="CSV timestamp,open,high,low,close,volume[,turnover]")
+    parser.add_argument('--almacen', help="Directorio de AlmacenVelas en lugar del CSV")
+    parser.add_argument('--symbol', default='OMUSDT')
+    parser.add_argument('--interval', default='5')
+    parser.add_argument('--tickers', help="CSV timestamp,lastPrice con tickers grabados")
+    parser.add_argument('--tick-size', default='0.0001')
+    parser.add_argument('--qty-step', default='1')
+    parser.add_argument('--balance', type=float, default=1000.0)
+    parser.add_argument('--paso', type=float, help="Segundos simulados entre iteraciones (por defecto 1/4 de vela)")
+    parser.add_argument('--diario', help="Directorio donde guardar el diario de decisiones")
+    parser.add_argument('--metricas', action='store_true', help="Mostrar latencias por etapa del bucle")
+    parser.add_argument('--alineado', action='store_true',
+                        help="Evaluar al cierre de cada vela y con ticks intrabarra cerca de las bandas, como en vivo")
+    args = parser.parse_args()
+
+    tickers = cargar_tickers_csv(args.tickers) if args.tickers else None
+    mercado = MercadoSimulado(args.symbol, cargar_velas(args), args.interval,
+                              args.tick_size, args.qty_step, tickers)
+    inicio = time.perf_counter()
+    backtest = Backtest(mercado, args.balance, args.paso, alineado=args.alineado, diario=args.diario)
+    resultado = backtest.ejecutar()
+    for clave, valor in resultado.resumen.items():
+        print(f"{clave:>18}: {valor:.4f}" if isinstance(valor, float) else f"{clave:>18}: {valor}")
+    print(f"{'ciclos':>18}: {backtest.ciclos}")
+    print(f"{'tiempo_real_s':>18}: {time.perf_counter() - inicio:.2f}")
+    if args.metricas:
+        from metricas import metricas
+        for nombre, datos in metricas.resumen().items():
+            print(f"{nombre:>18}: n={datos['n']} p50={datos['p50_ms'] * 1000:.1f}us "
+                  f"p99={datos['p99_ms'] * 1000:.1f}us max={datos['max_ms'] * 1000:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
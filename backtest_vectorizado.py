@@ -0,0 +1,227 @@
+"""Backtest vectorizado con NumPy de la estrategia Bollinger/ATR de bot_mejorado4
+
+Calcula las reglas de entrada sobre todo el histórico en una pasada y
+resuelve las salidas por TP/SL con operaciones de arrays, sin bucle por
+vela. Pensado para bucles de optimización; para reproducir el bot tal cual
+(órdenes PostOnly, velas en curso, saldo real) usar backtest.py.
+
+Uso:
+    python backtest_vectorizado.py velas.csv --interval 1
+"""
+from collections import namedtuple
+import argparse
+import math
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Mismos valores por defecto que bot_mejorado4
+RISK_PERCENT = 1
+TP_MULTIPLIER = 2
+VOLATILITY_THRESHOLD = 0.5
+COOLDOWN_PERIOD = 300
+
+COMISION_MAKER = 0.0002
+COMISION_TAKER = 0.00055
+BLOQUE = 65536  # Filas por bloque al calcular ventanas deslizantes
+
+Senales = namedtuple('Senales', ['indices', 'lados', 'entradas', 'stops', 'objetivos'])
+Salidas = namedtuple('Salidas', ['indices', 'precios'])
+
+
+def media_desviacion(valores, ventana):
+    """Media y desviación estándar (ddof=1) móviles, por bloques para acotar memoria"""
+    valores = np.asarray(valores, dtype=np.float64)
+    media = np.full(len(valores), np.nan)
+    std = np.full(len(valores), np.nan)
+    for inicio in range(0, max(len(valores) - ventana + 1, 0), BLOQUE):
+        fin = min(inicio + BLOQUE + ventana - 1, len(valores))
+        ventanas = sliding_window_view(valores[inicio:fin], ventana)
+        media[inicio + ventana - 1:fin] = ventanas.mean(axis=1)
+        std[inicio + ventana - 1:fin] = ventanas.std(axis=1, ddof=1)
+    return media, std
+
+
+def bandas_bollinger(close, ventana=20, desviacion=2):
+    media, std = media_desviacion(close, ventana)
+    return media, media + std * desviacion, media - std * desviacion
+
+
+def atr_sma(high, low, close, period=14):
+    """ATR con media simple del true range, igual que calcular_atr"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    tr = high - low
+    tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1])))
+    atr = np.full(len(tr), np.nan)
+    if len(tr) >= period:
+        atr[period - 1:] = np.convolve(tr, np.full(period, 1.0 / period), mode='valid')
+    return atr
+
+
+def calcular_senales(high, low, close, ventana=20, desviacion=2, period=14,
+                     tp_multiplier=TP_MULTIPLIER, volatility_threshold=VOLATILITY_THRESHOLD):
+    """Entradas de bot_mejorado4: cruce de banda, filtro de volatilidad y stop a un ATR"""
+    close = np.asarray(close, dtype=np.float64)
+    media, superior, inferior = bandas_bollinger(close, ventana, desviacion)
+    atr = atr_sma(high, low, close, period)
+    return senales_desde_indicadores(close, media, superior, inferior, atr, tp_multiplier, volatility_threshold)
+
+
+def senales_desde_indicadores(close, media, superior, inferior, atr,
+                              tp_multiplier=TP_MULTIPLIER, volatility_threshold=VOLATILITY_THRESHOLD):
+    """Reglas de entrada sobre indicadores ya calculados (reutilizables entre combinaciones)"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        volatil = (superior - inferior) / media >= volatility_threshold / 100
+        valido = volatil & (atr > 0)
+        compra = np.zeros(len(close), dtype=bool)
+        venta = np.zeros(len(close), dtype=bool)
+        compra[1:] = valido[1:] & (close[1:] < inferior[1:]) & (close[:-1] > inferior[:-1])
+        venta[1:] = valido[1:] & ~compra[1:] & (close[1:] > superior[1:]) & (close[:-1] < superior[:-1])
+
+    indices = np.flatnonzero(compra | venta)
+    lados = np.where(compra[indices], 1, -1)
+    entradas = close[indices]
+    stops = entradas - lados * atr[indices]
+    objetivos = entradas + (entradas - stops) * tp_multiplier
+    return Senales(indices, lados, entradas, stops, objetivos)
+
+
+def resolver_salidas(senales, high, low, close, horizonte=256):
+    """Primera vela posterior que toca TP o SL para cada entrada
+
+    Se compara un bloque de `horizonte` velas por entrada a la vez; las que no
+    se resuelven pasan al bloque siguiente. Si TP y SL caen en la misma vela
+    se asume el SL. Las que llegan al final del histórico cierran al último cierre.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = len(high)
+    indices = np.full(len(senales.indices), n - 1, dtype=np.int64)
+    precios = np.full(len(senales.indices), close[-1] if n else np.nan)
+    pendientes = np.arange(len(senales.indices))
+    desplazamiento = 1
+
+    while len(pendientes) and desplazamiento < n:
+        base = senales.indices[pendientes]
+        ventana = base[:, None] + desplazamiento + np.arange(horizonte)
+        fuera = ventana >= n
+        ventana = np.minimum(ventana, n - 1)
+        largos = (senales.lados[pendientes] == 1)[:, None]
+        objetivo = senales.objetivos[pendientes][:, None]
+        stop = senales.stops[pendientes][:, None]
+
+        toca_tp = np.where(largos, high[ventana] >= objetivo, low[ventana] <= objetivo) & ~fuera
+        toca_sl = np.where(largos, low[ventana] <= stop, high[ventana] >= stop) & ~fuera
+        toca = toca_tp | toca_sl
+        resuelto = toca.any(axis=1)
+
+        fila = np.flatnonzero(resuelto)
+        primera = toca[fila].argmax(axis=1)
+        es_sl = toca_sl[fila, primera]
+        cual = pendientes[fila]
+        indices[cual] = ventana[fila, primera]
+        precios[cual] = np.where(es_sl, senales.stops[cual], senales.objetivos[cual])
+
+        pendientes = pendientes[~resuelto]
+        desplazamiento += horizonte
+
+    return Salidas(indices, precios)
+
+
+def seleccionar_operaciones(entradas, salidas, cooldown_velas=1):
+    """Una posición a la vez y enfriamiento tras cada orden, como el bot en vivo
+
+    El siguiente candidato de cada entrada se calcula vectorizado; después solo
+    se recorre la cadena de operaciones tomadas.
+    """
+    if len(entradas) == 0:
+        return np.zeros(0, dtype=np.int64)
+    libre = np.maximum(salidas, entradas + cooldown_velas - 1)
+    siguiente = np.searchsorted(entradas, libre, side='right')
+    tomadas = []
+    k = 0
+    while k < len(entradas):
+        tomadas.append(k)
+        k = siguiente[k]
+    return np.array(tomadas, dtype=np.int64)
+
+
+def backtest_vectorizado(high, low, close, ventana=20, desviacion=2, period=14,
+                         tp_multiplier=TP_MULTIPLIER, volatility_threshold=VOLATILITY_THRESHOLD,
+                         riesgo_pct=RISK_PERCENT, cooldown_velas=1, balance=1000.0, horizonte=256):
+    """Resultado de la estrategia sobre todo el histórico (en múltiplos de riesgo R)"""
+    senales = calcular_senales(high, low, close, ventana, desviacion, period, tp_multiplier, volatility_threshold)
+    return evaluar_senales(senales, high, low, close, riesgo_pct, cooldown_velas, balance, horizonte)
+
+
+def evaluar_senales(senales, high, low, close, riesgo_pct=RISK_PERCENT, cooldown_velas=1,
+                    balance=1000.0, horizonte=256):
+    """Resolver salidas, aplicar una posición a la vez y calcular métricas"""
+    close = np.asarray(close, dtype=np.float64)
+    salidas = resolver_salidas(senales, high, low, close, horizonte)
+    tomadas = seleccionar_operaciones(senales.indices, salidas.indices, cooldown_velas)
+
+    lados = senales.lados[tomadas]
+    entradas = senales.entradas[tomadas]
+    riesgo = np.abs(entradas - senales.stops[tomadas])
+    precios_salida = salidas.precios[tomadas]
+    comisiones = (entradas * COMISION_MAKER + precios_salida * COMISION_TAKER) / riesgo
+    r = lados * (precios_salida - entradas) / riesgo - comisiones
+
+    equity = balance * np.cumprod(1 + riesgo_pct / 100 * r)
+    curva = np.concatenate([[balance], equity])
+    picos = np.maximum.accumulate(curva)
+    ganancias = r[r > 0].sum()
+    perdidas = -r[r < 0].sum()
+
+    return {
+        'operaciones': len(tomadas),
+        'tasa_acierto': float((r > 0).mean()) if len(r) else 0.0,
+        'r_medio': float(r.mean()) if len(r) else 0.0,
+        'profit_factor': float(ganancias / perdidas) if perdidas > 0 else float('inf') if ganancias > 0 else 0.0,
+        'retorno_pct': float((curva[-1] / balance - 1) * 100),
+        'max_drawdown_pct': float(((picos - curva) / picos).max() * 100),
+        'equity_final': float(curva[-1]),
+        'entradas': senales.indices[tomadas],
+        'salidas': salidas.indices[tomadas],
+        'r': r
+    }
+
+
+def cooldown_en_velas(timeframe, cooldown=COOLDOWN_PERIOD):
+    """Convertir COOLDOWN_PERIOD (segundos) a velas del intervalo dado"""
+    from flujo_velas import intervalo_ms
+    return max(1, math.ceil(cooldown * 1000 / intervalo_ms(timeframe)))
+
+
+def main():
+    from backtest import cargar_velas
+
+    parser = argparse.ArgumentParser(description="Backtest vectorizado de la estrategia Bollinger/ATR")
+    parser.add_argument('velas', nargs='?', help="CSV timestamp,open,high,low,close,volume[,turnover]")
+    parser.add_argument('--almacen', help="Directorio de AlmacenVelas en lugar del CSV")
+    parser.add_argument('--symbol', default='OMUSDT')
+    parser.add_argument('--interval', default='5')
+    parser.add_argument('--balance', type=float, default=1000.0)
+    args = parser.parse_args()
+
+    velas = cargar_velas(args)
+    inicio = time.perf_counter()
+    resultado = backtest_vectorizado(
+        velas['high'], velas['low'], velas['close'],
+        cooldown_velas=cooldown_en_velas(args.interval),
+        balance=args.balance
+    )
+    transcurrido = time.perf_counter() - inicio
+    for clave, valor in resultado.items():
+        if not isinstance(valor, np.ndarray):
+            print(f"{clave:>18}: {valor:.4f}" if isinstance(valor, float) else f"{clave:>18}: {valor}")
+    print(f"{'velas':>18}: {len(velas['close'])}")
+    print(f"{'tiempo_s':>18}: {transcurrido:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Barrido de parámetros de la estrategia en paralelo con un pool de procesos
+
+Las velas se copian una sola vez a memoria compartida y cada proceso las
+lee sin copias; cada combinación se evalúa con backtest_vectorizado y los
+resultados se incorporan a una tabla ordenada según van terminando.
+
+Uso:
+    python barrido_parametros.py velas.csv --interval 1 --modo grid
+    python barrido_parametros.py velas.csv --modo random --n 10000 --param tp_multiplier=1,1.5,2,3
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from functools import lru_cache
+import itertools
+import argparse
+import random
+import heapq
+import math
+import time
+import csv
+import os
+
+import numpy as np
+
+from backtest_vectorizado import (
+    bandas_bollinger, atr_sma, senales_desde_indicadores, evaluar_senales, cooldown_en_velas
+)
+
+# Espacio de búsqueda por defecto: constantes y argumentos por defecto de bot_mejorado4.
+# Los parámetros de indicadores van primero para que las combinaciones consecutivas
+# compartan bandas y ATR en la caché de cada proceso.
+ESPACIO = {
+    'ventana': [14, 20, 30],                            # calcular_bandas_bollinger
+    'desviacion': [1.5, 2, 2.5],
+    'period': [7, 14, 21],                              # calcular_atr
+    'tp_multiplier': [1, 1.5, 2, 2.5, 3],               # TP_MULTIPLIER
+    'volatility_threshold': [0.25, 0.5, 0.75, 1.0],     # VOLATILITY_THRESHOLD
+    'cooldown': [0, 300, 900],                          # COOLDOWN_PERIOD (segundos)
+    'riesgo_pct': [0.5, 1, 2]                           # RISK_PERCENT
+}
+
+COMBINACIONES_POR_TAREA = 16
+METRICAS = ('operaciones', 'tasa_acierto', 'r_medio', 'profit_factor', 'retorno_pct', 'max_drawdown_pct')
+MINIMIZAR = {'max_drawdown_pct'}  # Métricas en las que menos es mejor
+
+# Estado de cada proceso trabajador
+_memoria = None
+_high = _low = _close = None
+_timeframe = '5'
+
+
+def _iniciar_trabajador(nombre, n, timeframe):
+    """Conectar con las velas en memoria compartida (vistas de solo lectura)"""
+    global _memoria, _high, _low, _close, _timeframe
+    _memoria = shared_memory.SharedMemory(name=nombre)
+    datos = np.ndarray((3, n), dtype=np.float64, buffer=_memoria.buf)
+    datos.flags.writeable = False
+    _high, _low, _close = datos
+    _timeframe = timeframe
+
+
+@lru_cache(maxsize=4)
+def _bandas(ventana, desviacion):
+    return bandas_bollinger(_close, ventana, desviacion)
+
+
+@lru_cache(maxsize=4)
+def _atr(period):
+    return atr_sma(_high, _low, _close, period)
+
+
+def evaluar_combinacion(parametros):
+    media, superior, inferior = _bandas(parametros['ventana'], parametros['desviacion'])
+    senales = senales_desde_indicadores(
+        _close, media, superior, inferior, _atr(parametros['period']),
+        parametros['tp_multiplier'], parametros['volatility_threshold']
+    )
+    resultado = evaluar_senales(
+        senales, _high, _low, _close,
+        riesgo_pct=parametros['riesgo_pct'],
+        cooldown_velas=cooldown_en_velas(_timeframe, parametros['cooldown'])
+    )
+    return {clave: resultado[clave] for clave in METRICAS}
+
+
+def evaluar_lote(lote):
+    return [(parametros, evaluar_combinacion(parametros)) for parametros in lote]
+
+
+def combinaciones_grid(espacio):
+    claves = list(espacio)
+    for valores in itertools.product(*(espacio[c] for c in claves)):
+        yield dict(zip(claves, valores))
+
+
+def combinaciones_random(espacio, n, semilla=None):
+    """Muestreo aleatorio sin repetición del mismo espacio"""
+    total = math.prod(len(v) for v in espacio.values())
+    generador = random.Random(semilla)
+    vistas = set()
+    claves = list(espacio)
+    while len(vistas) < min(n, total):
+        valores = tuple(generador.choice(espacio[c]) for c in claves)
+        if valores in vistas:
+            continue
+        vistas.add(valores)
+        yield dict(zip(claves, valores))
+
+
+def _lotes(combinaciones, tamano):
+    iterador = iter(combinaciones)
+    while True:
+        lote = list(itertools.islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+class TablaResultados:
+    """Las mejores N combinaciones según una métrica, actualizada en streaming
+
+    Por defecto se maximiza la métrica, salvo las de MINIMIZAR.
+    """
+
+    def __init__(self, metrica='retorno_pct', top=20, minimo_operaciones=10, minimizar=None):
+        self.metrica = metrica
+        self.minimizar = metrica in MINIMIZAR if minimizar is None else minimizar
+        self.top = top
+        self.minimo_operaciones = minimo_operaciones
+        self.mejores = []
+        self.secuencia = itertools.count()
+        self.evaluadas = 0
+
+    def agregar(self, parametros, metricas):
+        self.evaluadas += 1
+        if metricas['operaciones'] < self.minimo_operaciones:
+            return
+        # El montículo descarta el menor: al minimizar se guarda la métrica con signo cambiado
+        valor = -metricas[self.metrica] if self.minimizar else metricas[self.metrica]
+        entrada = (valor, next(self.secuencia), parametros, metricas)
+        if len(self.mejores) < self.top:
+            heapq.heappush(self.mejores, entrada)
+        else:
+            heapq.heappushpop(self.mejores, entrada)
+
+    def ordenadas(self):
+        return [(p, m) for _, _, p, m in sorted(self.mejores, key=lambda e: (-e[0], e[1]))]
+
+    def imprimir(self):
+        sentido = 'menor' if self.minimizar else 'mayor'
+        print(f"\n{self.evaluadas} combinaciones evaluadas; mejores por {self.metrica} ({sentido} primero):")
+        for posicion, (parametros, metricas) in enumerate(self.ordenadas(), 1):
+            texto_p = ' '.join(f"{k}={v}" for k, v in parametros.items())
+            texto_m = ' '.join(f"{k}={metricas[k]:.3f}" for k in METRICAS)
+            print(f"{posicion:>3}. {texto_m} | {texto_p}")
+
+
+def barrer(high, low, close, combinaciones, timeframe='5', procesos=None, tabla=None,
+           salida=None, intervalo_informe=30):
+    """Evaluar las combinaciones en todos los núcleos; devuelve la TablaResultados"""
+    tabla = tabla or TablaResultados()
+    n = len(close)
+    memoria = shared_memory.SharedMemory(create=True, size=max(3 * n * 8, 1))
+    escritor = None
+    archivo = None
+    try:
+        datos = np.ndarray((3, n), dtype=np.float64, buffer=memoria.buf)
+        datos[0], datos[1], datos[2] = high, low, close
+
+        if salida:
+            archivo = open(salida, 'w', newline='', encoding='utf-8')
+
+        with ProcessPoolExecutor(
+            max_workers=procesos or os.cpu_count(),
+            initializer=_iniciar_trabajador,
+            initargs=(memoria.name, n, timeframe)
+        ) as pool:
+            futuros = [pool.submit(evaluar_lote, lote)
+                       for lote in _lotes(combinaciones, COMBINACIONES_POR_TAREA)]
+            ultimo_informe = time.time()
+            for futuro in as_completed(futuros):
+                for parametros, metricas in futuro.result():
+                    tabla.agregar(parametros, metricas)
+                    if archivo is not None:
+                        if escritor is None:
+                            escritor = csv.DictWriter(archivo, fieldnames=list(parametros) + list(METRICAS))
+                            escritor.writeheader()
+                        escritor.writerow({**parametros, **metricas})
+                if time.time() - ultimo_informe >= intervalo_informe:
+                    tabla.imprimir()
+                    ultimo_informe = time.time()
+    finally:
+        if archivo is not None:
+            archivo.close()
+        memoria.close()
+        memoria.unlink()
+    return tabla
+
+
+def _parsear_param(texto):
+    nombre, valores = texto.split('=', 1)
+    if nombre not in ESPACIO:
+        raise argparse.ArgumentTypeError(f"Parámetro desconocido: {nombre}")
+    return nombre, [int(v) if v.strip().lstrip('-').isdigit() else float(v) for v in valores.split(',')]
+
+
+def main():
+    from backtest import cargar_velas
+
+    parser = argparse.ArgumentParser(description="Barrido de parámetros de la estrategia Bollinger/ATR")
+    parser.add_argument('velas', nargs='?', help="CSV timestamp,open,high,low,close,volume[,turnover]")
+    parser.add_argument('--almacen', help="Directorio de AlmacenVelas en lugar del CSV")
+    parser.add_argument('--symbol', default='OMUSDT')
+    parser.add_argument('--interval', default='5')
+    parser.add_argument('--modo', choices=('grid', 'random'), default='grid')
+    parser.add_argument('--n', type=int, default=1000, help="Combinaciones en modo random")
+    parser.add_argument('--semilla', type=int)
+    parser.add_argument('--param', type=_parsear_param, action='append', default=[],
+                        help="Sustituir valores de un parámetro, p. ej. ventana=10,20,30")
+    parser.add_argument('--procesos', type=int)
+    parser.add_argument('--metrica', choices=METRICAS, default='retorno_pct')
+    parser.add_argument('--minimizar', action='store_true', default=None,
+                        help="Ordenar de menor a mayor (por defecto solo en max_drawdown_pct)")
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--minimo-operaciones', type=int, default=10)
+    parser.add_argument('--salida', help="CSV donde volcar todos los resultados")
+    args = parser.parse_args()
+
+    espacio = {**ESPACIO, **dict(args.param)}
+    if args.modo == 'grid':
+        combinaciones = combinaciones_grid(espacio)
+    else:
+        combinaciones = combinaciones_random(espacio, args.n, args.semilla)
+
+    velas = cargar_velas(args)
+    tabla = TablaResultados(args.metrica, args.top, args.minimo_operaciones, args.minimizar)
+    inicio = time.perf_counter()
+    barrer(velas['high'], velas['low'], velas['close'], combinaciones, args.interval,
+           args.procesos, tabla, args.salida)
+    tabla.imprimir()
+    print(f"\nTiempo total: {time.perf_counter() - inicio:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
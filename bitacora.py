@@ -0,0 +1,244 @@
+"""Logging sin bloqueos: cola, hilo escritor, supresión de repetidos y rotación comprimida
+
+El hilo de trading solo formatea el mensaje y lo deja en una cola acotada; un
+hilo de fondo escribe en disco y consola. Antes de escribir, los mensajes
+idénticos que se repiten dentro de una ventana se agrupan en una sola línea
+"repetido N veces". El fichero rota por tamaño y por tiempo, y las copias
+antiguas se comprimen con gzip en el mismo hilo escritor.
+
+Uso:
+    from bitacora import configurar_logging
+    configurar_logging('trading_bot.log')
+"""
+from logging.handlers import QueueHandler, RotatingFileHandler
+import threading
+import logging
+import atexit
+import queue
+import shutil
+import gzip
+import time
+import os
+
+FORMATO = '%(asctime)s - %(levelname)s - %(message)s'
+MAX_BYTES = 5 * 1024 * 1024    # Tamaño que fuerza la rotación
+COPIAS = 10                    # Ficheros rotados que se conservan (.1.gz ... .10.gz)
+INTERVALO_ROTACION = 86400     # Segundos entre rotaciones por tiempo (0: solo por tamaño)
+VENTANA_REPETIDOS = 300        # Segundos durante los que un mensaje repetido se cuenta en vez de escribirse
+CAPACIDAD_COLA = 10000         # Mensajes en espera antes de descartar (el trading nunca se bloquea)
+
+
+def _nombre_gz(nombre):
+    return nombre + '.gz'
+
+
+def _comprimir(origen, destino):
+    with open(origen, 'rb') as entrada, gzip.open(destino, 'wb') as salida:
+        shutil.copyfileobj(entrada, salida)
+    os.remove(origen)
+
+
+class ManejadorRotativo(RotatingFileHandler):
+    """RotatingFileHandler que además rota cada `intervalo` segundos y comprime las copias"""
+
+    def __init__(self, archivo, max_bytes=MAX_BYTES, copias=COPIAS, intervalo=INTERVALO_ROTACION,
+                 encoding=None):
+        super().__init__(archivo, maxBytes=max_bytes, backupCount=copias, encoding=encoding, delay=True)
+        self.namer = _nombre_gz
+        self.rotator = _comprimir
+        self.intervalo = intervalo
+        inicio = os.path.getmtime(archivo) if os.path.exists(archivo) else time.time()
+        self.proxima = self._siguiente(inicio)
+
+    def _siguiente(self, desde):
+        if not self.intervalo:
+            return float('inf')
+        return (desde // self.intervalo + 1) * self.intervalo
+
+    def shouldRollover(self, record):
+        if record.created >= self.proxima:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        # Un fichero vacío no se rota (la rotación por tiempo podría llegar sin mensajes)
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            super().doRollover()
+        self.proxima = self._siguiente(time.time())
+
+
+class ColaLog(QueueHandler):
+    """QueueHandler que descarta (y cuenta) en lugar de bloquear si la cola está llena"""
+
+    def __init__(self, cola):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class FiltroRepetidos:
+    """Agrupa mensajes idénticos (mismo nivel, logger y texto) dentro de una ventana
+
+    La primera aparición se escribe; las siguientes solo se cuentan. Al
+    cerrarse la ventana se escribe una línea con el total de repeticiones.
+    """
+
+    def __init__(self, ventana=VENTANA_REPETIDOS):
+        self.ventana = ventana
+        self.vistos = {}  # clave -> [inicio de la ventana, repeticiones, último record]
+
+    def filtrar(self, record):
+        """True si el record debe escribirse; devuelve también el resumen pendiente si lo hay"""
+        clave = (record.levelno, record.name, record.getMessage())
+        estado = self.vistos.get(clave)
+        if estado is not None and record.created - estado[0] < self.ventana:
+            estado[1] += 1
+            estado[2] = record
+            return False, None
+        resumen = self._resumen(estado) if estado is not None else None
+        self.vistos[clave] = [record.created, 0, record]
+        return True, resumen
+
+    def vencidos(self, ahora):
+        """Resúmenes de las ventanas cerradas; se olvidan los mensajes que no se repitieron"""
+        resumenes = []
+        for clave, estado in list(self.vistos.items()):
+            if ahora - estado[0] >= self.ventana:
+                del self.vistos[clave]
+                if estado[1]:
+                    resumenes.append(self._resumen(estado))
+        return resumenes
+
+    def pendientes(self):
+        """Resúmenes de todas las ventanas abiertas (al cerrar el escritor)"""
+        resumenes = [self._resumen(estado) for estado in self.vistos.values() if estado[1]]
+        self.vistos.clear()
+        return resumenes
+
+    def _resumen(self, estado):
+        if not estado[1]:
+            return None
+        inicio, repeticiones, ultimo = estado
+        resumen = logging.makeLogRecord(ultimo.__dict__)
+        resumen.msg = (f"{ultimo.getMessage()} (repetido {repeticiones} veces "
+                       f"en {ultimo.created - inicio:.0f}s)")
+        resumen.args = None
+        return resumen
+
+
+class EscritorLog:
+    """Hilo que vacía la cola hacia los manejadores reales aplicando FiltroRepetidos"""
+
+    def __init__(self, cola, manejadores, filtro=None, origen=None):
+        self.cola = cola
+        self.manejadores = manejadores
+        self.filtro = filtro
+        self.origen = origen
+        self.hilo = None
+        self.activo = False
+        self.descartados = 0
+
+    def iniciar(self):
+        self.activo = True
+        self.hilo = threading.Thread(target=self._bucle, name='escritor-log', daemon=True)
+        self.hilo.start()
+
+    def detener(self):
+        if self.hilo is None:
+            return
+        self.activo = False
+        self.hilo.join(timeout=5)
+        self.hilo = None
+        for manejador in self.manejadores:
+            manejador.close()
+
+    def _bucle(self):
+        revision = time.time()
+        while True:
+            try:
+                record = self.cola.get(timeout=1.0)
+            except queue.Empty:
+                record = None
+                if not self.activo:
+                    break
+            if record is not None:
+                self._procesar(record)
+
+            ahora = time.time()
+            if ahora - revision >= 1.0:
+                revision = ahora
+                self._revisar(ahora)
+
+        if self.filtro is not None:
+            for resumen in self.filtro.pendientes():
+                self._escribir(resumen)
+
+    def _procesar(self, record):
+        if self.filtro is None:
+            self._escribir(record)
+            return
+        escribir, resumen = self.filtro.filtrar(record)
+        if resumen is not None:
+            self._escribir(resumen)
+        if escribir:
+            self._escribir(record)
+
+    def _revisar(self, ahora):
+        if self.filtro is not None:
+            for resumen in self.filtro.vencidos(ahora):
+                self._escribir(resumen)
+        descartados = self.origen.descartados if self.origen is not None else 0
+        if descartados > self.descartados:
+            aviso = logging.makeLogRecord({
+                'name': 'root', 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f"Cola de log llena: {descartados - self.descartados} mensajes descartados"
+            })
+            self.descartados = descartados
+            self._escribir(aviso)
+
+    def _escribir(self, record):
+        for manejador in self.manejadores:
+            if record.levelno >= manejador.level:
+                manejador.handle(record)
+
+
+_escritor = None
+
+
+def configurar_logging(archivo='trading_bot.log', nivel=logging.INFO, consola=True, max_bytes=MAX_BYTES,
+                       copias=COPIAS, intervalo_rotacion=INTERVALO_ROTACION, ventana_repetidos=VENTANA_REPETIDOS):
+    """Sustituye los manejadores del logger raíz por la cola y arranca el hilo escritor
+
+    Idempotente: si ya está configurado en el proceso no hace nada.
+    """
+    global _escritor
+    if _escritor is not None:
+        return _escritor
+
+    formato = logging.Formatter(FORMATO)
+    manejadores = []
+    if archivo:
+        manejadores.append(ManejadorRotativo(archivo, max_bytes, copias, intervalo_rotacion))
+    if consola:
+        manejadores.append(logging.StreamHandler())
+    for manejador in manejadores:
+        manejador.setFormatter(formato)
+
+    cola = queue.Queue(CAPACIDAD_COLA)
+    entrada = ColaLog(cola)
+    filtro = FiltroRepetidos(ventana_repetidos) if ventana_repetidos else None
+    _escritor = EscritorLog(cola, manejadores, filtro, entrada)
+    _escritor.iniciar()
+
+    raiz = logging.getLogger()
+    for manejador in list(raiz.handlers):
+        raiz.removeHandler(manejador)
+    raiz.addHandler(entrada)
+    raiz.setLevel(nivel)
+    atexit.register(_escritor.detener)
+    return _escritor
@@ -5,16 +5,10 @@ import math
 import time
 import logging
 from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP, InvalidOperation
+from bitacora import configurar_logging
 
-# Configuración inicial
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('trading_bot.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configuración inicial: cola con hilo escritor, repetidos agrupados y rotación comprimida
+configurar_logging('trading_bot.log')
 
 # Configuración de riesgo
 RISK_PERCENT = 1  # 1% del balance por operación
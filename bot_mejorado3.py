@@ -4,16 +4,10 @@ import numpy as np
 import time
 import logging
 from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from bitacora import configurar_logging
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('trading_bot.log'),
-        logging.StreamHandler()
-    ]
-)
+# Configuración de logging: cola con hilo escritor, repetidos agrupados y rotación comprimida
+configurar_logging('trading_bot.log')
 
 # Parámetros de estrategia
 RISK_PERCENT = 1
@@ -1,73 +1,163 @@
-from pybit.unified_trading import HTTP
-import pandas as pd
+from transporte import ClienteHTTP
 import numpy as np
+import contextlib
 import time
 import logging
-from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
-
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('trading_bot.log'),
-        logging.StreamHandler()
-    ]
-)
+from collections import namedtuple
+from flujo_velas import FlujoVelas, SerieVelas, filas_kline
+from almacen_velas import AlmacenVelas
+from indicadores import BollingerIncremental, ATRIncremental
+from instantanea_mercado import InstantaneaMercado
+from registro_instrumentos import RegistroInstrumentos
+from estado_cuenta import EstadoCuenta
+from precision import Precision, FLOOR, HALF_UP, modo_lado
+from resiliencia import PausaErrores
+from cadencia import CadenciaVelas
+from metricas import metricas, ExportadorMetricas
+from bitacora import configurar_logging
+from diario import DiarioDecisiones, CAMPOS_VELAS
+
+# Configuración de logging: cola con hilo escritor, repetidos agrupados y rotación comprimida
+configurar_logging('trading_bot.log')
 
 # Parámetros estratégicos
 RISK_PERCENT = 1
 TP_MULTIPLIER = 2
 VOLATILITY_THRESHOLD = 0.5
 COOLDOWN_PERIOD = 300
+HOLGURA_CIERRE = 5   # Segundos de retraso de la evaluación del cierre que no cuentan como enfriamiento
 MINIMUM_BALANCE = 1  # Saldo mínimo requerido para operar
+COLA_DIARIO = 50     # Velas más recientes guardadas en cada registro del diario
+
+Evaluacion = namedtuple('Evaluacion', ['decision', 'motivo', 'ratio', 'stop_loss'])
+
+
+def crear_indicadores():
+    """Bollinger y ATR de la estrategia (los mismos en vivo y al reproducir el diario)"""
+    return BollingerIncremental(ventana=20, desviacion=2), ATRIncremental(period=14, suavizado='sma')
+
+
+def evaluar_senal(last_price, bollinger, atr):
+    """Decisión de la estrategia a partir del precio y de los indicadores ya calculados, sin E/S"""
+    if atr <= 0:
+        return Evaluacion(None, 'atr_invalido', 0.0, 0.0)
+
+    # Filtro de volatilidad
+    bandas = bollinger.actual
+    previas = bollinger.anterior
+    volatility_ratio = (bandas.upper - bandas.lower) / bandas.ma
+    if volatility_ratio < (VOLATILITY_THRESHOLD / 100):
+        return Evaluacion(None, 'volatilidad', volatility_ratio, 0.0)
+
+    # Generación de señales
+    if (last_price < bandas.lower and
+            bollinger.cierre_anterior > previas.lower):
+        return Evaluacion('Buy', 'cruce_inferior', volatility_ratio, last_price - atr)
+    if (last_price > bandas.upper and
+            bollinger.cierre_anterior < previas.upper):
+        return Evaluacion('Sell', 'cruce_superior', volatility_ratio, last_price + atr)
+    return Evaluacion(None, 'sin_cruce', volatility_ratio, 0.0)
+
+
+def niveles_orden(precios, side, precio_entrada, stop_loss):
+    """Entrada, take profit y stop loss en ticks enteros de la Rejilla de precios
+
+    La entrada PostOnly se redondea hacia su lado para no cruzar el libro por el redondeo.
+    """
+    precio_limit = precios.unidades(precio_entrada, modo_lado(side))
+    take_profit = precios.unidades(
+        precio_entrada + (precio_entrada - stop_loss) * TP_MULTIPLIER,
+        HALF_UP
+    )
+    return precio_limit, take_profit, precios.unidades(stop_loss, HALF_UP)
+
 
 class TradingBot:
-    def __init__(self):
+    def __init__(self, symbol="OMUSDT", client=None, registro=None, mercado=None, cuenta=None, almacen=None,
+                 timeframe="5"):
         self.api_key = ""
         self.api_secret = ""
-        self.symbol = "OMUSDT"
-        self.timeframe = "5"
+        self.symbol = symbol
+        self.timeframe = str(timeframe)
         self.client = None
-        self.last_trade_time = 0
+        self.last_trade_time = 0  # Momento de la señal de la última orden (no el de su confirmación)
         self.ticksize = 0.0
         self.precision_step = 0.0
         self.scala_precio = 0
-        self.initialize_client()
+        self.espec = None
+        self.precision = None
+        self.flujo = None
+        self.serie = SerieVelas(200)
+        # Componentes compartibles entre bots del mismo proceso (ver motor.py)
+        # (is not None: la instantánea y el registro vacíos son falsos por __len__)
+        self.almacen = almacen if almacen is not None else AlmacenVelas(None)
+        self.mercado = mercado if mercado is not None else InstantaneaMercado(None)
+        self.registro = registro if registro is not None else RegistroInstrumentos(None)
+        self.cuenta = cuenta if cuenta is not None else EstadoCuenta(None, self.api_key, self.api_secret)
+        self.bollinger, self.atr = crear_indicadores()
+        self.diario = None
+        self.cadencia = CadenciaVelas(self.timeframe)
+        if client is not None:
+            self.asignar_cliente(client)
+        else:
+            self.initialize_client()
         self.load_instrument_info()
 
     def initialize_client(self):
-        self.client = HTTP(
+        # Sesión HTTP persistente: se crea una vez y no se reconstruye tras un error
+        self.asignar_cliente(ClienteHTTP(
             api_key=self.api_key,
             api_secret=self.api_secret,
             testnet=False
-        )
+        ))
+
+    def asignar_cliente(self, client):
+        # Cualquier objeto con los métodos de pybit HTTP que usa el bot (p. ej. el simulador)
+        self.client = client
+        self.mercado.client = self.client
+        self.registro.client = self.client
+        self.almacen.client = self.client
+        self.cuenta.client = self.client
+        if self.flujo is not None:
+            self.flujo.client = self.client
+
+    def iniciar_flujo(self):
+        self.iniciar_velas()
+
+        try:
+            self.mercado.suscribir([self.symbol])
+        except Exception as e:
+            logging.error(f"Flujo de tickers no disponible, usando REST: {str(e)}")
+
+        try:
+            self.cuenta.iniciar()
+        except Exception as e:
+            logging.error(f"Flujo privado no disponible, usando REST: {str(e)}")
+            self.cuenta.detener()
+
+    def iniciar_velas(self, ws=None):
+        try:
+            # El histórico persiste en disco: al reiniciar solo se piden las velas que faltan
+            self.flujo = FlujoVelas(self.client, self.symbol, self.timeframe, almacen=self.almacen, ws=ws)
+            self.flujo.buffer.registrar(self.bollinger)
+            self.flujo.buffer.registrar(self.atr)
+            self.flujo.iniciar()
+        except Exception as e:
+            logging.error(f"Flujo de velas no disponible, usando REST: {str(e)}")
+            self.flujo = None
 
     def load_instrument_info(self):
         try:
-            response = self.client.get_instruments_info(
-                category="linear",
-                symbol=self.symbol
-            )
+            # Registro compartido: caché en disco + refresco en segundo plano
+            if not len(self.registro):
+                self.registro.cargar()
+                self.registro.iniciar_refresco()
             
-            if response['retCode'] != 0:
-                raise Exception(f"Error instrumentos: {response['retMsg']}")
-            
-            if not response['result']['list']:
-                raise Exception("Instrumento no encontrado")
-            
-            info = response['result']['list'][0]
-            
-            # Extracción y validación de parámetros
-            self.ticksize = self.safe_float_conversion(
-                info.get('priceFilter', {}).get('tickSize', '0.0')
-            )
-            self.scala_precio = self.safe_int_conversion(
-                info.get('priceScale', '0')
-            )
-            self.precision_step = self.safe_float_conversion(
-                info.get('lotSizeFilter', {}).get('qtyStep', '0.0')
-            )
+            self.espec = self.registro.obtener(self.symbol)
+            self.ticksize = self.espec.tick_size
+            self.scala_precio = self.espec.price_scale
+            self.precision_step = self.espec.qty_step
+            self.precision = Precision(self.espec)
             
             if any(val <= 0 for val in [self.ticksize, self.scala_precio, self.precision_step]):
                 raise Exception("Parámetros del instrumento inválidos")
@@ -90,30 +180,9 @@ class TradingBot:
 
     def get_usdt_balance(self):
         try:
-            response = self.client.get_wallet_balance(
-                accountType="UNIFIED",
-                coin="USDT"
-            )
-            
-            if response['retCode'] != 0:
-                logging.error(f"Error API balance: {response['retMsg']}")
-                return 0.0
-
-            # Validación de estructura de respuesta
-            account_list = response['result'].get('list', [])
-            if not account_list:
-                logging.warning("Estructura de cuenta no válida")
-                return 0.0
-                
-            coin_list = account_list[0].get('coin', [])
-            if not coin_list:
-                logging.warning("No se encontraron monedas en la cuenta")
-                return 0.0
-                
-            usdt_data = next(
-                (item for item in coin_list if item.get('coin') == 'USDT'),
-                None
-            )
+            # Cartera local alimentada por el flujo privado
+            self.cuenta.sincronizar()
+            usdt_data = self.cuenta.moneda('USDT')
             
             if not usdt_data:
                 logging.warning("USDT no encontrado en el balance")
@@ -133,6 +202,14 @@ class TradingBot:
             return 0.0
 
     def obtener_datos_historicos(self, limit=200):
+        """SerieVelas de la más antigua a la más reciente, o None si no hay datos"""
+        if self.flujo is not None:
+            try:
+                return self.flujo.datos()
+            except Exception as e:
+                logging.error(f"Error en flujo de velas: {str(e)}")
+                return None
+
         try:
             response = self.client.get_kline(
                 symbol=self.symbol,
@@ -142,65 +219,50 @@ class TradingBot:
             
             if response['retCode'] != 0:
                 logging.error(f"Error histórico: {response['retMsg']}")
-                return pd.DataFrame()
+                return None
 
             raw_data = response['result'].get('list', [])
             if not raw_data:
                 logging.warning("Datos históricos vacíos")
-                return pd.DataFrame()
+                return None
 
-            # Procesamiento seguro de datos
-            data = pd.DataFrame(raw_data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover'
-            ])
-            
-            # Conversión de tipos con validación
-            data['timestamp'] = pd.to_datetime(
-                pd.to_numeric(data['timestamp'], errors='coerce'), 
-                unit='ms'
-            )
-            
-            numeric_cols = ['open', 'high', 'low', 'close']
-            for col in numeric_cols:
-                data[col] = pd.to_numeric(data[col], errors='coerce')
-                
-            return data.iloc[::-1].dropna()
+            # Se reutilizan los mismos arrays en cada ciclo
+            if self.serie.capacidad < limit:
+                self.serie = SerieVelas(limit)
+            with metricas.medir('etapa.parseo'):
+                self.serie.cargar(filas_kline(raw_data))
+            return self.serie
 
         except Exception as e:
             logging.error(f"Error procesando datos: {str(e)}")
-            return pd.DataFrame()
+            return None
 
-    def calcular_bandas_bollinger(self, data, ventana=20, desviacion=2):
+    def lectura_indicadores(self):
+        """Lock del buffer de velas: el hilo del WebSocket lo mantiene mientras actualiza los indicadores"""
+        flujo = self.flujo
+        return flujo.buffer.lock if flujo is not None else contextlib.nullcontext()
+
+    def calcular_bandas_bollinger(self, data):
         try:
-            data['MA'] = data['close'].rolling(ventana).mean()
-            data['STD'] = data['close'].rolling(ventana).std()
-            data['Upper'] = data['MA'] + (data['STD'] * desviacion)
-            data['Lower'] = data['MA'] - (data['STD'] * desviacion)
-            return data.iloc[-1]
+            # Con flujo activo las bandas ya se actualizan con cada vela recibida
+            if self.flujo is None:
+                self.bollinger.sembrar(data['close'])
+            if not self.bollinger.listo:
+                return None
+            return self.bollinger.instantanea()
         except Exception as e:
             logging.error(f"Error cálculo Bollinger: {str(e)}")
             return None
 
-    def calcular_atr(self, data, period=14):
+    def calcular_atr(self, data):
         try:
-            high_low = data['high'] - data['low']
-            high_close = np.abs(data['high'] - data['close'].shift())
-            low_close = np.abs(data['low'] - data['close'].shift())
-            tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-            return tr.rolling(period).mean().iloc[-1]
+            if self.flujo is None:
+                self.atr.sembrar(data['high'], data['low'], data['close'])
+            return self.atr.actual if self.atr.listo else 0.0
         except Exception as e:
             logging.error(f"Error cálculo ATR: {str(e)}")
             return 0.0
 
-    def calcular_precision(self, value, step):
-        try:
-            value_dec = Decimal(str(value))
-            step_dec = Decimal(str(step))
-            return float(value_dec.quantize(step_dec, rounding=ROUND_HALF_UP))
-        except:
-            logging.error("Error en precisión numérica")
-            return 0.0
-
     def size_posicion(self, precio, stop_loss):
         try:
             balance = self.get_usdt_balance()
@@ -218,150 +280,205 @@ class TradingBot:
                 logging.error(f"Diferencia precio/SL menor que tick size ({self.ticksize})")
                 return 0.0
                 
-            return max(
-                self.calcular_precision(riesgo_usdt / diferencia, self.precision_step),
-                0.0
-            )
+            # Pasos de qtyStep completos: nunca se arriesga más de lo previsto
+            unidades = max(self.precision.cantidad.unidades(riesgo_usdt / diferencia, FLOOR), 0)
+            if unidades < self.precision.min_qty:
+                logging.warning(f"Tamaño {self.precision.cantidad.texto(unidades)} por debajo del mínimo "
+                                f"({self.precision.cantidad.texto(self.precision.min_qty)})")
+                return 0
+            return unidades
             
         except Exception as e:
             logging.error(f"Error cálculo tamaño posición: {str(e)}")
             return 0.0
 
-    def gestionar_orden(self, side, precio_entrada, stop_loss):
+    def gestionar_orden(self, side, precio_entrada, stop_loss, marca_senal=None, t_senal=None):
         try:
             # Validación estricta de parámetros
             if any(not isinstance(x, (int, float)) or x <= 0 
                    for x in [precio_entrada, stop_loss]):
                 raise ValueError("Precios inválidos")
                 
-            size = self.size_posicion(precio_entrada, stop_loss)
+            with metricas.medir('etapa.tamano'):
+                size = self.size_posicion(precio_entrada, stop_loss)
             if size <= 0:
                 logging.warning("Tamaño de posición inválido, omitiendo orden")
                 return
                 
-            # Cálculo de niveles con validación
-            precio_limit = self.calcular_precision(precio_entrada, self.ticksize)
-            take_profit = self.calcular_precision(
-                precio_entrada + (precio_entrada - stop_loss) * TP_MULTIPLIER,
-                self.ticksize
-            )
-            stop_loss = self.calcular_precision(stop_loss, self.ticksize)
+            # Niveles en ticks enteros
+            precios = self.precision.precio
+            precio_limit, take_profit, stop_loss = niveles_orden(precios, side, precio_entrada, stop_loss)
             
             # Validación final de niveles
             if any(val <= 0 for val in [precio_limit, take_profit, stop_loss]):
                 raise ValueError("Niveles de orden inválidos")
                 
             # Envío de orden
-            order = self.client.place_order(
+            payload = dict(
                 category="linear",
                 symbol=self.symbol,
                 side=side,
                 orderType="Limit",
-                qty=str(round(size, 8)),
-                price=str(precio_limit),
-                takeProfit=str(take_profit),
-                stopLoss=str(stop_loss),
+                qty=self.precision.cantidad.texto(size),
+                price=precios.texto(precio_limit),
+                takeProfit=precios.texto(take_profit),
+                stopLoss=precios.texto(stop_loss),
                 positionIdx=0,
                 timeInForce="PostOnly"
             )
+            with metricas.medir('etapa.orden'):
+                order = self.client.place_order(**payload)
             
             if order['retCode'] == 0:
-                self.last_trade_time = time.time()
+                # Hora de la señal, no del ack: el ack llega segundos después del cierre
+                self.last_trade_time = t_senal if t_senal is not None else time.time()
+                if marca_senal is not None:
+                    # De la detección del cruce a la confirmación de la orden
+                    metricas.desde('senal_a_ack', marca_senal)
                 logging.info(f"Orden exitosa - ID: {order['result']['orderId']}")
             else:
                 logging.error(f"Error en orden: {order['retMsg']}")
+            return payload, order
                 
         except Exception as e:
             logging.error(f"Error gestión de orden: {str(e)}")
 
+    def en_enfriamiento(self, ahora):
+        """True si no ha pasado COOLDOWN_PERIOD desde la señal de la última orden
+
+        Se exigen las dos cosas: COOLDOWN_PERIOD entre las aperturas de vela (como
+        cooldown_en_velas del backtest vectorizado) y entre la señal y ahora. En
+        el segundo caso se descuentan el desfase del cierre y HOLGURA_CIERRE,
+        para que una orden enviada al cierre no haga perder el cierre siguiente;
+        una orden intrabarra sí espera el periodo completo.
+        """
+        velas = self.cadencia.inicio_vela(ahora) - self.cadencia.inicio_vela(self.last_trade_time)
+        holgura = self.cadencia.desfase + HOLGURA_CIERRE
+        return velas < COOLDOWN_PERIOD or ahora - self.last_trade_time < COOLDOWN_PERIOD - holgura
+
     def ejecutar_estrategia(self):
-        if time.time() - self.last_trade_time < COOLDOWN_PERIOD:
+        ahora = time.time()
+        if self.en_enfriamiento(ahora):
             return
             
         try:
             # Obtención y validación de datos
-            data = self.obtener_datos_historicos()
-            if len(data) < 50 or data.empty:
+            with metricas.medir('etapa.datos'):
+                data = self.obtener_datos_historicos()
+            if data is None or len(data) < 50:
                 logging.warning("Datos insuficientes para análisis")
                 return
                 
-            # Obtención de precio actual
-            ticker = self.client.get_tickers(category='linear', symbol=self.symbol)
-            if ticker['retCode'] != 0:
-                logging.error(f"Error ticker: {ticker['retMsg']}")
-                return
-                
-            if not ticker['result']['list']:
-                logging.error("Datos de precio vacíos")
-                return
-                
-            last_price = self.safe_float_conversion(
-                ticker['result']['list'][0].get('lastPrice', '0'))
+            # Obtención de precio actual desde la instantánea de mercado
+            with metricas.medir('etapa.precio'):
+                last_price = self.mercado.precio(self.symbol)
             
             if last_price <= 0:
                 raise ValueError("Precio actual inválido")
             
-            # Cálculo de indicadores
-            bollinger = self.calcular_bandas_bollinger(data)
+            # Instantánea de los indicadores: nunca una vela a medio cerrar
+            with metricas.medir('etapa.indicadores'), self.lectura_indicadores():
+                if self.flujo is not None:
+                    # Velas de la misma lectura que los indicadores: el diario las guarda juntas
+                    data = self.flujo.copiar_serie()
+                bollinger = self.calcular_bandas_bollinger(data)
+                atr = self.calcular_atr(data) if bollinger is not None else 0.0
             if bollinger is None:
                 return
                 
-            atr = self.calcular_atr(data)
-            if atr <= 0:
+            evaluacion = evaluar_senal(last_price, bollinger, atr)
+            orden = None
+            if evaluacion.motivo == 'atr_invalido':
                 logging.warning("ATR no válido, omitiendo señal")
-                return
-                
-            # Filtro de volatilidad
-            volatility_ratio = (bollinger['Upper'] - bollinger['Lower']) / bollinger['MA']
-            if volatility_ratio < (VOLATILITY_THRESHOLD / 100):
+            elif evaluacion.motivo == 'volatilidad':
                 logging.info("Volatilidad por debajo del umbral requerido")
-                return
-                
-            # Generación de señales
-            if (last_price < bollinger['Lower'] and 
-                data['close'].iloc[-2] > data['Lower'].iloc[-2]):
-                self.gestionar_orden('Buy', last_price, last_price - atr)
-                
-            elif (last_price > bollinger['Upper'] and 
-                  data['close'].iloc[-2] < data['Upper'].iloc[-2]):
-                self.gestionar_orden('Sell', last_price, last_price + atr)
+            elif evaluacion.decision is not None:
+                orden = self.gestionar_orden(evaluacion.decision, last_price, evaluacion.stop_loss, metricas.marca(),
+                                             ahora)
+
+            if self.diario is not None:
+                self.diario.anotar(self.registro_decision(data, last_price, bollinger, atr, evaluacion, orden))
                 
         except Exception as e:
             logging.error(f"Error en ejecución de estrategia: {str(e)}")
 
+    def registro_decision(self, data, last_price, bollinger, atr, evaluacion, orden):
+        """Entradas y resultado de una evaluación para el diario (copia: la serie se reutiliza)"""
+        cola = slice(-COLA_DIARIO, None)
+        velas = np.column_stack([data[campo][cola] for campo in CAMPOS_VELAS])
+        payload, respuesta = orden if orden is not None else (None, None)
+        return {
+            'v': 1,
+            't': time.time(),
+            'symbol': self.symbol,
+            'timeframe': self.timeframe,
+            'tick_size': self.ticksize,
+            'velas': velas.astype(np.float64).tobytes(),
+            'precio': float(last_price),
+            'bandas': [float(x) for x in bollinger.actual],
+            'previas': [float(x) for x in bollinger.anterior],
+            'cierre_anterior': float(bollinger.cierre_anterior),
+            'atr': float(atr),
+            'ratio': float(evaluacion.ratio),
+            'decision': evaluacion.decision,
+            'motivo': evaluacion.motivo,
+            'stop_loss': float(evaluacion.stop_loss),
+            'orden': payload,
+            'respuesta': None if respuesta is None else {
+                'retCode': respuesta.get('retCode'),
+                'retMsg': respuesta.get('retMsg'),
+                'orderId': (respuesta.get('result') or {}).get('orderId')
+            }
+        }
+
     def monitorear_posiciones(self):
         try:
-            positions = self.client.get_positions(
-                category="linear",
-                symbol=self.symbol
-            )
-            
-            if positions['retCode'] != 0:
-                logging.error(f"Error consultando posiciones: {positions['retMsg']}")
-                return False
-                
-            if positions['result']['list']:
-                size = self.safe_float_conversion(
-                    positions['result']['list'][0]['size']
-                )
-                return size > 0
-            return False
+            # Posiciones locales; REST solo para reconciliar
+            self.cuenta.sincronizar()
+            return self.cuenta.tamano_posicion(self.symbol) > 0
             
         except Exception as e:
             logging.error(f"Error en monitoreo: {str(e)}")
             return False
 
+    def ciclo(self):
+        with metricas.medir('etapa.ciclo'):
+            if not self.monitorear_posiciones():
+                self.ejecutar_estrategia()
+
+    def espera_siguiente_ciclo(self):
+        """Segundos hasta el próximo cierre de vela, o hasta el próximo tick intrabarra
+        si el precio está cerca de una banda y puede haber señal antes del cierre"""
+        cerca = False
+        try:
+            with self.lectura_indicadores():
+                bandas = self.bollinger.actual
+            if (bandas is not None and
+                    not self.en_enfriamiento(time.time()) and
+                    self.cuenta.tamano_posicion(self.symbol) <= 0):
+                cerca = self.cadencia.cerca_de_banda(self.mercado.precio(self.symbol), bandas)
+        except Exception as e:
+            logging.error(f"Error evaluando cercanía a bandas: {str(e)}")
+        return self.cadencia.espera(time.time(), cerca)
+
     def run(self):
         logging.info("Iniciando bot de trading...")
+        ExportadorMetricas().iniciar()
+        if self.diario is None:
+            self.diario = DiarioDecisiones()
+            self.diario.iniciar()
+        self.iniciar_flujo()
+        pausa = PausaErrores(normal=10)
         while True:
             try:
-                if not self.monitorear_posiciones():
-                    self.ejecutar_estrategia()
-                time.sleep(10)
+                self.ciclo()
+                pausa.exito()
+                time.sleep(self.espera_siguiente_ciclo())
             except Exception as e:
-                logging.error(f"Error general del sistema: {str(e)}")
-                time.sleep(60)
-                self.initialize_client()
+                # Backoff con jitter; con el circuito abierto, hasta la próxima sonda
+                espera = pausa.error(e)
+                logging.error(f"Error general del sistema: {str(e)}. Reintento en {espera:.1f}s")
+                time.sleep(espera)
 
 if __name__ == "__main__":
     bot = TradingBot()
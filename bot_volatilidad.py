@@ -1,8 +1,9 @@
-from pybit.unified_trading import HTTP
+from transporte import ClienteHTTP
 import pandas as pd
-import math
-from decimal import Decimal, ROUND_DOWN, ROUND_FLOOR
 import time
+from precision import rejilla, FLOOR
+from resiliencia import PausaErrores
+from indicadores import ATRIncremental
 
 # Configuracion de la API
 api_key= input("por favor ingrese api key ")
@@ -15,7 +16,7 @@ tp_porcent = 0.5  # Take profit porcentaje
 sl_porcent = 1  # Stop loss porcentaje
 volatility_threshold = 0.005  # Umbral mínimo de volatilidad (0.5%)
 
-client = HTTP(api_key=api_key, api_secret=api_secret, testnet=False)
+client = ClienteHTTP(api_key=api_key, api_secret=api_secret, testnet=False)
 
 # Datos de la moneda precio y pasos.
 step = client.get_instruments_info(category="linear", symbol=symbol)
@@ -37,18 +38,9 @@ def obtener_datos_historicos(symbol, interval, limite=200):
 
 def calcular_atr(data, period=14):
     """Calcular el Average True Range (ATR) como medida de volatilidad"""
-    high = data[2]
-    low = data[3]
-    close = data[4]
-    
-    tr = pd.DataFrame()
-    tr['h-l'] = high - low
-    tr['h-pc'] = abs(high - close.shift(1))
-    tr['l-pc'] = abs(low - close.shift(1))
-    tr['tr'] = tr.max(axis=1)
-    
-    atr = tr['tr'].rolling(period).mean()
-    return atr.iloc[-1]
+    atr = ATRIncremental(period)
+    atr.sembrar(data[2].to_numpy(), data[3].to_numpy(), data[4].to_numpy())
+    return atr.actual if atr.listo else float('nan')
 
 def calcular_bandas_bollinger(data, ventana=20, desviacion=2):
     data['MA'] = data[4].rolling(window=ventana).mean()
@@ -57,17 +49,12 @@ def calcular_bandas_bollinger(data, ventana=20, desviacion=2):
     return data.iloc[-1]
 
 def qty_precision(qty, precision):
-    qty = math.floor(qty / precision) * precision
-    return qty
+    """Cantidad redondeada hacia abajo al qtyStep, como texto exacto para la orden"""
+    return rejilla(precision).formatear(qty, FLOOR)
 
 def qty_step(price):
-    precision = Decimal(f"{10 ** scala_precio}")
-    tickdec = Decimal(f"{ticksize}")
-    precio_final = (Decimal(f"{price}") * precision) / precision
-    precide = precio_final.quantize(Decimal(f"{1 / precision}"), rounding=ROUND_FLOOR)
-    operaciondec = (precide / tickdec).quantize(Decimal('1'), rounding=ROUND_FLOOR) * tickdec
-    result = float(operaciondec)
-    return result
+    """Precio redondeado hacia abajo al tickSize (ya es múltiplo de la escala de precio)"""
+    return rejilla(ticksize).formatear(price, FLOOR)
 
 def crear_orden(symbol, side, order_type, qty):
     response = client.place_order(
@@ -107,6 +94,7 @@ def establecer_take_profit(symbol, tp, side, qty):
 stop = False
 tipo = ""
 qty = 0
+pausa = PausaErrores()
 while True:
     try:
         posiciones = client.get_positions(category="linear", symbol=symbol)
@@ -149,8 +137,6 @@ while True:
                     precision = precision_step
                     qty = usdt / precio
                     qty = qty_precision(qty, precision)
-                    if qty.is_integer():
-                        qty = int(qty)
                     print(f"Cantidad de monedas: {str(qty)} (Volatilidad: {atr_percentage*100:.2f}%)")
                     if tipo == "long" or tipo == "":
                         crear_orden(symbol,"Sell", "Market", qty)
@@ -160,8 +146,6 @@ while True:
                     precision = precision_step
                     qty = usdt / precio
                     qty = qty_precision(qty, precision)
-                    if qty.is_integer():
-                        qty = int(qty)
                     print(f"Cantidad de monedas: {str(qty)} (Volatilidad: {atr_percentage*100:.2f}%)")
                     if tipo == "short" or tipo == "":
                         crear_orden(symbol,"Buy", "Market", qty)
@@ -171,6 +155,8 @@ while True:
             else:
                 print(f"Volatilidad demasiado baja ({atr_percentage*100:.2f}%), no se realizan operaciones.")
                 
+        pausa.exito()
     except Exception as e:
-        print(f"Error en el bot: {e}")
-        time.sleep(60)
\ No newline at end of file
+        espera = pausa.error(e)
+        print(f"Error en el bot: {e}. Reintento en {espera:.1f}s")
+        time.sleep(espera)
\ No newline at end of file
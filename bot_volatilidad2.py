@@ -1,8 +1,12 @@
-from pybit.unified_trading import HTTP
-import pandas as pd
-import math
-from decimal import Decimal, ROUND_DOWN, ROUND_FLOOR
+from transporte import ClienteHTTP
 import time
+from precision import rejilla, FLOOR
+from resiliencia import PausaErrores
+from indicadores import BollingerIncremental, ATRIncremental
+from flujo_velas import SerieVelas, filas_kline
+from escaner import Escaner, MAX_CONCURRENCIA
+from instantanea_mercado import InstantaneaMercado
+from registro_instrumentos import RegistroInstrumentos
 
 # Configuración de la API
 api_key= input("por favor ingrese api key ")
@@ -20,89 +24,85 @@ cryptos = [
     "XRPUSDT", "ADAUSDT", "DOGEUSDT", "DOTUSDT",
     "WLDUSDT", "AVAXUSDT", "1000BONKUSDT"
 ]
+max_concurrencia = MAX_CONCURRENCIA  # Símbolos evaluados a la vez
 
-client = HTTP(api_key=api_key, api_secret=api_secret, testnet=False)
+client = ClienteHTTP(api_key=api_key, api_secret=api_secret, testnet=False)
+escaner = Escaner(max_concurrencia)
+mercado = InstantaneaMercado(client, max_edad=60)  # Se refresca una vez por escaneo
+registro = RegistroInstrumentos(client)
+registro.cargar()
+registro.iniciar_refresco()
+series = {}  # Una SerieVelas por símbolo, reutilizada en cada escaneo
 
 def obtener_datos_historicos(symbol, interval, limite=200):
     """Obtener datos de las velas"""
     response = client.get_kline(symbol=symbol, interval=interval, limit=limite)
     if "result" in response:
-        data = pd.DataFrame(response['result']['list']).astype(float)
-        data[0] = pd.to_datetime(data[0], unit='ms')
-        data.set_index(0, inplace=True)
-        data = data[::-1].reset_index(drop=True)
-        return data
+        serie = series.setdefault(symbol, SerieVelas(limite))
+        serie.cargar(filas_kline(response['result']['list']))
+        return serie
     else:
         raise Exception(f"Error al obtener datos históricos para {symbol}: " + str(response))
 
 def calcular_atr(data, period=14):
     """Calcular el Average True Range (ATR) como medida de volatilidad"""
-    high = data[2]
-    low = data[3]
-    close = data[4]
-    
-    tr = pd.DataFrame()
-    tr['h-l'] = high - low
-    tr['h-pc'] = abs(high - close.shift(1))
-    tr['l-pc'] = abs(low - close.shift(1))
-    tr['tr'] = tr.max(axis=1)
-    
-    atr = tr['tr'].rolling(period).mean()
-    return atr.iloc[-1]
+    atr = ATRIncremental(period)
+    atr.sembrar(data['high'], data['low'], data['close'])
+    return atr.actual if atr.listo else float('nan')
 
 def calcular_bandas_bollinger(data, ventana=20, desviacion=2):
-    """Calcular bandas de Bollinger"""
-    data['MA'] = data[4].rolling(window=ventana).mean()
-    data['UpperBand'] = data['MA'] + (data[4].rolling(window=ventana).std() * desviacion)
-    data['LowerBand'] = data['MA'] - (data[4].rolling(window=ventana).std() * desviacion)
-    return data.iloc[-1]
+    """Calcular bandas de Bollinger de la última vela (None si no hay velas suficientes)"""
+    bollinger = BollingerIncremental(ventana, desviacion)
+    bollinger.sembrar(data['close'])
+    return bollinger.actual if bollinger.listo else None
 
-def evaluar_criptomonedas():
-    """Evaluar todas las criptomonedas y devolver la mejor oportunidad"""
-    oportunidades = []
-    
-    for symbol in cryptos:
-        try:
-            # Obtener datos y configuración del símbolo
-            step = client.get_instruments_info(category="linear", symbol=symbol)
-            if not step['result']['list']:
-                continue
-                
-            ticksize = float(step['result']['list'][0]['priceFilter']['tickSize'])
-            scala_precio = int(step['result']['list'][0]["priceScale"])
-            precision_step = float(step['result']['list'][0]["lotSizeFilter"]["qtyStep"])
-            
-            # Obtener datos históricos
-            data = obtener_datos_historicos(symbol, timeframe)
-            current_price = float(client.get_tickers(category='linear', symbol=symbol)['result']['list'][0]['lastPrice'])
+def evaluar_simbolo(symbol):
+    """Evaluar una criptomoneda y devolver su oportunidad, o None si no cumple los criterios"""
+    try:
+        # Configuración del símbolo desde el registro local
+        espec = registro.obtener(symbol)
+        
+        # Obtener datos históricos
+        data = obtener_datos_historicos(symbol, timeframe)
+        current_price = mercado.precio(symbol)
+        if current_price <= 0:
+            return None
+        
+        # Calcular métricas
+        current_atr = calcular_atr(data)
+        atr_percentage = current_atr / current_price
+        bollinger = calcular_bandas_bollinger(data)
+        if bollinger is None:
+            # Símbolo recién listado: historial demasiado corto para las bandas
+            return None
+        
+        # Determinar señal
+        signal = None
+        if current_price >= bollinger.upper:
+            signal = "Sell"
+        elif current_price <= bollinger.lower:
+            signal = "Buy"
             
-            # Calcular métricas
-            current_atr = calcular_atr(data)
-            atr_percentage = current_atr / current_price
-            bollinger = calcular_bandas_bollinger(data)
+        # Solo considerar si supera el umbral de volatilidad
+        if atr_percentage >= volatility_threshold and signal:
+            return {
+                'symbol': symbol,
+                'price': current_price,
+                'volatility': atr_percentage,
+                'signal': signal,
+                'ticksize': espec.tick_size,
+                'scala_precio': espec.price_scale,
+                'precision_step': espec.qty_step
+            }
             
-            # Determinar señal
-            signal = None
-            if current_price >= bollinger['UpperBand']:
-                signal = "Sell"
-            elif current_price <= bollinger['LowerBand']:
-                signal = "Buy"
-                
-            # Solo considerar si supera el umbral de volatilidad
-            if atr_percentage >= volatility_threshold and signal:
-                oportunidades.append({
-                    'symbol': symbol,
-                    'price': current_price,
-                    'volatility': atr_percentage,
-                    'signal': signal,
-                    'ticksize': ticksize,
-                    'scala_precio': scala_precio,
-                    'precision_step': precision_step
-                })
-                
-        except Exception as e:
-            print(f"Error evaluando {symbol}: {e}")
-            continue
+    except Exception as e:
+        print(f"Error evaluando {symbol}: {e}")
+    return None
+
+def evaluar_criptomonedas():
+    """Evaluar todas las criptomonedas en paralelo y devolver la mejor oportunidad"""
+    mercado.refrescar()
+    oportunidades = escaner.escanear(cryptos, evaluar_simbolo)
     
     # Ordenar por mayor volatilidad primero
     if oportunidades:
@@ -111,17 +111,12 @@ def evaluar_criptomonedas():
     return None
 
 def qty_precision(qty, precision):
-    qty = math.floor(qty / precision) * precision
-    return qty
+    """Cantidad redondeada hacia abajo al qtyStep, como texto exacto para la orden"""
+    return rejilla(precision).formatear(qty, FLOOR)
 
 def qty_step(price, ticksize, scala_precio):
-    precision = Decimal(f"{10 ** scala_precio}")
-    tickdec = Decimal(f"{ticksize}")
-    precio_final = (Decimal(f"{price}") * precision) / precision
-    precide = precio_final.quantize(Decimal(f"{1 / precision}"), rounding=ROUND_FLOOR)
-    operaciondec = (precide / tickdec).quantize(Decimal('1'), rounding=ROUND_FLOOR) * tickdec
-    result = float(operaciondec)
-    return result
+    """Precio redondeado hacia abajo al tickSize (ya es múltiplo de la escala de precio)"""
+    return rejilla(ticksize).formatear(price, FLOOR)
 
 def crear_orden(symbol, side, order_type, qty):
     response = client.place_order(
@@ -165,6 +160,7 @@ current_symbol = None
 ticksize = None
 scala_precio = None
 
+pausa = PausaErrores()
 while True:
     try:
         # Primero verificar si hay posición abierta
@@ -182,11 +178,10 @@ while True:
             
             # Obtener parámetros del símbolo actual si no los tenemos
             if ticksize is None or scala_precio is None:
-                step = client.get_instruments_info(category="linear", symbol=current_symbol)
-                if step['result']['list']:
-                    ticksize = float(step['result']['list'][0]['priceFilter']['tickSize'])
-                    scala_precio = int(step['result']['list'][0]["priceScale"])
-                    precision_step = float(step['result']['list'][0]["lotSizeFilter"]["qtyStep"])
+                espec = registro.obtener(current_symbol)
+                ticksize = espec.tick_size
+                scala_precio = espec.price_scale
+                precision_step = espec.qty_step
             
             if not stop and ticksize is not None and scala_precio is not None:
                 precio_de_entrada = float(posicion_abierta['avgPrice'])
@@ -227,8 +222,6 @@ while True:
                 # Calcular cantidad
                 qty = usdt / mejor_oportunidad['price']
                 qty = qty_precision(qty, precision_step)
-                if qty.is_integer():
-                    qty = int(qty)
                     
                 print(f"Cantidad de monedas: {qty}")
                 
@@ -238,8 +231,10 @@ while True:
             else:
                 print("No se encontraron oportunidades que cumplan los criterios. Volatilidad insuficiente.")
                 
+        pausa.exito()
         time.sleep(10)  # Esperar 1 minuto entre evaluaciones
         
     except Exception as e:
-        print(f"Error en el bot: {e}")
-        time.sleep(60)
\ No newline at end of file
+        espera = pausa.error(e)
+        print(f"Error en el bot: {e}. Reintento en {espera:.1f}s")
+        time.sleep(espera)
\ No newline at end of file
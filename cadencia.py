@@ -0,0 +1,54 @@
+"""Cadencia de evaluación alineada con el cierre de cada vela
+
+En lugar de evaluar cada 10 s un histórico cerrado que no cambia, el bucle se
+despierta justo al cierre de la vela, más un pequeño desfase para que el
+exchange la haya consolidado. Opcionalmente, mientras el precio está cerca de
+una banda de Bollinger se añaden ticks intrabarra cada pocos segundos, que es
+cuando una señal puede aparecer antes del cierre.
+"""
+import math
+
+from flujo_velas import intervalo_ms
+
+DESFASE_CIERRE = 2.0    # Segundos tras el cierre de la vela antes de evaluar
+TICK_INTRABARRA = 10.0  # Segundos entre evaluaciones intrabarra cerca de una banda (None: solo cierres)
+DISTANCIA_BANDA = 0.2   # Distancia a la banda, en % del precio, que activa los ticks intrabarra
+MARGEN = 0.05           # Segundos de tolerancia si el sleep despierta un poco antes del cierre
+
+
+class CadenciaVelas:
+    """Próximo momento de evaluación para un intervalo de velas"""
+
+    def __init__(self, timeframe, desfase=DESFASE_CIERRE, tick=TICK_INTRABARRA, distancia=DISTANCIA_BANDA):
+        self.intervalo = intervalo_ms(timeframe) / 1000
+        if not self.intervalo:
+            raise ValueError(f"Intervalo no soportado: {timeframe}")
+        self.desfase = desfase
+        self.tick = tick
+        self.distancia = distancia / 100 if distancia else 0.0
+
+    def inicio_vela(self, ahora):
+        """Epoch (s) de apertura de la vela en curso en `ahora`"""
+        return math.floor((ahora + MARGEN) / self.intervalo) * self.intervalo
+
+    def proximo_cierre(self, ahora):
+        """Epoch (s) de la siguiente evaluación de cierre posterior a `ahora`"""
+        inicio = math.floor((ahora + MARGEN - self.desfase) / self.intervalo) * self.intervalo
+        return inicio + self.intervalo + self.desfase
+
+    def cerca_de_banda(self, precio, bandas):
+        """True si el precio está a menos de `distancia` de una banda o fuera de ellas"""
+        if not self.tick or not self.distancia or bandas is None or precio <= 0:
+            return False
+        return (precio >= bandas.upper * (1 - self.distancia) or
+                precio <= bandas.lower * (1 + self.distancia))
+
+    def siguiente(self, ahora, cerca=False):
+        cierre = self.proximo_cierre(ahora)
+        if cerca and self.tick:
+            return min(cierre, ahora + self.tick)
+        return cierre
+
+    def espera(self, ahora, cerca=False):
+        """Segundos a dormir hasta la siguiente evaluación"""
+        return max(self.siguiente(ahora, cerca) - ahora, 0.0)
@@ -0,0 +1,231 @@
+from concurrent.futures import Future
+import threading
+import itertools
+import asyncio
+import logging
+import heapq
+import time
+
+from estado_cuenta import _a_float
+
+PLAZO_PENDIENTE = 60  # Segundos máximos sin ver ni posición ni orden de entrada abierta
+
+# Estados de una orden que ya no puede ejecutarse
+ESTADOS_FINALES = ('Cancelled', 'Rejected', 'Deactivated', 'PartiallyFilledCanceled')
+
+
+class Operacion:
+    """Una operación abierta: pendiente -> abierta -> cerrada (o expirada)
+
+    Desde pendiente también puede terminar sin llegar a abrirse: rechazada
+    (orden de entrada cancelada o rechazada sin ejecuciones), cerrada (abrió
+    y cerró entre dos actualizaciones de posición) o sin_ejecutar (ni
+    posición ni orden de entrada abierta).
+    """
+
+    def __init__(self, symbol, side, qty, entrada, expira, order_id=None):
+        self.symbol = symbol
+        self.side = side
+        self.qty = qty
+        self.entrada = entrada
+        self.expira = expira
+        self.order_id = order_id
+        self.creada = time.time()
+        self.estado = 'pendiente'
+        self.ejecuciones = []
+        self.ejecutado = 0.0   # Cantidad ejecutada de la entrada
+        self.salida = 0.0      # Cantidad ejecutada en sentido contrario (TP, SL o cierre)
+        self.rechazada = False
+        self.abierta_en = None
+        self.cerrada_en = None
+        self.futuro = Future()
+
+    def es_entrada(self, orden):
+        """True si la orden (o ejecución) es la de entrada de esta operación"""
+        if self.order_id is not None:
+            return orden.get('orderId') == self.order_id
+        return orden.get('side') == self.side and not orden.get('reduceOnly')
+
+    def anotar_ejecucion(self, ejecucion):
+        self.ejecuciones.append(ejecucion)
+        if ejecucion.get('execType', 'Trade') != 'Trade':
+            return
+        cantidad = _a_float(ejecucion.get('execQty'))
+        if self.es_entrada(ejecucion):
+            self.ejecutado += cantidad
+        elif ejecucion.get('side') != self.side:
+            self.salida += cantidad
+
+    def anotar_orden(self, orden):
+        if not self.es_entrada(orden):
+            return
+        if orden.get('orderStatus') in ESTADOS_FINALES and _a_float(orden.get('cumExecQty')) == 0:
+            self.rechazada = True
+
+    @property
+    def terminada(self):
+        return self.futuro.done()
+
+    def resultado(self, timeout=None):
+        """Bloquear hasta que termine la operación y devolverla"""
+        return self.futuro.result(timeout)
+
+    def __await__(self):
+        return asyncio.wrap_future(self.futuro).__await__()
+
+
+class GestorOperaciones:
+    """Ciclo de vida de operaciones dirigido por eventos de EstadoCuenta
+
+    Cada operación es un Future que se resuelve cuando la posición del símbolo
+    vuelve a cero o vence su plazo. No hay hilo de sondeo por operación: los
+    eventos de posición, orden y ejecución llegan del flujo privado (o de la
+    reconciliación REST) y un único hilo vigila los plazos. Una operación que
+    sigue pendiente tras `plazo_pendiente` segundos, sin posición ni orden de
+    entrada abierta, se da por no ejecutada, para no bloquear el símbolo hasta
+    el plazo largo de la operación; con la orden aún en reposo se espera otro
+    plazo.
+    """
+
+    def __init__(self, cuenta, plazo_pendiente=PLAZO_PENDIENTE):
+        self.cuenta = cuenta
+        self.plazo_pendiente = plazo_pendiente
+        self.operaciones = {}
+        self.plazos = []
+        self.secuencia = itertools.count()
+        self.condicion = threading.Condition()
+        self.vigilante = threading.Thread(target=self._vigilar_plazos, name="plazos", daemon=True)
+        self.vigilante.start()
+        cuenta.suscribir(self._on_evento)
+
+    def abrir(self, symbol, side, qty, entrada, timeout=None, order_id=None):
+        """Registrar una operación recién enviada; devuelve la Operacion con su Future
+
+        Con order_id la entrada se identifica por su orden; sin él, por el lado.
+        """
+        expira = time.time() + timeout if timeout else None
+        operacion = Operacion(symbol, side, qty, entrada, expira, order_id)
+        with self.condicion:
+            if symbol in self.operaciones:
+                raise ValueError(f"Ya hay una operación activa en {symbol}")
+            self.operaciones[symbol] = operacion
+            if expira is not None:
+                heapq.heappush(self.plazos, (expira, next(self.secuencia), operacion, 'operacion'))
+            if self.plazo_pendiente:
+                heapq.heappush(self.plazos, (operacion.creada + self.plazo_pendiente, next(self.secuencia),
+                                             operacion, 'pendiente'))
+            self.condicion.notify()
+        # La posición pudo haberse abierto antes de registrar la operación
+        self._revisar_posicion(symbol)
+        return operacion
+
+    def activa(self, symbol):
+        with self.condicion:
+            return symbol in self.operaciones
+
+    def activas(self):
+        with self.condicion:
+            return list(self.operaciones.values())
+
+    def revisar(self):
+        """Punto de sincronización barato para el bucle de señales (REST solo si no hay flujo)"""
+        self.cuenta.sincronizar()
+
+    def _on_evento(self, tema, datos):
+        if tema in ('execution', 'order'):
+            with self.condicion:
+                for dato in datos:
+                    operacion = self.operaciones.get(dato.get('symbol'))
+                    if operacion is None:
+                        continue
+                    if tema == 'execution':
+                        operacion.anotar_ejecucion(dato)
+                    else:
+                        operacion.anotar_orden(dato)
+        elif tema != 'position':
+            return
+        with self.condicion:
+            simbolos = list(self.operaciones)
+        for symbol in simbolos:
+            self._revisar_posicion(symbol)
+
+    def _revisar_posicion(self, symbol):
+        tamano = self.cuenta.tamano_posicion(symbol)
+        ordenes = self.cuenta.ordenes_abiertas(symbol)
+        reconciliado = self.cuenta.reconciliado
+        with self.condicion:
+            operacion = self.operaciones.get(symbol)
+            if operacion is None:
+                return
+            if operacion.estado == 'pendiente':
+                if tamano > 0:
+                    operacion.estado = 'abierta'
+                    operacion.abierta_en = time.time()
+                elif operacion.rechazada:
+                    self._terminar(operacion, 'rechazada')
+                elif operacion.ejecutado > 0 and operacion.salida >= operacion.ejecutado:
+                    # Abrió y cerró sin que llegara a verse la posición
+                    self._terminar(operacion, 'cerrada')
+                elif reconciliado > operacion.creada and not any(operacion.es_entrada(o) for o in ordenes):
+                    # Foto REST posterior al envío: ni posición ni orden de entrada viva
+                    self._terminar(operacion, 'cerrada' if operacion.ejecutado else 'sin_ejecutar')
+            elif operacion.estado == 'abierta' and tamano == 0:
+                self._terminar(operacion, 'cerrada')
+
+    def _terminar(self, operacion, estado):
+        # Llamar con self.condicion adquirida
+        if self.operaciones.get(operacion.symbol) is operacion:
+            del self.operaciones[operacion.symbol]
+        operacion.estado = estado
+        operacion.cerrada_en = time.time()
+        if not operacion.futuro.done():
+            operacion.futuro.set_result(operacion)
+
+    def _vigente(self, plazo):
+        _, _, operacion, tipo = plazo
+        return not operacion.terminada and (tipo != 'pendiente' or operacion.estado == 'pendiente')
+
+    def _vigilar_plazos(self):
+        while True:
+            with self.condicion:
+                operacion, tipo = self._esperar_plazo()
+                if tipo != 'pendiente':
+                    logging.warning(f"Operación en {operacion.symbol} sin cerrar tras el plazo ({operacion.estado})")
+                    self._terminar(operacion, 'expirada')
+                    continue
+            # La cuenta se consulta sin self.condicion, como en _revisar_posicion
+            self._vencer_pendiente(operacion)
+
+    def _esperar_plazo(self):
+        # Llamar con self.condicion adquirida; devuelve el primer plazo vigente vencido
+        while True:
+            while self.plazos and not self._vigente(self.plazos[0]):
+                heapq.heappop(self.plazos)
+            if not self.plazos:
+                self.condicion.wait()
+                continue
+
+            espera = self.plazos[0][0] - time.time()
+            if espera > 0:
+                self.condicion.wait(espera)
+                continue
+
+            _, _, operacion, tipo = heapq.heappop(self.plazos)
+            return operacion, tipo
+
+    def _vencer_pendiente(self, operacion):
+        tamano = self.cuenta.tamano_posicion(operacion.symbol)
+        ordenes = self.cuenta.ordenes_abiertas(operacion.symbol)
+        with self.condicion:
+            if operacion.terminada or operacion.estado != 'pendiente':
+                return
+            if tamano > 0:
+                operacion.estado = 'abierta'
+                operacion.abierta_en = time.time()
+            elif any(operacion.es_entrada(o) for o in ordenes):
+                # Entrada limit aún en reposo: se vuelve a revisar tras otro plazo
+                heapq.heappush(self.plazos, (time.time() + self.plazo_pendiente, next(self.secuencia),
+                                             operacion, 'pendiente'))
+            else:
+                logging.warning(f"Operación en {operacion.symbol} sin ejecutar tras {self.plazo_pendiente}s")
+                self._terminar(operacion, 'sin_ejecutar')
@@ -1,8 +1,12 @@
-from pybit.unified_trading import HTTP
+from transporte import ClienteHTTP
 import pandas as pd
 import numpy as np
 import time
 import logging
+from estado_cuenta import EstadoCuenta
+from ciclo_operaciones import GestorOperaciones
+from resiliencia import PausaErrores
+from indicadores import rsi_sma, vwap
 
 # Configuración hiper-agresiva (¡EXTREMO RIESGO!)
 api_key= input("por favor ingrese api key ")
@@ -16,8 +20,9 @@ leverage = 20  # Máximo apalancamiento
 tp_percent = 15  # Take Profit 15%
 sl_percent = 5   # Stop Loss 5%
 martingale_factor = 1.8  # Factor Martingala
+trade_timeout = 4 * 3600  # Segundos máximos esperando el cierre de una operación
 
-client = HTTP(api_key=api_key, api_secret=api_secret, testnet=False)
+client = ClienteHTTP(api_key=api_key, api_secret=api_secret, testnet=False)
 
 # Configurar apalancamiento
 client.set_leverage(
@@ -29,6 +34,15 @@ client.set_leverage(
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Estado de cuenta por flujo privado; el ciclo de cada operación se resuelve por eventos
+cuenta = EstadoCuenta(client, api_key, api_secret, account_type="CONTRACT")
+try:
+    cuenta.iniciar()
+except Exception as e:
+    logging.error(f"Flujo privado no disponible, usando REST: {e}")
+    cuenta.detener()
+gestor = GestorOperaciones(cuenta)
+
 def get_volatility(data):
     """Calcula la volatilidad promedio"""
     return np.mean(data['high'] - data['low'])
@@ -43,8 +57,21 @@ def aggressive_trading_strategy():
     trade_count = 0
     loss_streak = 0
     
+    def on_cierre(futuro):
+        nonlocal equity
+        operacion = futuro.result()
+        equity = actualizar_equity()
+        logging.info(f"Operación {operacion.side} {operacion.estado}. Equity: {equity}")
+    
+    pausa = PausaErrores(normal=30)
     while equity < 100 and trade_count < 300:  # Límite de 300 operaciones
         try:
+            # Una sola operación a la vez; el bucle sigue vivo mientras está abierta
+            gestor.revisar()
+            if gestor.activa(symbol):
+                time.sleep(10)
+                continue
+            
             # Obtener datos en tiempo real
             ticker = client.get_tickers(category='linear', symbol=symbol)
             current_price = float(ticker['result']['list'][0]['lastPrice'])
@@ -74,27 +101,33 @@ def aggressive_trading_strategy():
             
             if last_rsi < 35 and price_relation < 0.98:
                 # Señal de compra
-                execute_trade("Buy", position_size, current_price)
-                equity = manage_trade("Buy", current_price, position_size)
+                order_id = execute_trade("Buy", position_size, current_price)
+                operacion = manage_trade("Buy", current_price, position_size, order_id)
+                if operacion is not None:
+                    operacion.futuro.add_done_callback(on_cierre)
                 loss_streak = 0
                 trade_count +=1
                 
             elif last_rsi > 65 and price_relation > 1.02:
                 # Señal de venta
-                execute_trade("Sell", position_size, current_price)
-                equity = manage_trade("Sell", current_price, position_size)
+                order_id = execute_trade("Sell", position_size, current_price)
+                operacion = manage_trade("Sell", current_price, position_size, order_id)
+                if operacion is not None:
+                    operacion.futuro.add_done_callback(on_cierre)
                 loss_streak = 0
                 trade_count +=1
                 
             else:
                 time.sleep(10)
+            pausa.exito()
                 
         except Exception as e:
-            logging.error(f"Error: {e}")
-            time.sleep(30)
+            espera = pausa.error(e)
+            logging.error(f"Error: {e}. Reintento en {espera:.1f}s")
+            time.sleep(espera)
 
 def execute_trade(side, qty, price):
-    """Ejecuta orden con manejo de errores"""
+    """Ejecuta orden con manejo de errores; devuelve el orderId o None"""
     try:
         order = client.place_order(
             category="linear",
@@ -105,11 +138,14 @@ def execute_trade(side, qty, price):
             timeInForce="ImmediateOrCancel"
         )
         logging.info(f"Orden ejecutada: {order}")
+        if order['retCode'] == 0:
+            return order['result']['orderId']
     except Exception as e:
         logging.error(f"Fallo en orden: {e}")
+    return None
 
-def manage_trade(direction, entry_price, qty):
-    """Manejo agresivo de TP/SL"""
+def manage_trade(direction, entry_price, qty, order_id=None):
+    """Manejo agresivo de TP/SL; devuelve la Operacion que se resuelve al cerrar la posición"""
     try:
         if direction == "Buy":
             tp_price = entry_price * (1 + tp_percent/100)
@@ -130,35 +166,29 @@ def manage_trade(direction, entry_price, qty):
             slTriggerBy="LastPrice"
         )
         
-        # Monitorear resultado
-        while True:
-            position = client.get_positions(category="linear", symbol=symbol)['result']['list'][0]
-            if float(position['size']) == 0:
-                break
-            time.sleep(1)
-            
-        new_equity = float(client.get_wallet_balance(accountType="CONTRACT")['result']['list'][0]['equity'])
-        return new_equity
+        # El cierre llega como evento de posición, sin sondear; una entrada rechazada
+        # o sin ejecutar libera el símbolo por su evento de orden o por el plazo corto
+        return gestor.abrir(symbol, direction, qty, entry_price, timeout=trade_timeout, order_id=order_id)
         
     except Exception as e:
         logging.error(f"Error managing trade: {e}")
+        return None
+
+def actualizar_equity():
+    """Equity tras cerrar una operación"""
+    try:
+        return float(client.get_wallet_balance(accountType="CONTRACT")['result']['list'][0]['equity'])
+    except Exception as e:
+        logging.error(f"Error obteniendo equity: {e}")
         return usdt_amount
 
 def calculate_rsi(prices, period):
-    """Cálculo de RSI optimizado"""
-    delta = prices.diff()
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    
-    avg_gain = gain.rolling(period).mean()
-    avg_loss = loss.rolling(period).mean()
-    
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
+    """RSI con medias simples, vectorizado con NumPy (mismo resultado que rolling de pandas)"""
+    return rsi_sma(prices.to_numpy(), period)
 
 def calculate_vwap(df):
     """Cálculo de VWAP"""
-    return (df['close'] * df['volume']).cumsum() / df['volume'].cumsum()
+    return vwap(df['close'].to_numpy(), df['volume'].to_numpy())
 
 if __name__ == "__main__":
     logging.info("Iniciando estrategia hiper-agresiva")
@@ -0,0 +1,264 @@
+"""Diario binario de decisiones de la estrategia, solo de anexado
+
+Cada evaluación de TradingBot se guarda como un registro msgpack precedido
+de su longitud (uint32 little-endian): las últimas velas, el precio, las
+bandas, el ATR, el ratio de volatilidad, la decisión y, si la hubo, la orden
+enviada y la respuesta. El hilo de trading solo deja el registro en una
+cola; un hilo de fondo lo serializa, lo escribe con buffer y vuelca a disco
+cada segundo. Hay un fichero por día (UTC).
+
+Con --reproducir, cada registro vuelve a pasar por la estrategia actual
+(crear_indicadores, evaluar_senal y niveles_orden de bot_mejorado4) y se
+señalan las divergencias, p. ej. tras cambiar el código o los parámetros.
+
+Uso:
+    python diario.py --directorio diario --desde "2025-05-01" --hasta "2025-05-02 12:00"
+    python diario.py --symbol OMUSDT --reproducir
+"""
+import threading
+import argparse
+import calendar
+import logging
+import atexit
+import struct
+import queue
+import time
+import glob
+import sys
+import os
+
+import msgpack
+import numpy as np
+
+DIRECTORIO = 'diario'
+INTERVALO_VOLCADO = 1.0     # Segundos máximos entre volcados a disco
+CAMPOS_VELAS = ('timestamp', 'open', 'high', 'low', 'close')
+TOLERANCIA = 1e-9           # Diferencia relativa admitida al comparar valores reproducidos
+
+_LONGITUD = struct.Struct('<I')
+
+
+def ruta_dia(directorio, t):
+    return os.path.join(directorio, time.strftime('decisiones_%Y%m%d.bin', time.gmtime(t)))
+
+
+class DiarioDecisiones:
+    """Escritor en segundo plano de registros de decisión"""
+
+    def __init__(self, directorio=DIRECTORIO, intervalo=INTERVALO_VOLCADO):
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.cola = queue.SimpleQueue()
+        self.hilo = None
+        self.activo = False
+        self.archivo = None
+        self.ruta = None
+        self.escritos = 0
+
+    def iniciar(self):
+        if self.hilo is not None:
+            return
+        os.makedirs(self.directorio, exist_ok=True)
+        self.activo = True
+        self.hilo = threading.Thread(target=self._bucle, name='diario', daemon=True)
+        self.hilo.start()
+        atexit.register(self.detener)
+
+    def anotar(self, registro):
+        """Encolar un registro (dict); no serializa ni toca el disco en el hilo que llama"""
+        self.cola.put(registro)
+
+    def detener(self):
+        if self.hilo is None:
+            return
+        self.activo = False
+        self.hilo.join(timeout=10)
+        self.hilo = None
+
+    def _bucle(self):
+        empaquetador = msgpack.Packer(use_bin_type=True)
+        volcado = time.monotonic()
+        while True:
+            try:
+                registro = self.cola.get(timeout=self.intervalo)
+            except queue.Empty:
+                registro = None
+                if not self.activo:
+                    break
+            if registro is not None:
+                try:
+                    self._escribir(empaquetador.pack(registro), registro.get('t', time.time()))
+                except Exception as e:
+                    logging.error(f"Error escribiendo diario de decisiones: {str(e)}")
+
+            if self.archivo is not None and time.monotonic() - volcado >= self.intervalo:
+                self.archivo.flush()
+                volcado = time.monotonic()
+
+        if self.archivo is not None:
+            self.archivo.close()
+            self.archivo = None
+
+    def _escribir(self, datos, t):
+        ruta = ruta_dia(self.directorio, t)
+        if ruta != self.ruta:
+            if self.archivo is not None:
+                self.archivo.close()
+            self.archivo = open(ruta, 'ab', buffering=1 << 16)
+            self.ruta = ruta
+        self.archivo.write(_LONGITUD.pack(len(datos)))
+        self.archivo.write(datos)
+        self.escritos += 1
+
+
+def leer_archivo(ruta):
+    """Registros de un fichero; un registro truncado al final (caída del proceso) se ignora"""
+    with open(ruta, 'rb') as f:
+        while True:
+            cabecera = f.read(_LONGITUD.size)
+            if len(cabecera) < _LONGITUD.size:
+                return
+            longitud, = _LONGITUD.unpack(cabecera)
+            datos = f.read(longitud)
+            if len(datos) < longitud:
+                logging.warning(f"Registro truncado al final de {ruta}")
+                return
+            yield msgpack.unpackb(datos, raw=False)
+
+
+def leer(directorio=DIRECTORIO, desde=None, hasta=None, symbol=None):
+    """Registros en orden cronológico con t en [desde, hasta] (epoch s) y del símbolo indicado"""
+    for ruta in sorted(glob.glob(os.path.join(directorio, 'decisiones_*.bin'))):
+        # Los ficheros fuera del rango se saltan sin abrirlos
+        dia = calendar.timegm(time.strptime(os.path.basename(ruta)[11:19], '%Y%m%d'))
+        if (desde is not None and dia + 86400 <= desde) or (hasta is not None and dia > hasta):
+            continue
+        for registro in leer_archivo(ruta):
+            t = registro['t']
+            if (desde is not None and t < desde) or (hasta is not None and t > hasta):
+                continue
+            if symbol is not None and registro['symbol'] != symbol:
+                continue
+            yield registro
+
+
+def velas(registro):
+    """Matriz (n, 5) de la cola de velas guardada: timestamp, open, high, low, close"""
+    return np.frombuffer(registro['velas'], dtype=np.float64).reshape(-1, len(CAMPOS_VELAS))
+
+
+def _distinto(a, b, tolerancia):
+    if a is None or b is None:
+        return a is not b
+    return abs(a - b) > tolerancia * max(abs(a), abs(b), 1e-12)
+
+
+def reproducir(registros, tolerancia=TOLERANCIA):
+    """Divergencias entre lo registrado y lo que decide hoy la estrategia con las mismas entradas
+
+    Se recalculan indicadores, ratio, decisión, stop loss y los niveles de
+    precio de la orden. La cantidad no se compara: depende del saldo del
+    momento, que no forma parte de la decisión.
+    """
+    from bot_mejorado4 import crear_indicadores, evaluar_senal, niveles_orden
+    from precision import rejilla
+
+    divergencias = []
+    total = 0
+    for registro in registros:
+        total += 1
+        filas = velas(registro)
+        bollinger, atr = crear_indicadores()
+        bollinger.sembrar(filas[:, 4])
+        atr.sembrar(filas[:, 2], filas[:, 3], filas[:, 4])
+        valor_atr = atr.actual if atr.listo else 0.0
+
+        def anotar(campo, registrado, reproducido):
+            divergencias.append({
+                't': registro['t'], 'symbol': registro['symbol'], 'campo': campo,
+                'registrado': registrado, 'reproducido': reproducido
+            })
+
+        if not bollinger.listo:
+            anotar('bandas', registro['bandas'], None)
+            continue
+        evaluacion = evaluar_senal(registro['precio'], bollinger, valor_atr)
+
+        if evaluacion.decision != registro['decision'] or evaluacion.motivo != registro['motivo']:
+            anotar('decision', f"{registro['decision']} ({registro['motivo']})",
+                   f"{evaluacion.decision} ({evaluacion.motivo})")
+        for campo, registrado, reproducido in (
+            ('atr', registro['atr'], valor_atr),
+            ('ratio', registro['ratio'], evaluacion.ratio),
+            ('stop_loss', registro['stop_loss'], evaluacion.stop_loss),
+            ('banda_superior', registro['bandas'][2], bollinger.actual.upper),
+            ('banda_inferior', registro['bandas'][3], bollinger.actual.lower),
+        ):
+            if _distinto(registrado, reproducido, tolerancia):
+                anotar(campo, registrado, reproducido)
+
+        orden = registro.get('orden')
+        if orden and evaluacion.decision == orden['side']:
+            precios = rejilla(registro['tick_size'])
+            niveles = niveles_orden(precios, evaluacion.decision, registro['precio'], evaluacion.stop_loss)
+            for campo, unidades in zip(('price', 'takeProfit', 'stopLoss'), niveles):
+                if precios.texto(unidades) != orden[campo]:
+                    anotar(campo, orden[campo], precios.texto(unidades))
+    return total, divergencias
+
+
+def _epoch(texto):
+    if texto is None:
+        return None
+    for formato in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            return calendar.timegm(time.strptime(texto, formato))
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Fecha no válida (UTC, AAAA-MM-DD[ hh:mm[:ss]]): {texto}")
+
+
+def _fecha(t):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(t))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leer o reproducir el diario de decisiones")
+    parser.add_argument('--directorio', default=DIRECTORIO)
+    parser.add_argument('--desde', help="UTC, AAAA-MM-DD[ hh:mm[:ss]]")
+    parser.add_argument('--hasta', help="UTC, AAAA-MM-DD[ hh:mm[:ss]]")
+    parser.add_argument('--symbol')
+    parser.add_argument('--reproducir', action='store_true',
+                        help="Pasar los registros por la estrategia actual y mostrar divergencias")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    parser.add_argument('--max', type=int, default=20, help="Divergencias mostradas")
+    args = parser.parse_args()
+
+    registros = leer(args.directorio, _epoch(args.desde), _epoch(args.hasta), args.symbol)
+    if args.reproducir:
+        total, divergencias = reproducir(registros, args.tolerancia)
+        for d in divergencias[:args.max]:
+            print(f"{_fecha(d['t'])} {d['symbol']} {d['campo']}: registrado={d['registrado']} "
+                  f"reproducido={d['reproducido']}")
+        print(f"{total} registros reproducidos, {len(divergencias)} divergencias")
+        sys.exit(1 if divergencias else 0)
+
+    conteo = {}
+    total = 0
+    primero = ultimo = None
+    for registro in registros:
+        total += 1
+        primero = registro['t'] if primero is None else primero
+        ultimo = registro['t']
+        clave = (registro['symbol'], registro['decision'] or '-', registro['motivo'])
+        conteo[clave] = conteo.get(clave, 0) + 1
+    if not total:
+        print("Sin registros en el rango")
+        return
+    print(f"{total} registros de {_fecha(primero)} a {_fecha(ultimo)}")
+    for (symbol, decision, motivo), n in sorted(conteo.items()):
+        print(f"  {symbol:>12} {decision:>5} {motivo:<15} {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+
+from planificador import RESERVADAS_ORDEN
+from transporte import MAX_CONEXIONES
+
+# Plazas del transporte que pueden usar las lecturas de mercado (el resto queda
+# para órdenes): más hilos solo esperarían turno en el planificador
+MAX_CONCURRENCIA = MAX_CONEXIONES - RESERVADAS_ORDEN
+
+
+class Escaner:
+    """Evalúa muchos símbolos en paralelo con un pool de hilos acotado y reutilizable"""
+
+    def __init__(self, max_concurrencia=MAX_CONCURRENCIA):
+        self.max_concurrencia = max(1, int(max_concurrencia))
+        self.pool = ThreadPoolExecutor(
+            max_workers=self.max_concurrencia,
+            thread_name_prefix="escaner"
+        )
+
+    def escanear(self, simbolos, evaluar):
+        """Aplicar evaluar(symbol) a cada símbolo; devuelve los resultados no nulos en el orden de entrada"""
+        resultados = [None] * len(simbolos)
+        futuros = {
+            self.pool.submit(evaluar, symbol): i
+            for i, symbol in enumerate(simbolos)
+        }
+
+        for futuro in as_completed(futuros):
+            i = futuros[futuro]
+            try:
+                resultados[i] = futuro.result()
+            except Exception as e:
+                logging.error(f"Error escaneando {simbolos[i]}: {str(e)}")
+
+        return [r for r in resultados if r is not None]
+
+    def cerrar(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,171 @@
+from pybit.unified_trading import WebSocket
+from collections import deque
+import threading
+import logging
+import time
+
+INTERVALO_RECONCILIACION = 300  # Segundos entre reconciliaciones REST con el flujo conectado
+INTERVALO_REST = 10  # Segundos entre consultas REST cuando no hay flujo privado
+
+ESTADOS_ABIERTOS = ('New', 'PartiallyFilled', 'Untriggered')
+
+
+class EstadoCuenta:
+    """Posiciones, órdenes, ejecuciones y cartera en memoria, actualizadas por el flujo privado
+
+    El flujo privado empuja cada cambio, así que las lecturas son locales. REST
+    queda solo para reconciliar periódicamente o cuando el flujo no está conectado.
+    """
+
+    def __init__(self, client, api_key="", api_secret="", category='linear',
+                 settle_coin='USDT', account_type='UNIFIED', testnet=False):
+        self.client = client
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.category = category
+        self.settle_coin = settle_coin
+        self.account_type = account_type
+        self.testnet = testnet
+        self.posiciones = {}
+        self.ordenes = {}
+        self.ejecuciones = deque(maxlen=500)
+        self.monedas = {}
+        self.reconciliado = 0.0
+        self.lock = threading.RLock()
+        self.ws = None
+        self.oyentes = []
+
+    def iniciar(self):
+        self.reconciliar()
+        self.ws = WebSocket(
+            testnet=self.testnet,
+            channel_type="private",
+            api_key=self.api_key,
+            api_secret=self.api_secret
+        )
+        self.ws.position_stream(callback=self._on_position)
+        self.ws.order_stream(callback=self._on_order)
+        self.ws.execution_stream(callback=self._on_execution)
+        self.ws.wallet_stream(callback=self._on_wallet)
+        logging.info("Flujo privado de cuenta activo")
+
+    def detener(self):
+        if self.ws is not None:
+            self.ws.exit()
+            self.ws = None
+
+    def suscribir(self, oyente):
+        """Registrar oyente(tema, datos), llamado tras aplicar cada actualización"""
+        self.oyentes.append(oyente)
+
+    def _notificar(self, tema, datos):
+        for oyente in self.oyentes:
+            try:
+                oyente(tema, datos)
+            except Exception as e:
+                logging.error(f"Error en oyente de cuenta ({tema}): {str(e)}")
+
+    def conectado(self):
+        return self.ws is not None and self.ws.is_connected()
+
+    def sincronizar(self):
+        """Reconciliar por REST solo si el flujo no está conectado o toca la reconciliación periódica"""
+        intervalo = INTERVALO_RECONCILIACION if self.conectado() else INTERVALO_REST
+        if time.time() - self.reconciliado >= intervalo:
+            self.reconciliar()
+
+    def reconciliar(self):
+        # Instante de la foto: lo ocurrido después puede no estar en ella
+        inicio = time.time()
+        posiciones = self.client.get_positions(category=self.category, settleCoin=self.settle_coin)
+        if posiciones['retCode'] != 0:
+            raise Exception(f"Error consultando posiciones: {posiciones['retMsg']}")
+
+        ordenes = self.client.get_open_orders(category=self.category, settleCoin=self.settle_coin)
+        if ordenes['retCode'] != 0:
+            raise Exception(f"Error consultando órdenes: {ordenes['retMsg']}")
+
+        cartera = self.client.get_wallet_balance(accountType=self.account_type)
+        if cartera['retCode'] != 0:
+            raise Exception(f"Error API balance: {cartera['retMsg']}")
+
+        with self.lock:
+            self.posiciones = {}
+            self._aplicar_posiciones(posiciones['result'].get('list', []))
+            self.ordenes = {}
+            self._aplicar_ordenes(ordenes['result'].get('list', []))
+            self._aplicar_cartera(cartera['result'].get('list', []))
+            self.reconciliado = inicio
+        self._notificar('position', posiciones['result'].get('list', []))
+
+    def _aplicar_posiciones(self, lista):
+        for posicion in lista:
+            if posicion.get('category', self.category) != self.category:
+                continue
+            clave = (posicion['symbol'], int(posicion.get('positionIdx', 0)))
+            self.posiciones[clave] = posicion
+
+    def _aplicar_ordenes(self, lista):
+        for orden in lista:
+            if orden.get('orderStatus') in ESTADOS_ABIERTOS:
+                self.ordenes[orden['orderId']] = orden
+            else:
+                self.ordenes.pop(orden['orderId'], None)
+
+    def _aplicar_cartera(self, lista):
+        for cuenta in lista:
+            if cuenta.get('accountType', self.account_type) != self.account_type:
+                continue
+            for moneda in cuenta.get('coin', []):
+                self.monedas[moneda['coin']] = moneda
+
+    def _on_position(self, mensaje):
+        with self.lock:
+            self._aplicar_posiciones(mensaje.get('data', []))
+        self._notificar('position', mensaje.get('data', []))
+
+    def _on_order(self, mensaje):
+        with self.lock:
+            self._aplicar_ordenes(mensaje.get('data', []))
+        self._notificar('order', mensaje.get('data', []))
+
+    def _on_execution(self, mensaje):
+        with self.lock:
+            self.ejecuciones.extend(mensaje.get('data', []))
+        self._notificar('execution', mensaje.get('data', []))
+
+    def _on_wallet(self, mensaje):
+        with self.lock:
+            self._aplicar_cartera(mensaje.get('data', []))
+        self._notificar('wallet', mensaje.get('data', []))
+
+    def tamano_posicion(self, symbol):
+        with self.lock:
+            return sum(
+                _a_float(posicion.get('size'))
+                for (simbolo, _), posicion in self.posiciones.items()
+                if simbolo == symbol
+            )
+
+    def posicion(self, symbol, position_idx=0):
+        with self.lock:
+            return self.posiciones.get((symbol, position_idx))
+
+    def posiciones_abiertas(self):
+        with self.lock:
+            return [p for p in self.posiciones.values() if _a_float(p.get('size')) != 0]
+
+    def ordenes_abiertas(self, symbol=None):
+        with self.lock:
+            return [o for o in self.ordenes.values() if symbol is None or o['symbol'] == symbol]
+
+    def moneda(self, coin='USDT'):
+        with self.lock:
+            return self.monedas.get(coin)
+
+
+def _a_float(valor):
+    try:
+        return float(valor) if valor not in (None, '') else 0.0
+    except (TypeError, ValueError):
+        return 0.0
@@ -0,0 +1,303 @@
+from pybit.unified_trading import WebSocket
+from collections import namedtuple
+import pandas as pd
+import numpy as np
+import threading
+import logging
+import time
+
+Vela = namedtuple('Vela', ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover'])
+
+# Duración de cada intervalo de Bybit en milisegundos
+INTERVALOS_MS = {
+    '1': 60_000, '3': 180_000, '5': 300_000, '15': 900_000, '30': 1_800_000,
+    '60': 3_600_000, '120': 7_200_000, '240': 14_400_000, '360': 21_600_000,
+    '720': 43_200_000, 'D': 86_400_000, 'W': 604_800_000
+}
+
+MAX_SILENCIO_WS = 60  # Segundos sin mensajes antes de volver a sincronizar por REST
+
+
+def intervalo_ms(timeframe):
+    """Duración en milisegundos de un intervalo de velas"""
+    return INTERVALOS_MS.get(str(timeframe), 0)
+
+
+def parsear_velas(raw_data):
+    """Convertir la lista cruda de get_kline (más reciente primero) en velas ordenadas"""
+    velas = []
+    for fila in reversed(raw_data):
+        try:
+            velas.append(Vela(int(fila[0]), *(float(x) for x in fila[1:7])))
+        except (ValueError, TypeError, IndexError):
+            continue
+    return velas
+
+
+def filas_kline(raw_data):
+    """Lista cruda de get_kline como matriz (n, 7) de la más antigua a la más reciente"""
+    try:
+        return np.array(raw_data, dtype=np.float64).reshape(-1, len(Vela._fields))[::-1]
+    except (ValueError, TypeError):
+        # Alguna fila incompleta o no numérica: se descartan una a una
+        return np.array(parsear_velas(raw_data), dtype=np.float64).reshape(-1, len(Vela._fields))
+
+
+class SerieVelas:
+    """Velas de capacidad fija en arrays contiguos, de la más antigua a la más reciente
+
+    Cada vela se escribe dos veces (posición p y p + capacidad) en arrays del
+    doble de la capacidad, así las últimas n velas siempre forman un tramo
+    contiguo: las columnas se leen como vistas sin copiar y añadir una vela no
+    reserva memoria. Una vista sigue siendo válida hasta que se añaden
+    `capacidad` velas más (la vela en curso se actualiza en sitio).
+    """
+
+    def __init__(self, capacidad=200):
+        if capacidad < 1:
+            raise ValueError("La capacidad de la serie debe ser de al menos 1 vela")
+        self.capacidad = capacidad
+        self.columnas = [np.zeros(2 * capacidad, dtype=np.int64)] + [
+            np.zeros(2 * capacidad, dtype=np.float64) for _ in Vela._fields[1:]
+        ]
+        self.indices = {campo: i for i, campo in enumerate(Vela._fields)}
+        self.total = 0  # Velas escritas desde la última carga; la cabeza es total % capacidad
+
+    def __len__(self):
+        return min(self.total, self.capacidad)
+
+    @property
+    def empty(self):
+        return self.total == 0
+
+    def _tramo(self):
+        n = len(self)
+        inicio = (self.total - n) % self.capacidad
+        return slice(inicio, inicio + n)
+
+    def __getitem__(self, campo):
+        """Vista de una columna ('close', 'high'...) de la más antigua a la más reciente"""
+        return self.columnas[self.indices[campo]][self._tramo()]
+
+    timestamp = property(lambda self: self['timestamp'])
+    open = property(lambda self: self['open'])
+    high = property(lambda self: self['high'])
+    low = property(lambda self: self['low'])
+    close = property(lambda self: self['close'])
+    volume = property(lambda self: self['volume'])
+    turnover = property(lambda self: self['turnover'])
+
+    def _escribir(self, posicion, vela):
+        espejo = posicion + self.capacidad
+        for columna, valor in zip(self.columnas, vela):
+            columna[posicion] = valor
+            columna[espejo] = valor
+
+    def agregar(self, vela):
+        self._escribir(self.total % self.capacidad, vela)
+        self.total += 1
+
+    def actualizar(self, vela):
+        """Sustituir la última vela (la vela en curso)"""
+        if not self.total:
+            self.agregar(vela)
+        else:
+            self._escribir((self.total - 1) % self.capacidad, vela)
+
+    def cargar(self, velas):
+        """Reemplazar el contenido por velas (lista de Vela o matriz (n, 7)), conservando las últimas"""
+        filas = np.asarray(velas, dtype=np.float64).reshape(-1, len(Vela._fields))[-self.capacidad:]
+        n = len(filas)
+        for i, columna in enumerate(self.columnas):
+            columna[:n] = filas[:, i]
+            columna[self.capacidad:self.capacidad + n] = filas[:, i]
+        self.total = n
+
+    def copiar(self, origen):
+        """Copiar en sitio el contenido de otra SerieVelas de la misma capacidad"""
+        if origen.capacidad != self.capacidad:
+            raise ValueError("Las series deben tener la misma capacidad")
+        for destino, columna in zip(self.columnas, origen.columnas):
+            np.copyto(destino, columna)
+        self.total = origen.total
+
+    def ultimo_timestamp(self):
+        return int(self.columnas[0][(self.total - 1) % self.capacidad]) if self.total else None
+
+    def ultima(self):
+        if not self.total:
+            return None
+        posicion = (self.total - 1) % self.capacidad
+        return Vela(int(self.columnas[0][posicion]), *(float(c[posicion]) for c in self.columnas[1:]))
+
+    def to_dataframe(self):
+        if not self.total:
+            return pd.DataFrame()
+        data = pd.DataFrame({campo: self[campo].copy() for campo in Vela._fields})
+        data['timestamp'] = pd.to_datetime(data['timestamp'], unit='ms')
+        return data
+
+
+class BufferVelas:
+    """Buffer circular de velas en memoria sobre una SerieVelas, con oyentes"""
+
+    def __init__(self, capacidad=200, intervalo=0):
+        self.serie = SerieVelas(capacidad)
+        self.intervalo = intervalo
+        self.lock = threading.Lock()
+        self.oyentes = []
+
+    def __len__(self):
+        return len(self.serie)
+
+    def registrar(self, oyente):
+        """Suscribir un indicador incremental (reiniciar / on_vela) a los cambios del buffer"""
+        with self.lock:
+            self.oyentes.append(oyente)
+            oyente.reiniciar(self.serie)
+
+    def sembrar(self, velas):
+        with self.lock:
+            self.serie.cargar(velas)
+            for oyente in self.oyentes:
+                oyente.reiniciar(self.serie)
+
+    def aplicar(self, vela):
+        """Aplicar una vela en sitio. Devuelve False si detecta un hueco en la serie"""
+        with self.lock:
+            ultimo = self.serie.ultimo_timestamp()
+            if ultimo is None:
+                nueva = True
+            else:
+                if vela.timestamp < ultimo:
+                    return True
+                if self.intervalo and vela.timestamp - ultimo > self.intervalo:
+                    return False
+                nueva = vela.timestamp > ultimo
+
+            if nueva:
+                self.serie.agregar(vela)
+            else:
+                self.serie.actualizar(vela)
+            for oyente in self.oyentes:
+                oyente.on_vela(vela, nueva)
+            return True
+
+    def ultima(self):
+        with self.lock:
+            return self.serie.ultima()
+
+    def copiar(self, destino):
+        """Copia de la serie en `destino`, sin velas a medio aplicar"""
+        with self.lock:
+            destino.copiar(self.serie)
+        return destino
+
+    def to_dataframe(self):
+        with self.lock:
+            return self.serie.to_dataframe()
+
+
+class FlujoVelas:
+    """Velas en tiempo real por WebSocket, sembradas con un único backfill REST
+
+    Con un AlmacenVelas el backfill solo descarga las velas cerradas desde la
+    última guardada y cada vela confirmada por el WebSocket se añade al almacén.
+    Con `ws` el topic se suscribe en una conexión pública compartida con otros
+    símbolos, que el flujo no cierra al detenerse.
+    """
+
+    def __init__(self, client, symbol, timeframe, capacidad=200, testnet=False, almacen=None, ws=None):
+        self.client = client
+        self.symbol = symbol
+        self.timeframe = str(timeframe)
+        self.capacidad = capacidad
+        self.testnet = testnet
+        self.almacen = almacen
+        self.buffer = BufferVelas(capacidad, intervalo_ms(timeframe))
+        self.copia = SerieVelas(capacidad)  # Lo que ve la estrategia: el hilo del WebSocket no la toca
+        self.ws = ws
+        self.ws_propio = ws is None
+        self.ultimo_mensaje = 0.0
+        self.desincronizado = True
+
+    def iniciar(self):
+        self.backfill()
+        if self.ws is None:
+            self.ws = WebSocket(testnet=self.testnet, channel_type="linear")
+        self.ws.kline_stream(
+            interval=self.timeframe,
+            symbol=self.symbol,
+            callback=self._on_kline
+        )
+        logging.info(f"Flujo de velas activo: kline.{self.timeframe}.{self.symbol}")
+
+    def detener(self):
+        if self.ws is not None and self.ws_propio:
+            self.ws.exit()
+            self.ws = None
+
+    def backfill(self):
+        if self.almacen is not None:
+            self.almacen.client = self.client
+            viva = self.almacen.actualizar(self.symbol, self.timeframe, self.capacidad)
+            velas = self.almacen.ultimas(self.symbol, self.timeframe, self.capacidad - (viva is not None))
+            if viva is not None:
+                velas.append(viva)
+            self.buffer.sembrar(velas)
+            self.ultimo_mensaje = time.time()
+            self.desincronizado = False
+            return
+
+        response = self.client.get_kline(
+            symbol=self.symbol,
+            interval=self.timeframe,
+            limit=self.capacidad
+        )
+
+        if response['retCode'] != 0:
+            raise Exception(f"Error histórico: {response['retMsg']}")
+
+        self.buffer.sembrar(filas_kline(response['result'].get('list', [])))
+        self.ultimo_mensaje = time.time()
+        self.desincronizado = False
+
+    def _on_kline(self, mensaje):
+        try:
+            for item in mensaje.get('data', []):
+                vela = Vela(
+                    int(item['start']),
+                    float(item['open']),
+                    float(item['high']),
+                    float(item['low']),
+                    float(item['close']),
+                    float(item['volume']),
+                    float(item['turnover'])
+                )
+                if not self.buffer.aplicar(vela):
+                    logging.warning(f"Hueco en velas de {self.symbol}, resincronizando")
+                    self.desincronizado = True
+                elif item.get('confirm') and self.almacen is not None:
+                    self.almacen.agregar(self.symbol, self.timeframe, [vela])
+            self.ultimo_mensaje = time.time()
+        except Exception as e:
+            logging.error(f"Error procesando kline: {str(e)}")
+
+    def sincronizado(self):
+        return (not self.desincronizado and
+                time.time() - self.ultimo_mensaje < MAX_SILENCIO_WS)
+
+    def datos(self):
+        """Copia de la SerieVelas del flujo; vuelve a REST solo si el flujo está desincronizado
+
+        La copia se reutiliza en cada llamada: es válida hasta la siguiente.
+        """
+        if not self.sincronizado():
+            self.backfill()
+        return self.buffer.copiar(self.copia)
+
+    def copiar_serie(self):
+        """Como datos() pero sin REST ni lock: llamar con buffer.lock adquirido, p. ej. para
+        leer las velas junto con los indicadores en una misma lectura"""
+        self.copia.copiar(self.buffer.serie)
+        return self.copia
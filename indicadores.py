@@ -0,0 +1,284 @@
+from collections import deque, namedtuple
+import numpy as np
+
+Bandas = namedtuple('Bandas', ['ma', 'std', 'upper', 'lower'])
+# Lectura inmutable de BollingerIncremental, con los mismos atributos que usa la estrategia
+EstadoBollinger = namedtuple('EstadoBollinger', ['actual', 'anterior', 'cierre_anterior'])
+
+RECALCULO_EXACTO = 1000  # Velas cerradas entre recálculos completos para evitar deriva
+
+
+class BollingerIncremental:
+    """Bandas de Bollinger en O(1) por actualización (equivalente a rolling(ventana) de pandas)
+
+    Mantiene la media y la suma de cuadrados de desviaciones de la ventana de
+    velas cerradas. La vela en curso se combina al vuelo sustituyendo el valor
+    más antiguo, así que actualizar el precio vivo no toca el estado.
+    """
+
+    def __init__(self, ventana=20, desviacion=2):
+        if ventana < 2:
+            raise ValueError("La ventana de Bollinger debe ser de al menos 2 velas")
+        self.ventana = ventana
+        self.desviacion = desviacion
+        self.cerrados = deque(maxlen=ventana)
+        self.vivo = None
+        self.media = 0.0
+        self.m2 = 0.0
+        self.pendientes = 0
+
+    def sembrar(self, cierres):
+        """Carga inicial desde un array de cierres (el último es la vela en curso)"""
+        cierres = np.asarray(cierres, dtype=np.float64)
+        self.cerrados.clear()
+        self.vivo = None
+        if len(cierres) == 0:
+            return
+        self.cerrados.extend(cierres[-self.ventana - 1:-1].tolist())
+        self.vivo = float(cierres[-1])
+        self._recalcular()
+
+    def agregar(self, cierre):
+        """Nueva vela: la vela en curso pasa a estar cerrada"""
+        if self.vivo is not None:
+            self._cerrar(self.vivo)
+        self.vivo = float(cierre)
+
+    def actualizar(self, cierre):
+        """Cambio de precio de la vela en curso"""
+        self.vivo = float(cierre)
+
+    def _cerrar(self, valor):
+        n = len(self.cerrados)
+        if n == self.ventana:
+            antiguo = self.cerrados[0]
+            self.cerrados.append(valor)
+            delta = valor - antiguo
+            media = self.media + delta / n
+            self.m2 += delta * (valor - media + antiguo - self.media)
+            self.media = media
+        else:
+            self.cerrados.append(valor)
+            delta = valor - self.media
+            self.media += delta / (n + 1)
+            self.m2 += delta * (valor - self.media)
+
+        self.pendientes += 1
+        if self.pendientes >= RECALCULO_EXACTO:
+            self._recalcular()
+
+    def _recalcular(self):
+        valores = np.fromiter(self.cerrados, dtype=np.float64, count=len(self.cerrados))
+        self.pendientes = 0
+        if len(valores) == 0:
+            self.media = self.m2 = 0.0
+            return
+        self.media = float(valores.mean())
+        self.m2 = float(((valores - self.media) ** 2).sum())
+
+    def _bandas(self, media, m2):
+        std = (max(m2, 0.0) / (self.ventana - 1)) ** 0.5
+        return Bandas(media, std, media + std * self.desviacion, media - std * self.desviacion)
+
+    @property
+    def listo(self):
+        return len(self.cerrados) == self.ventana and self.vivo is not None
+
+    @property
+    def anterior(self):
+        """Bandas al cierre de la última vela cerrada (iloc[-2])"""
+        if len(self.cerrados) < self.ventana:
+            return None
+        return self._bandas(self.media, self.m2)
+
+    @property
+    def actual(self):
+        """Bandas incluyendo la vela en curso (iloc[-1])"""
+        if not self.listo:
+            return None
+        antiguo = self.cerrados[0]
+        delta = self.vivo - antiguo
+        media = self.media + delta / self.ventana
+        m2 = self.m2 + delta * (self.vivo - media + antiguo - self.media)
+        return self._bandas(media, m2)
+
+    @property
+    def cierre_anterior(self):
+        return self.cerrados[-1] if self.cerrados else None
+
+    def instantanea(self):
+        """EstadoBollinger coherente; con BufferVelas, llamar con su lock adquirido"""
+        return EstadoBollinger(self.actual, self.anterior, self.cierre_anterior)
+
+    # Interfaz de oyente de BufferVelas (velas es una SerieVelas)
+    def reiniciar(self, velas):
+        self.sembrar(velas['close'])
+
+    def on_vela(self, vela, nueva):
+        if nueva:
+            self.agregar(vela.close)
+        else:
+            self.actualizar(vela.close)
+
+
+def rango_verdadero(high, low, close):
+    """True range vectorizado; la primera vela usa high - low como hace pandas"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    tr = high - low
+    if len(tr) > 1:
+        cierre_previo = close[:-1]
+        tr[1:] = np.maximum(
+            tr[1:],
+            np.maximum(np.abs(high[1:] - cierre_previo), np.abs(low[1:] - cierre_previo))
+        )
+    return tr
+
+
+class ATRIncremental:
+    """Average True Range en O(1) por vela, con suavizado SMA (como calcular_atr) o Wilder"""
+
+    def __init__(self, period=14, suavizado='sma'):
+        if suavizado not in ('sma', 'wilder'):
+            raise ValueError(f"Suavizado de ATR no soportado: {suavizado}")
+        self.period = period
+        self.suavizado = suavizado
+        self.rangos = deque(maxlen=period)
+        self.suma = 0.0
+        self.atr = 0.0
+        self.cerradas = 0
+        self.cierre_previo = None
+        self.vivo = None
+        self.pendientes = 0
+
+    def _tr(self, high, low):
+        if self.cierre_previo is None:
+            return high - low
+        return max(high - low, abs(high - self.cierre_previo), abs(low - self.cierre_previo))
+
+    def sembrar(self, high, low, close):
+        """Carga inicial desde arrays NumPy (la última posición es la vela en curso)"""
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        self.rangos.clear()
+        self.suma = self.atr = 0.0
+        self.cerradas = 0
+        self.cierre_previo = self.vivo = None
+        self.pendientes = 0
+        if len(close) == 0:
+            return
+
+        tr = rango_verdadero(high[:-1], low[:-1], close[:-1])
+        self.cerradas = len(tr)
+        self.rangos.extend(tr[-self.period:].tolist())
+        self.suma = float(sum(self.rangos))
+
+        if self.suavizado == 'wilder' and len(tr) >= self.period:
+            # Wilder es una EMA con alfa 1/period sembrada con la SMA del primer tramo
+            alfa = 1.0 / self.period
+            resto = tr[self.period:]
+            pesos = (1 - alfa) ** np.arange(len(resto) - 1, -1, -1)
+            self.atr = float(
+                tr[:self.period].mean() * (1 - alfa) ** len(resto) + alfa * np.dot(pesos, resto)
+            )
+
+        if len(close) > 1:
+            self.cierre_previo = float(close[-2])
+        self.vivo = (float(high[-1]), float(low[-1]), float(close[-1]))
+
+    def agregar(self, high, low, close):
+        """Nueva vela: la vela en curso pasa a estar cerrada"""
+        if self.vivo is not None:
+            self._cerrar(*self.vivo)
+        self.vivo = (float(high), float(low), float(close))
+
+    def actualizar(self, high, low, close):
+        """Cambio de la vela en curso"""
+        self.vivo = (float(high), float(low), float(close))
+
+    def _cerrar(self, high, low, close):
+        tr = self._tr(high, low)
+        self.cierre_previo = close
+        self.cerradas += 1
+
+        if len(self.rangos) == self.period:
+            self.suma += tr - self.rangos[0]
+        else:
+            self.suma += tr
+        self.rangos.append(tr)
+
+        if self.suavizado == 'wilder':
+            if self.cerradas == self.period:
+                self.atr = self.suma / self.period
+            elif self.cerradas > self.period:
+                self.atr += (tr - self.atr) / self.period
+
+        self.pendientes += 1
+        if self.pendientes >= RECALCULO_EXACTO:
+            self.suma = float(sum(self.rangos))
+            self.pendientes = 0
+
+    @property
+    def listo(self):
+        return self.cerradas >= self.period and self.vivo is not None
+
+    @property
+    def anterior(self):
+        """ATR al cierre de la última vela cerrada"""
+        if self.cerradas < self.period:
+            return None
+        return self.atr if self.suavizado == 'wilder' else self.suma / self.period
+
+    @property
+    def actual(self):
+        """ATR incluyendo la vela en curso (equivalente a iloc[-1])"""
+        if not self.listo:
+            return None
+        tr = self._tr(self.vivo[0], self.vivo[1])
+        if self.suavizado == 'wilder':
+            return self.atr + (tr - self.atr) / self.period
+        return (self.suma - self.rangos[0] + tr) / self.period
+
+    # Interfaz de oyente de BufferVelas (velas es una SerieVelas)
+    def reiniciar(self, velas):
+        self.sembrar(velas['high'], velas['low'], velas['close'])
+
+    def on_vela(self, vela, nueva):
+        if nueva:
+            self.agregar(vela.high, vela.low, vela.close)
+        else:
+            self.actualizar(vela.high, vela.low, vela.close)
+
+
+def media_movil(valores, period):
+    """Media simple móvil; NaN hasta completar la primera ventana (como rolling(period).mean())"""
+    valores = np.asarray(valores, dtype=np.float64)
+    media = np.full(len(valores), np.nan)
+    if len(valores) >= period:
+        media[period - 1:] = np.convolve(valores, np.full(period, 1.0 / period), mode='valid')
+    return media
+
+
+def rsi_sma(close, period=14):
+    """RSI con medias simples de ganancias y pérdidas, vectorizado (equivale a calculate_rsi)
+
+    Como en la versión de pandas, la primera vela cuenta como variación nula.
+    Sin pérdidas en la ventana el RSI es 100; sin variaciones, NaN.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    delta = np.zeros(len(close))
+    delta[1:] = np.diff(close)
+    media_ganancia = media_movil(np.maximum(delta, 0.0), period)
+    media_perdida = media_movil(np.maximum(-delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + media_ganancia / media_perdida)
+
+
+def vwap(close, volume):
+    """VWAP acumulado desde la primera vela (equivale a calculate_vwap)"""
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.cumsum(close * volume) / np.cumsum(volume)
@@ -0,0 +1,115 @@
+from pybit.unified_trading import WebSocket
+import numpy as np
+import threading
+import logging
+import time
+
+# Campos de ticker guardados por símbolo, en este orden de columnas
+CAMPOS = ('lastPrice', 'bid1Price', 'ask1Price', 'markPrice', 'volume24h', 'turnover24h')
+COLUMNAS = {campo: i for i, campo in enumerate(CAMPOS)}
+
+MAX_EDAD = 5  # Segundos antes de considerar vieja la instantánea
+
+
+class InstantaneaMercado:
+    """Tickers de todo el universo lineal indexados por símbolo
+
+    Se refresca con una sola llamada a get_tickers por ciclo o se mantiene en
+    vivo con el topic de tickers. Las consultas de precio son una lectura del
+    índice y de una matriz float64, sin HTTP.
+    """
+
+    def __init__(self, client, category='linear', max_edad=MAX_EDAD, testnet=False):
+        self.client = client
+        self.category = category
+        self.max_edad = max_edad
+        self.testnet = testnet
+        self.indices = {}
+        self.valores = np.zeros((0, len(CAMPOS)))
+        self.actualizado = 0.0
+        self.lock = threading.Lock()
+        self.ws = None
+
+    def __contains__(self, symbol):
+        return symbol in self.indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def simbolos(self):
+        return list(self.indices)
+
+    def refrescar(self):
+        """Descargar todos los tickers de la categoría en una sola petición"""
+        response = self.client.get_tickers(category=self.category)
+        if response['retCode'] != 0:
+            raise Exception(f"Error tickers: {response['retMsg']}")
+
+        tickers = response['result'].get('list', [])
+        valores = np.zeros((len(tickers), len(CAMPOS)))
+        indices = {}
+        for fila, ticker in enumerate(tickers):
+            indices[ticker['symbol']] = fila
+            for columna, campo in enumerate(CAMPOS):
+                valores[fila, columna] = _a_float(ticker.get(campo))
+
+        with self.lock:
+            self.indices = indices
+            self.valores = valores
+            self.actualizado = time.time()
+
+    def vigente(self):
+        return time.time() - self.actualizado < self.max_edad
+
+    def valor(self, symbol, campo='lastPrice'):
+        """Último valor conocido de un campo; 0.0 si el símbolo no existe"""
+        if not self.vigente():
+            self.refrescar()
+        with self.lock:
+            fila = self.indices.get(symbol)
+            if fila is None:
+                return 0.0
+            return float(self.valores[fila, COLUMNAS[campo]])
+
+    def precio(self, symbol):
+        return self.valor(symbol, 'lastPrice')
+
+    def suscribir(self, simbolos):
+        """Mantener la instantánea en vivo con el topic tickers.<symbol>"""
+        if not self.indices:
+            self.refrescar()
+        self.ws = WebSocket(testnet=self.testnet, channel_type=self.category)
+        self.ws.ticker_stream(symbol=list(simbolos), callback=self._on_ticker)
+        logging.info(f"Flujo de tickers activo para {len(simbolos)} símbolos")
+
+    def detener(self):
+        if self.ws is not None:
+            self.ws.exit()
+            self.ws = None
+
+    def _on_ticker(self, mensaje):
+        try:
+            ticker = mensaje.get('data', {})
+            symbol = ticker.get('symbol')
+            if not symbol:
+                return
+            with self.lock:
+                fila = self.indices.get(symbol)
+                if fila is None:
+                    fila = len(self.valores)
+                    self.valores = np.vstack([self.valores, np.zeros(len(CAMPOS))])
+                    self.indices[symbol] = fila
+                # Los mensajes delta solo traen los campos que cambiaron
+                for columna, campo in enumerate(CAMPOS):
+                    if campo in ticker:
+                        self.valores[fila, columna] = _a_float(ticker[campo])
+                self.actualizado = time.time()
+        except Exception as e:
+            logging.error(f"Error procesando ticker: {str(e)}")
+
+
+def _a_float(valor):
+    try:
+        return float(valor) if valor not in (None, '') else 0.0
+    except (TypeError, ValueError):
+        return 0.0
@@ -0,0 +1,226 @@
+"""Histogramas de latencia por llamada a la API y por etapa del bucle
+
+Cada histograma guarda microsegundos en cubetas log-lineales al estilo HDR:
+valores exactos hasta 63 µs y, a partir de ahí, 32 cubetas por potencia de
+dos (error relativo < 3 %), así que registrar un valor es un par de
+operaciones de bits y un incremento, sin guardar las muestras. Los
+percentiles se leen del acumulado de las cubetas.
+
+Las métricas se exponen en http://127.0.0.1:9108/metrics (formato de texto
+de Prometheus) y /metrics.json, y se resumen en el log periódicamente.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import logging
+import json
+import time
+
+BITS_SUBCUBETA = 5          # 2**5 subcubetas por potencia de dos
+MAX_EXPONENTE = 40          # Hasta 2**40 µs (unos 12 días); lo que exceda va a la última cubeta
+PUERTO = 9108
+INTERVALO_RESUMEN = 300     # Segundos entre resúmenes en el log
+PERCENTILES = (50, 90, 99, 99.9)
+
+_EXACTOS = 1 << (BITS_SUBCUBETA + 1)
+_CUBETAS = ((MAX_EXPONENTE - BITS_SUBCUBETA) << BITS_SUBCUBETA) + _EXACTOS
+
+
+def _indice(valor):
+    if valor < _EXACTOS:
+        return valor
+    exponente = valor.bit_length() - BITS_SUBCUBETA - 1
+    return min((exponente << BITS_SUBCUBETA) + (valor >> exponente), _CUBETAS - 1)
+
+
+def _limite_superior(indice):
+    """Mayor valor (µs) que cae en la cubeta"""
+    if indice < _EXACTOS:
+        return indice
+    exponente = (indice >> BITS_SUBCUBETA) - 1
+    mantisa = indice - (exponente << BITS_SUBCUBETA)
+    return ((mantisa + 1) << exponente) - 1
+
+
+class Histograma:
+    """Distribución de latencias en microsegundos con memoria fija"""
+
+    def __init__(self):
+        self.cuentas = [0] * _CUBETAS
+        self.n = 0
+        self.total = 0
+        self.minimo = 0
+        self.maximo = 0
+        self.lock = threading.Lock()
+
+    def registrar(self, microsegundos):
+        valor = max(int(microsegundos), 0)
+        indice = _indice(valor)
+        with self.lock:
+            self.cuentas[indice] += 1
+            if not self.n or valor < self.minimo:
+                self.minimo = valor
+            if valor > self.maximo:
+                self.maximo = valor
+            self.n += 1
+            self.total += valor
+
+    def percentil(self, p):
+        """Valor (µs) por debajo del cual queda el p % de las muestras"""
+        with self.lock:
+            if not self.n:
+                return 0
+            objetivo = max(1, -(-self.n * p // 100))
+            acumulado = 0
+            for indice, cuenta in enumerate(self.cuentas):
+                acumulado += cuenta
+                if acumulado >= objetivo:
+                    return min(_limite_superior(indice), self.maximo)
+        return self.maximo
+
+    def media(self):
+        return self.total / self.n if self.n else 0.0
+
+    def resumen(self):
+        """n, media, mínimo, máximo y percentiles en milisegundos"""
+        datos = {
+            'n': self.n,
+            'media_ms': self.media() / 1000,
+            'min_ms': self.minimo / 1000,
+            'max_ms': self.maximo / 1000
+        }
+        for p in PERCENTILES:
+            datos[f"p{p:g}_ms"] = self.percentil(p) / 1000
+        return datos
+
+
+class _Medicion:
+    """Context manager de Metricas.medir (más barato que un generador con contextmanager)"""
+
+    __slots__ = ('histograma', 'inicio')
+
+    def __init__(self, histograma):
+        self.histograma = histograma
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.registrar((time.perf_counter() - self.inicio) * 1_000_000)
+        return False
+
+
+class Metricas:
+    """Histogramas con nombre (api.<método>, etapa.<nombre>, senal_a_ack...)"""
+
+    def __init__(self):
+        self.histogramas = {}
+        self.lock = threading.Lock()
+
+    def histograma(self, nombre):
+        histograma = self.histogramas.get(nombre)
+        if histograma is None:
+            with self.lock:
+                histograma = self.histogramas.setdefault(nombre, Histograma())
+        return histograma
+
+    def registrar(self, nombre, segundos):
+        self.histograma(nombre).registrar(segundos * 1_000_000)
+
+    @staticmethod
+    def marca():
+        """Instante de referencia para desde(); reloj del proceso, no el simulado del backtest"""
+        return time.perf_counter()
+
+    def desde(self, nombre, marca):
+        self.registrar(nombre, time.perf_counter() - marca)
+
+    def medir(self, nombre):
+        """with metricas.medir('etapa.x'): ... registra la duración del bloque"""
+        return _Medicion(self.histograma(nombre))
+
+    def resumen(self):
+        with self.lock:
+            nombres = sorted(self.histogramas)
+        return {nombre: self.histogramas[nombre].resumen() for nombre in nombres}
+
+    def texto_prometheus(self):
+        lineas = ['# TYPE bot_latencia_segundos summary']
+        for nombre, datos in self.resumen().items():
+            etiqueta = f'nombre="{nombre}"'
+            for p in PERCENTILES:
+                lineas.append(f'bot_latencia_segundos{{{etiqueta},quantile="{p / 100:g}"}} {datos[f"p{p:g}_ms"] / 1000:.6f}')
+            lineas.append(f'bot_latencia_segundos_sum{{{etiqueta}}} {datos["media_ms"] * datos["n"] / 1000:.6f}')
+            lineas.append(f'bot_latencia_segundos_count{{{etiqueta}}} {datos["n"]}')
+        return '\n'.join(lineas) + '\n'
+
+    def registrar_resumen(self):
+        """Una línea por histograma en el log"""
+        for nombre, datos in self.resumen().items():
+            logging.info(
+                f"Latencia {nombre}: n={datos['n']} media={datos['media_ms']:.2f}ms "
+                f"p50={datos['p50_ms']:.2f}ms p99={datos['p99_ms']:.2f}ms max={datos['max_ms']:.2f}ms"
+            )
+
+
+# Registro del proceso, compartido por el transporte y los bots
+metricas = Metricas()
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    metricas = metricas
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            cuerpo, tipo = self.metricas.texto_prometheus(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            cuerpo, tipo = json.dumps(self.metricas.resumen()), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        datos = cuerpo.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ExportadorMetricas:
+    """Servidor HTTP local y resumen periódico en el log, en hilos de fondo"""
+
+    def __init__(self, registro=None, puerto=PUERTO, host='127.0.0.1', intervalo=INTERVALO_RESUMEN):
+        self.metricas = registro or metricas
+        self.puerto = puerto
+        self.host = host
+        self.intervalo = intervalo
+        self.servidor = None
+        self.parada = threading.Event()
+
+    def iniciar(self):
+        manejador = type('Manejador', (_Manejador,), {'metricas': self.metricas})
+        try:
+            self.servidor = ThreadingHTTPServer((self.host, self.puerto), manejador)
+            self.servidor.daemon_threads = True
+            threading.Thread(target=self.servidor.serve_forever, name='metricas-http', daemon=True).start()
+            logging.info(f"Métricas en http://{self.host}:{self.servidor.server_port}/metrics")
+        except OSError as e:
+            logging.error(f"Endpoint de métricas no disponible: {str(e)}")
+            self.servidor = None
+
+        if self.intervalo:
+            threading.Thread(target=self._bucle_resumen, name='metricas-resumen', daemon=True).start()
+
+    def _bucle_resumen(self):
+        while not self.parada.wait(self.intervalo):
+            self.metricas.registrar_resumen()
+
+    def detener(self):
+        self.parada.set()
+        if self.servidor is not None:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+            self.servidor = None
@@ -0,0 +1,215 @@
+"""Motor multisímbolo: muchas estrategias TradingBot en un solo proceso
+
+Todas las estrategias comparten un ClienteHTTP (una sesión keep-alive con su
+planificador e interruptor), la InstantaneaMercado (un WebSocket de tickers
+y un get_tickers para todo el universo), el RegistroInstrumentos, el
+EstadoCuenta (un flujo privado y una reconciliación REST para todos) y el
+AlmacenVelas. Las velas llegan por unas pocas conexiones públicas, con hasta
+SIMBOLOS_POR_CONEXION símbolos cada una. Un único hilo reparte los ciclos con
+una cola ordenada por vencimiento: cada símbolo vuelve a la cola para el
+cierre de su próxima vela o, cerca de una banda, para su próximo tick
+intrabarra (ver cadencia.py).
+
+Uso:
+    python motor.py OMUSDT XRPUSDT DOGEUSDT
+    python motor.py SIM000USDT SIM001USDT --servidor http://127.0.0.1:8500
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import threading
+import argparse
+import logging
+import heapq
+import time
+
+from pybit.unified_trading import WebSocket
+
+from bot_mejorado4 import TradingBot
+from transporte import ClienteHTTP
+from almacen_velas import AlmacenVelas
+from instantanea_mercado import InstantaneaMercado
+from registro_instrumentos import RegistroInstrumentos
+from estado_cuenta import EstadoCuenta
+from resiliencia import PausaErrores
+from metricas import ExportadorMetricas
+from diario import DiarioDecisiones
+
+RETRASO_AVISO = 5            # Segundos de retraso de un ciclo que se avisan en el log
+SIMBOLOS_POR_CONEXION = 50   # Topics kline por WebSocket público
+HILOS_ARRANQUE = 8           # Backfills de velas en paralelo al arrancar
+
+_contexto = threading.local()
+
+
+class FiltroSimbolo(logging.Filter):
+    """Antepone el símbolo del ciclo en curso a los mensajes del bot"""
+
+    def filter(self, record):
+        symbol = getattr(_contexto, 'symbol', None)
+        if symbol:
+            record.msg = f"[{symbol}] {record.msg}"
+        return True
+
+
+@contextmanager
+def contexto_simbolo(symbol):
+    anterior = getattr(_contexto, 'symbol', None)
+    _contexto.symbol = symbol
+    try:
+        yield
+    finally:
+        _contexto.symbol = anterior
+
+
+class MotorMultisimbolo:
+    """Estrategias por símbolo sobre un transporte, un mercado y una cuenta compartidos"""
+
+    def __init__(self, simbolos, client=None, timeframe="5", api_key="", api_secret="",
+                 testnet=False, simbolos_por_conexion=SIMBOLOS_POR_CONEXION, clase_bot=TradingBot):
+        self.client = client or ClienteHTTP(api_key=api_key, api_secret=api_secret, testnet=testnet)
+        self.testnet = testnet
+        self.simbolos_por_conexion = simbolos_por_conexion
+        self.registro = RegistroInstrumentos(self.client)
+        self.mercado = InstantaneaMercado(self.client, testnet=testnet)
+        self.cuenta = EstadoCuenta(self.client, api_key, api_secret, testnet=testnet)
+        self.almacen = AlmacenVelas(self.client)
+        self.diario = DiarioDecisiones()
+        self.conexiones = []
+        self.parada = threading.Event()
+
+        self.registro.cargar()
+        self.registro.iniciar_refresco()
+
+        self.bots = {}
+        for symbol in dict.fromkeys(simbolos):
+            try:
+                self.bots[symbol] = clase_bot(
+                    symbol,
+                    client=self.client,
+                    registro=self.registro,
+                    mercado=self.mercado,
+                    cuenta=self.cuenta,
+                    almacen=self.almacen,
+                    timeframe=timeframe
+                )
+                self.bots[symbol].diario = self.diario
+            except Exception as e:
+                logging.error(f"Símbolo {symbol} descartado: {str(e)}")
+        if not self.bots:
+            raise ValueError("Ningún símbolo válido para el motor")
+        self.pausas = {symbol: PausaErrores() for symbol in self.bots}
+
+    def iniciar(self):
+        """Flujos compartidos de tickers y cuenta, y velas de cada símbolo por conexiones agrupadas"""
+        try:
+            self.mercado.suscribir(list(self.bots))
+        except Exception as e:
+            logging.error(f"Flujo de tickers no disponible, usando REST: {str(e)}")
+
+        try:
+            self.cuenta.iniciar()
+        except Exception as e:
+            logging.error(f"Flujo privado no disponible, usando REST: {str(e)}")
+            self.cuenta.detener()
+
+        self.diario.iniciar()
+        simbolos = list(self.bots)
+        tareas = []
+        for i in range(0, len(simbolos), self.simbolos_por_conexion):
+            try:
+                ws = WebSocket(testnet=self.testnet, channel_type="linear")
+                self.conexiones.append(ws)
+            except Exception as e:
+                logging.error(f"Conexión de velas no disponible, usando REST: {str(e)}")
+                ws = None
+            tareas.extend((symbol, ws) for symbol in simbolos[i:i + self.simbolos_por_conexion])
+
+        # El backfill es E/S: varios a la vez sobre el mismo transporte
+        with ThreadPoolExecutor(HILOS_ARRANQUE, thread_name_prefix='arranque') as pool:
+            list(pool.map(lambda tarea: self._iniciar_velas(*tarea), tareas))
+        logging.info(f"Motor con {len(self.bots)} símbolos y {len(self.conexiones)} conexiones de velas")
+
+    def _iniciar_velas(self, symbol, ws):
+        # Sin conexión compartida el bot funciona igual, pidiendo velas por REST
+        if ws is not None:
+            with contexto_simbolo(symbol):
+                self.bots[symbol].iniciar_velas(ws)
+
+    def ejecutar(self):
+        """Bucle cooperativo: cada símbolo ejecuta un ciclo corto y cede el turno"""
+        filtro = FiltroSimbolo()
+        logging.getLogger().addFilter(filtro)
+        # Primera evaluación de todos al arrancar; después cada uno sigue su cadencia
+        ahora = time.monotonic()
+        cola = [(ahora, i, symbol) for i, symbol in enumerate(self.bots)]
+
+        try:
+            while not self.parada.is_set():
+                vence, orden, symbol = cola[0]
+                espera = vence - time.monotonic()
+                if espera > 0:
+                    self.parada.wait(espera)
+                    continue
+
+                heapq.heappop(cola)
+                retraso = -espera
+                if retraso > RETRASO_AVISO:
+                    logging.warning(f"Ciclo de {symbol} con {retraso:.1f}s de retraso, demasiados símbolos en un hilo")
+
+                bot = self.bots[symbol]
+                pausa = self.pausas[symbol]
+                with contexto_simbolo(symbol):
+                    try:
+                        bot.ciclo()
+                        pausa.exito()
+                        siguiente = bot.espera_siguiente_ciclo()
+                    except Exception as e:
+                        siguiente = pausa.error(e)
+                        logging.error(f"Error general del sistema: {str(e)}. Reintento en {siguiente:.1f}s")
+
+                heapq.heappush(cola, (time.monotonic() + siguiente, orden, symbol))
+        finally:
+            logging.getLogger().removeFilter(filtro)
+
+    def detener(self):
+        self.parada.set()
+        for bot in self.bots.values():
+            if bot.flujo is not None:
+                bot.flujo.detener()
+        for ws in self.conexiones:
+            ws.exit()
+        self.conexiones = []
+        self.mercado.detener()
+        self.cuenta.detener()
+        self.diario.detener()
+
+    def run(self):
+        logging.info(f"Iniciando motor multisímbolo: {', '.join(self.bots)}")
+        ExportadorMetricas().iniciar()
+        self.iniciar()
+        try:
+            self.ejecutar()
+        finally:
+            self.detener()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecutar TradingBot sobre varios símbolos en un proceso")
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--timeframe', default='5', help="Intervalo de velas de las estrategias")
+    parser.add_argument('--testnet', action='store_true')
+    parser.add_argument('--servidor', help="URL de servidor_simulado.py en lugar de la API de Bybit")
+    args = parser.parse_args()
+
+    if args.servidor:
+        from servidor_simulado import apuntar_a
+        # El servidor simulado acepta cualquier clave si no se le indica una
+        with apuntar_a(args.servidor):
+            MotorMultisimbolo(args.symbols, timeframe=args.timeframe, api_key='simulado',
+                              api_secret='simulado').run()
+        return
+    MotorMultisimbolo(args.symbols, timeframe=args.timeframe, testnet=args.testnet).run()
+
+
+if __name__ == "__main__":
+    main()
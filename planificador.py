@@ -0,0 +1,187 @@
+"""Planificador de peticiones con límites de frecuencia y carriles de prioridad
+
+Cada endpoint privado tiene su cubeta de tokens (Bybit limita por UID y por
+endpoint) y los públicos comparten la del límite por IP. Las cubetas se
+corrigen con las cabeceras X-Bapi-Limit-* de cada respuesta. Las plazas de
+conexión se reparten por prioridad y unas cuantas quedan reservadas para
+órdenes, cancelaciones y trading-stop, que así nunca esperan detrás de un
+escaneo de mercado. Todo corre en el bucle asyncio del transporte.
+"""
+from contextlib import asynccontextmanager
+import itertools
+import asyncio
+import logging
+import heapq
+import time
+
+PRIORIDAD_ORDEN = 0
+PRIORIDAD_CUENTA = 1
+PRIORIDAD_MERCADO = 2
+
+PRIORIDADES = {
+    'place_order': PRIORIDAD_ORDEN,
+    'amend_order': PRIORIDAD_ORDEN,
+    'cancel_order': PRIORIDAD_ORDEN,
+    'cancel_all_orders': PRIORIDAD_ORDEN,
+    'set_trading_stop': PRIORIDAD_ORDEN,
+    'set_leverage': PRIORIDAD_ORDEN,
+    'get_wallet_balance': PRIORIDAD_CUENTA,
+    'get_positions': PRIORIDAD_CUENTA,
+    'get_open_orders': PRIORIDAD_CUENTA,
+    'get_executions': PRIORIDAD_CUENTA,
+}
+
+# Peticiones por segundo por defecto (límites v5 por UID); los públicos comparten
+# el límite por IP de 600 cada 5 s, con ráfaga acotada para no superarlo en la ventana
+LIMITES = {
+    'place_order': (10, 10),
+    'amend_order': (10, 10),
+    'cancel_order': (10, 10),
+    'cancel_all_orders': (1, 1),
+    'set_trading_stop': (10, 10),
+    'set_leverage': (10, 10),
+    'get_wallet_balance': (50, 50),
+    'get_positions': (50, 50),
+    'get_open_orders': (50, 50),
+    'get_executions': (50, 50),
+    'publico': (100, 100),
+}
+LIMITE_DESCONOCIDO = (10, 10)
+
+RESERVADAS_ORDEN = 4        # Plazas de conexión que solo pueden usar las órdenes
+CODIGOS_LIMITE = {10006, 10018}  # Too many visits (UID) / límite por IP superado
+ESPERA_SIN_CABECERA = 1.0   # Segundos de pausa si se supera el límite sin cabecera de reinicio
+
+
+def prioridad(nombre):
+    return PRIORIDADES.get(nombre, PRIORIDAD_MERCADO)
+
+
+class Cubeta:
+    """Cubeta de tokens: `tasa` peticiones por segundo con ráfagas de hasta `capacidad`"""
+
+    def __init__(self, tasa, capacidad):
+        self.tasa = float(tasa)
+        self.capacidad = float(capacidad)
+        self.tokens = float(capacidad)
+        self.momento = time.monotonic()
+        self.bloqueada_hasta = 0.0
+
+    def _rellenar(self, ahora):
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.momento) * self.tasa)
+        self.momento = ahora
+
+    def espera(self, ahora):
+        """Consume un token y devuelve 0, o devuelve los segundos hasta que haya uno"""
+        if ahora < self.bloqueada_hasta:
+            return self.bloqueada_hasta - ahora
+        self._rellenar(ahora)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.tasa
+
+    def ajustar(self, restantes, reinicio_ms, ahora):
+        """Alinear con el servidor: nunca más tokens de los que dice que quedan"""
+        self._rellenar(ahora)
+        self.tokens = min(self.tokens, float(restantes))
+        if restantes <= 0:
+            self.bloquear(max(reinicio_ms / 1000 - time.time(), 0.0) if reinicio_ms else ESPERA_SIN_CABECERA, ahora)
+
+    def bloquear(self, segundos, ahora):
+        self.tokens = 0.0
+        self.bloqueada_hasta = max(self.bloqueada_hasta, ahora + segundos)
+
+
+class Planificador:
+    """Cubetas por endpoint y plazas de conexión repartidas por prioridad"""
+
+    def __init__(self, plazas=16, reservadas=RESERVADAS_ORDEN, limites=None):
+        if plazas <= reservadas:
+            raise ValueError("Se necesitan más plazas que las reservadas para órdenes")
+        self.plazas = plazas
+        self.reservadas = reservadas
+        self.limites = {**LIMITES, **(limites or {})}
+        self.cubetas = {}
+        self.ocupadas = 0
+        self.cola = []
+        self.secuencia = itertools.count()
+
+    def cubeta(self, nombre):
+        clave = nombre if nombre in PRIORIDADES else 'publico'
+        cubeta = self.cubetas.get(clave)
+        if cubeta is None:
+            cubeta = Cubeta(*self.limites.get(clave, LIMITE_DESCONOCIDO))
+            self.cubetas[clave] = cubeta
+        return cubeta
+
+    @asynccontextmanager
+    async def turno(self, nombre):
+        """Esperar token y plaza para una petición; la plaza se libera al salir"""
+        cubeta = self.cubeta(nombre)
+        while True:
+            espera = cubeta.espera(time.monotonic())
+            if espera <= 0:
+                break
+            await asyncio.sleep(espera)
+
+        await self._ocupar(prioridad(nombre))
+        try:
+            yield
+        finally:
+            self._liberar()
+
+    def _disponibles(self, prioridad_peticion):
+        libres = self.plazas - self.ocupadas
+        return libres if prioridad_peticion == PRIORIDAD_ORDEN else libres - self.reservadas
+
+    async def _ocupar(self, prioridad_peticion):
+        # Sin colarse: solo se entra directo si nadie de igual o más prioridad espera
+        if self._disponibles(prioridad_peticion) > 0 and not (self.cola and self.cola[0][0] <= prioridad_peticion):
+            self.ocupadas += 1
+            return
+
+        futuro = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.cola, (prioridad_peticion, next(self.secuencia), futuro))
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            # Cancelada justo después de recibir la plaza: devolverla
+            if futuro.done() and not futuro.cancelled():
+                self._liberar()
+            raise
+
+    def _liberar(self):
+        self.ocupadas -= 1
+        while self.cola:
+            prioridad_peticion, _, futuro = self.cola[0]
+            if futuro.cancelled():
+                heapq.heappop(self.cola)
+                continue
+            if self._disponibles(prioridad_peticion) <= 0:
+                break
+            heapq.heappop(self.cola)
+            self.ocupadas += 1
+            futuro.set_result(None)
+
+    def registrar(self, nombre, cabeceras):
+        """Aplicar X-Bapi-Limit-Status / X-Bapi-Limit-Reset-Timestamp de una respuesta"""
+        restantes = cabeceras.get('X-Bapi-Limit-Status')
+        if restantes is None:
+            return
+        try:
+            reinicio = int(cabeceras.get('X-Bapi-Limit-Reset-Timestamp') or 0)
+            self.cubeta(nombre).ajustar(int(restantes), reinicio, time.monotonic())
+        except ValueError:
+            return
+
+    def limite_superado(self, nombre, cabeceras):
+        """Respuesta de límite superado: vaciar la cubeta hasta el reinicio indicado"""
+        cubeta = self.cubeta(nombre)
+        try:
+            reinicio = int(cabeceras.get('X-Bapi-Limit-Reset-Timestamp') or 0)
+        except ValueError:
+            reinicio = 0
+        espera = max(reinicio / 1000 - time.time(), 0.0) if reinicio else ESPERA_SIN_CABECERA
+        cubeta.bloquear(espera, time.monotonic())
+        logging.warning(f"Límite de peticiones superado en {nombre}, pausa de {espera:.2f}s")
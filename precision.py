@@ -0,0 +1,85 @@
+"""Precios y cantidades como múltiplos enteros del tickSize / qtyStep de cada instrumento
+
+Cada paso se representa como un entero sobre una potencia de diez (0.0005 es
+5 / 10**4), así que redondear un valor es una multiplicación y un redondeo a
+entero, y el texto para la orden se compone con aritmética entera: sin
+Decimal y sin restos binarios como 0.30000000000000004 en el payload.
+"""
+from decimal import Decimal
+from functools import lru_cache
+import math
+
+FLOOR = 'floor'
+CEIL = 'ceil'
+HALF_UP = 'half_up'
+
+# Distancia (en pasos) a un múltiplo o a un medio paso que se considera error de coma flotante
+TOLERANCIA_ABS = 1e-9
+TOLERANCIA_REL = 1e-13
+
+
+def modo_lado(side):
+    """Redondeo hacia el lado de la orden: compra hacia abajo, venta hacia arriba"""
+    return FLOOR if side == 'Buy' else CEIL
+
+
+class Rejilla:
+    """Rejilla de un paso (tickSize o qtyStep) con redondeo entero exacto"""
+
+    __slots__ = ('paso', 'decimales', 'escala', 'unidad', 'inverso')
+
+    def __init__(self, paso):
+        paso_dec = Decimal(str(paso)).normalize()
+        if paso_dec <= 0:
+            raise ValueError(f"Paso de precisión inválido: {paso}")
+        self.decimales = max(-paso_dec.as_tuple().exponent, 0)
+        self.escala = 10 ** self.decimales
+        self.unidad = int(paso_dec * self.escala)  # Paso en unidades de 10**-decimales
+        self.paso = self.unidad / self.escala
+        self.inverso = self.escala / self.unidad
+
+    def unidades(self, valor, modo=HALF_UP):
+        """Número entero de pasos para el valor, con el modo de redondeo indicado"""
+        n = valor * self.inverso
+        tolerancia = TOLERANCIA_ABS + abs(n) * TOLERANCIA_REL
+        if modo == FLOOR:
+            return math.floor(n + tolerancia)
+        if modo == CEIL:
+            return math.ceil(n - tolerancia)
+        return math.floor(n + 0.5 + tolerancia)
+
+    def valor(self, unidades):
+        return unidades * self.unidad / self.escala
+
+    def texto(self, unidades):
+        """Texto exacto para la API a partir de un número de pasos"""
+        escalado = unidades * self.unidad
+        if not self.decimales:
+            return str(escalado)
+        signo = '-' if escalado < 0 else ''
+        entero, fraccion = divmod(abs(escalado), self.escala)
+        return f"{signo}{entero}.{fraccion:0{self.decimales}d}"
+
+    def redondear(self, valor, modo=HALF_UP):
+        return self.valor(self.unidades(valor, modo))
+
+    def formatear(self, valor, modo=HALF_UP):
+        return self.texto(self.unidades(valor, modo))
+
+
+@lru_cache(maxsize=1024)
+def rejilla(paso):
+    """Rejilla compartida por paso (los instrumentos repiten pocos pasos distintos)"""
+    return Rejilla(paso)
+
+
+class Precision:
+    """Rejillas de precio y cantidad de un EspecInstrumento"""
+
+    __slots__ = ('symbol', 'precio', 'cantidad', 'min_qty')
+
+    def __init__(self, espec):
+        self.symbol = espec.symbol
+        self.precio = rejilla(espec.tick_size)
+        self.cantidad = rejilla(espec.qty_step)
+        self.min_qty = self.cantidad.unidades(espec.min_qty, CEIL) if espec.min_qty else 0
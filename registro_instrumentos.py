@@ -0,0 +1,146 @@
+from collections import namedtuple
+import threading
+import logging
+import json
+import time
+import os
+
+EspecInstrumento = namedtuple('EspecInstrumento', [
+    'symbol', 'tick_size', 'price_scale', 'qty_step', 'min_qty', 'max_qty', 'min_notional'
+])
+
+RUTA_CACHE = 'instrumentos_{category}.json'
+TTL_INSTRUMENTOS = 6 * 3600  # Segundos entre refrescos en segundo plano
+LIMITE_PAGINA = 1000
+
+
+def crear_espec(info):
+    """Construir la especificación inmutable a partir de un elemento de get_instruments_info"""
+    precio = info.get('priceFilter', {})
+    lote = info.get('lotSizeFilter', {})
+    return EspecInstrumento(
+        symbol=info['symbol'],
+        tick_size=float(precio.get('tickSize') or 0),
+        price_scale=int(info.get('priceScale') or 0),
+        qty_step=float(lote.get('qtyStep') or 0),
+        min_qty=float(lote.get('minOrderQty') or 0),
+        max_qty=float(lote.get('maxOrderQty') or 0),
+        min_notional=float(lote.get('minNotionalValue') or 0)
+    )
+
+
+class RegistroInstrumentos:
+    """Especificaciones de todos los instrumentos de una categoría
+
+    Se carga de una vez con llamadas paginadas, se guarda en disco para
+    arrancar al instante y se refresca en segundo plano cada TTL.
+    """
+
+    def __init__(self, client, category='linear', ruta=RUTA_CACHE, ttl=TTL_INSTRUMENTOS):
+        self.client = client
+        self.category = category
+        self.ruta = ruta.format(category=category) if ruta else None
+        self.ttl = ttl
+        self.especs = {}
+        self.actualizado = 0.0
+        self.lock = threading.Lock()
+        self.hilo = None
+
+    def __contains__(self, symbol):
+        return symbol in self.especs
+
+    def __len__(self):
+        return len(self.especs)
+
+    def cargar(self):
+        """Arranque en caliente desde disco; descarga completa si no hay caché"""
+        if self.ruta and os.path.exists(self.ruta):
+            try:
+                with open(self.ruta, encoding='utf-8') as f:
+                    cache = json.load(f)
+                self._publicar(cache['list'], cache.get('actualizado', 0.0))
+                logging.info(f"{len(self.especs)} instrumentos cargados desde {self.ruta}")
+            except Exception as e:
+                logging.warning(f"Caché de instrumentos no válida: {str(e)}")
+
+        if not self.especs:
+            self.refrescar()
+
+    def refrescar(self):
+        """Descargar todos los instrumentos de la categoría paginando con cursor"""
+        instrumentos = []
+        cursor = ''
+        while True:
+            response = self.client.get_instruments_info(
+                category=self.category,
+                limit=LIMITE_PAGINA,
+                cursor=cursor
+            )
+            if response['retCode'] != 0:
+                raise Exception(f"Error instrumentos: {response['retMsg']}")
+
+            instrumentos.extend(response['result'].get('list', []))
+            cursor = response['result'].get('nextPageCursor', '')
+            if not cursor:
+                break
+
+        self._publicar(instrumentos, time.time())
+        self._guardar(instrumentos)
+        logging.info(f"{len(self.especs)} instrumentos {self.category} actualizados")
+
+    def _publicar(self, instrumentos, actualizado):
+        especs = {}
+        for info in instrumentos:
+            try:
+                especs[info['symbol']] = crear_espec(info)
+            except (KeyError, TypeError, ValueError):
+                continue
+        with self.lock:
+            self.especs = especs
+            self.actualizado = actualizado
+
+    def _guardar(self, instrumentos):
+        if not self.ruta:
+            return
+        try:
+            temporal = self.ruta + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({'actualizado': self.actualizado, 'list': instrumentos}, f)
+            os.replace(temporal, self.ruta)
+        except OSError as e:
+            logging.warning(f"No se pudo guardar la caché de instrumentos: {str(e)}")
+
+    def obtener(self, symbol):
+        """Especificación del símbolo; pide solo ese símbolo si aún no está en el registro"""
+        espec = self.especs.get(symbol)
+        if espec is not None:
+            return espec
+
+        response = self.client.get_instruments_info(category=self.category, symbol=symbol)
+        if response['retCode'] != 0:
+            raise Exception(f"Error instrumentos: {response['retMsg']}")
+        if not response['result']['list']:
+            raise Exception(f"Instrumento no encontrado: {symbol}")
+
+        espec = crear_espec(response['result']['list'][0])
+        with self.lock:
+            self.especs = {**self.especs, symbol: espec}
+        return espec
+
+    def iniciar_refresco(self):
+        """Refrescar en segundo plano cada TTL (y enseguida si la caché ya caducó)"""
+        if self.hilo is not None:
+            return
+        self.hilo = threading.Thread(target=self._bucle_refresco, name="instrumentos", daemon=True)
+        self.hilo.start()
+
+    def _bucle_refresco(self):
+        while True:
+            espera = self.actualizado + self.ttl - time.time()
+            if espera > 0:
+                time.sleep(espera)
+            try:
+                self.refrescar()
+            except Exception as e:
+                logging.error(f"Error refrescando instrumentos: {str(e)}")
+                time.sleep(60)
@@ -0,0 +1,406 @@
+"""Micro-benchmarks de las rutas calientes: parseo de velas, indicadores y precisión
+
+Cada caso mide la implementación original (la de los bots con pandas y
+Decimal) frente a sus sustitutas sobre datos sintéticos fijos de 200, 1.000
+y 100.000 velas: tiempo por llamada (mínimo de varias repeticiones, con
+timeit) y pico de memoria asignada durante una llamada (tracemalloc).
+Antes de medir se comprueba que todas devuelven lo mismo que la original.
+
+Con --guardar los resultados quedan como base de esta máquina en
+rendimiento_base.json; las ejecuciones siguientes se comparan con ella y
+terminan con código 1 si algún tiempo o pico de memoria empeora más de la
+tolerancia, o si una implementación deja de coincidir con la original.
+
+Uso:
+    python rendimiento.py --guardar
+    python rendimiento.py --casos bollinger,atr --tamanos 200,1000
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_FLOOR
+from types import SimpleNamespace
+import tracemalloc
+import argparse
+import platform
+import timeit
+import json
+import sys
+import gc
+import os
+
+import numpy as np
+import pandas as pd
+
+from flujo_velas import SerieVelas, filas_kline, parsear_velas
+from indicadores import BollingerIncremental, ATRIncremental, rsi_sma, vwap
+from backtest_vectorizado import bandas_bollinger, atr_sma
+from precision import rejilla, FLOOR, HALF_UP
+
+TAMANOS = (200, 1000, 100000)
+SEMILLA = 20240501
+BASE = 'rendimiento_base.json'
+TOLERANCIA_TIEMPO = 0.30    # Empeoramiento relativo de tiempo que se considera regresión
+TOLERANCIA_MEMORIA = 0.10   # Ídem para el pico de memoria (más estable que el tiempo)
+HOLGURA_MEMORIA = 1024      # Bytes de margen absoluto en el pico de memoria
+REPETICIONES = 5
+LIMITE_REPETIR = 1.0        # Segundos por llamada a partir de los cuales se mide una sola vez
+RTOL = 1e-9                 # Diferencia relativa admitida entre la original y las sustitutas
+
+Implementacion = namedtuple('Implementacion', ['clave', 'descripcion', 'funcion'])
+Caso = namedtuple('Caso', ['implementaciones', 'extraer'])
+Medida = namedtuple('Medida', ['segundos', 'pico', 'coincide'])
+
+
+def carga_kline(n, semilla=SEMILLA):
+    """Respuesta de get_kline con n velas fijas (paseo aleatorio), la más reciente primero"""
+    rng = np.random.default_rng(semilla)
+    cierre = 0.9 * np.exp(np.cumsum(rng.normal(0.0, 0.002, n)))
+    apertura = np.empty(n)
+    apertura[0] = 0.9
+    apertura[1:] = cierre[:-1]
+    maximo = np.maximum(apertura, cierre) * (1 + np.abs(rng.normal(0.0, 0.001, n)))
+    minimo = np.minimum(apertura, cierre) * (1 - np.abs(rng.normal(0.0, 0.001, n)))
+    volumen = np.round(rng.gamma(2.0, 50000.0, n))
+    inicio = 1700000000000
+    filas = [
+        [str(inicio + i * 300000), f"{o:.4f}", f"{h:.4f}", f"{l:.4f}", f"{c:.4f}", f"{v:.0f}", f"{v * c:.4f}"]
+        for i, (o, h, l, c, v) in enumerate(zip(apertura, maximo, minimo, cierre, volumen))
+    ]
+    return {'retCode': 0, 'retMsg': 'OK', 'result': {'category': 'linear', 'symbol': 'OMUSDT',
+                                                      'list': filas[::-1]}}
+
+
+class ClienteFijo:
+    """get_kline que siempre devuelve la misma respuesta"""
+
+    def __init__(self, respuesta):
+        self.respuesta = respuesta
+
+    def get_kline(self, **kwargs):
+        return self.respuesta
+
+
+def _dataframe(respuesta):
+    columnas = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'turnover']
+    return pd.DataFrame(respuesta['result']['list'][::-1], columns=columnas).astype(float)
+
+
+# Implementaciones originales que ya no están en el árbol (se conservan como referencia)
+
+def qty_step_decimal(price, ticksize, scala_precio):
+    """qty_step original de script.py / bot_volatilidad.py"""
+    precision = Decimal(f"{10 ** scala_precio}")
+    tickdec = Decimal(f"{ticksize}")
+    precio_final = (Decimal(f"{price}") * precision) / precision
+    precide = precio_final.quantize(Decimal(f"{1 / precision}"), rounding=ROUND_FLOOR)
+    operaciondec = (precide / tickdec).quantize(Decimal('1'), rounding=ROUND_FLOOR) * tickdec
+    return float(operaciondec)
+
+
+def calculate_rsi_pandas(prices, period):
+    """calculate_rsi original de deepseek.py"""
+    delta = prices.diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.rolling(period).mean()
+    avg_loss = loss.rolling(period).mean()
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def calculate_vwap_pandas(df):
+    """calculate_vwap original de deepseek.py"""
+    return (df['close'] * df['volume']).cumsum() / df['volume'].cumsum()
+
+
+# Casos: la primera implementación es la referencia
+
+def caso_parseo(n):
+    from bot_mejorado import TradingBot as BotOriginal
+    respuesta = carga_kline(n)
+    lista = respuesta['result']['list']
+    bot = SimpleNamespace(client=ClienteFijo(respuesta), symbol='OMUSDT', timeframe='5')
+    serie = SerieVelas(n)
+
+    def serie_velas():
+        serie.cargar(filas_kline(lista))
+        return serie['close']
+
+    return Caso([
+        Implementacion('pandas', "DataFrame + to_numeric (bot_mejorado)",
+                       lambda: BotOriginal.obtener_datos_historicos(bot, limit=n)['close']),
+        Implementacion('filas_kline', "filas_kline + SerieVelas.cargar (bot_mejorado4)", serie_velas),
+        Implementacion('parsear_velas', "parsear_velas, respaldo fila a fila",
+                       lambda: [vela.close for vela in parsear_velas(lista)]),
+    ], lambda resultado: np.asarray(resultado, dtype=np.float64))
+
+
+def caso_bollinger(n):
+    from bot_mejorado import TradingBot as BotOriginal
+    datos = _dataframe(carga_kline(n))
+    cierres = datos['close'].to_numpy()
+    sembrado = BollingerIncremental(20, 2)
+    vivo = BollingerIncremental(20, 2)
+    vivo.sembrar(cierres)
+    ultimo = float(cierres[-1])
+
+    def sembrar():
+        sembrado.sembrar(cierres)
+        return sembrado.actual
+
+    def actualizar():
+        vivo.actualizar(ultimo)
+        return vivo.actual
+
+    return Caso([
+        Implementacion('pandas', "rolling de pandas (bot_mejorado)",
+                       lambda: BotOriginal.calcular_bandas_bollinger(None, datos)),
+        Implementacion('sembrar', "BollingerIncremental.sembrar (bot_mejorado4 sin flujo)", sembrar),
+        Implementacion('actualizar', "BollingerIncremental.actualizar (con flujo, por tick)", actualizar),
+        Implementacion('vectorizado', "bandas_bollinger (backtest_vectorizado)",
+                       lambda: bandas_bollinger(cierres)),
+    ], _extraer_bandas)
+
+
+def _extraer_bandas(resultado):
+    if isinstance(resultado, pd.Series):
+        return [resultado['Upper'], resultado['Lower']]
+    if isinstance(resultado, tuple) and len(resultado) == 3:
+        return [resultado[1][-1], resultado[2][-1]]
+    return [resultado.upper, resultado.lower]
+
+
+def caso_atr(n):
+    from bot_mejorado import TradingBot as BotOriginal
+    datos = _dataframe(carga_kline(n))
+    high, low, close = (datos[c].to_numpy() for c in ('high', 'low', 'close'))
+    sembrado = ATRIncremental(14)
+    vivo = ATRIncremental(14)
+    vivo.sembrar(high, low, close)
+    ultima = (float(high[-1]), float(low[-1]), float(close[-1]))
+
+    def sembrar():
+        sembrado.sembrar(high, low, close)
+        return sembrado.actual
+
+    def actualizar():
+        vivo.actualizar(*ultima)
+        return vivo.actual
+
+    return Caso([
+        Implementacion('pandas', "concat + rolling de pandas (bot_mejorado)",
+                       lambda: BotOriginal.calcular_atr(None, datos)),
+        Implementacion('sembrar', "ATRIncremental.sembrar (bot_mejorado4 sin flujo)", sembrar),
+        Implementacion('actualizar', "ATRIncremental.actualizar (con flujo, por tick)", actualizar),
+        Implementacion('vectorizado', "atr_sma (backtest_vectorizado)", lambda: atr_sma(high, low, close)[-1]),
+    ], lambda resultado: [resultado])
+
+
+def caso_precision(n):
+    """n cantidades redondeadas al qtyStep, como size_posicion"""
+    from bot_mejorado import TradingBot as BotOriginal
+    rng = np.random.default_rng(SEMILLA)
+    valores = (rng.uniform(1.0, 5000.0, n)).tolist()
+    paso = 0.1
+    precios = rejilla(paso)
+    return Caso([
+        Implementacion('decimal', "Decimal.quantize (bot_mejorado.calcular_precision)",
+                       lambda: [BotOriginal.calcular_precision(None, v, paso) for v in valores]),
+        Implementacion('rejilla', "Rejilla.redondear (precision.py)",
+                       lambda: [precios.redondear(v, HALF_UP) for v in valores]),
+    ], lambda resultado: np.asarray(resultado, dtype=np.float64))
+
+
+def caso_qty_step(n):
+    """n precios de stop/take profit ajustados al tickSize"""
+    rng = np.random.default_rng(SEMILLA)
+    valores = (0.9 * rng.uniform(0.8, 1.2, n)).tolist()
+    ticksize, scala_precio = 0.0001, 4
+    precios = rejilla(ticksize)
+    return Caso([
+        Implementacion('decimal', "Decimal en tres pasos (qty_step original)",
+                       lambda: [qty_step_decimal(v, ticksize, scala_precio) for v in valores]),
+        Implementacion('rejilla', "Rejilla.formatear (qty_step actual)",
+                       lambda: [precios.formatear(v, FLOOR) for v in valores]),
+    ], lambda resultado: np.asarray(resultado, dtype=np.float64))
+
+
+def caso_rsi(n):
+    datos = _dataframe(carga_kline(n))
+    cierres = datos['close'].to_numpy()
+    return Caso([
+        Implementacion('pandas', "diff + where + rolling (calculate_rsi original)",
+                       lambda: calculate_rsi_pandas(datos['close'], 14)),
+        Implementacion('numpy', "indicadores.rsi_sma", lambda: rsi_sma(cierres, 14)),
+    ], lambda resultado: np.asarray(resultado, dtype=np.float64))
+
+
+def caso_vwap(n):
+    datos = _dataframe(carga_kline(n))
+    cierres, volumen = datos['close'].to_numpy(), datos['volume'].to_numpy()
+    return Caso([
+        Implementacion('pandas', "cumsum de pandas (calculate_vwap original)",
+                       lambda: calculate_vwap_pandas(datos)),
+        Implementacion('numpy', "indicadores.vwap", lambda: vwap(cierres, volumen)),
+    ], lambda resultado: np.asarray(resultado, dtype=np.float64))
+
+
+CASOS = {
+    'parseo': caso_parseo,
+    'bollinger': caso_bollinger,
+    'atr': caso_atr,
+    'precision': caso_precision,
+    'qty_step': caso_qty_step,
+    'rsi': caso_rsi,
+    'vwap': caso_vwap,
+}
+
+
+def _coincide(referencia, valor):
+    referencia = np.asarray(referencia, dtype=np.float64)
+    valor = np.asarray(valor, dtype=np.float64)
+    if referencia.shape != valor.shape:
+        return False
+    return bool(np.allclose(valor, referencia, rtol=RTOL, atol=0.0, equal_nan=True))
+
+
+def medir_tiempo(funcion, repeticiones=REPETICIONES):
+    """Segundos por llamada: mínimo de varias tandas de al menos 0,2 s (timeit.autorange)"""
+    temporizador = timeit.Timer(funcion)
+    numero, total = temporizador.autorange()
+    tiempos = [total / numero]
+    if tiempos[0] < LIMITE_REPETIR:
+        tiempos.extend(t / numero for t in temporizador.repeat(repeticiones - 1, numero))
+    return min(tiempos)
+
+
+def medir_memoria(funcion):
+    """Pico de bytes asignados durante una llamada, y su resultado"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        resultado = funcion()
+        pico = tracemalloc.get_traced_memory()[1] - antes
+    finally:
+        tracemalloc.stop()
+    return pico, resultado
+
+
+def ejecutar(casos=None, tamanos=TAMANOS, repeticiones=REPETICIONES, salida=print):
+    """Resultados {'caso/tamaño/clave': Medida} de los casos indicados"""
+    resultados = {}
+    for nombre in casos or CASOS:
+        for n in tamanos:
+            caso = CASOS[nombre](n)
+            referencia = None
+            salida(f"\n{nombre}  n={n}")
+            for implementacion in caso.implementaciones:
+                # Se mide el tiempo primero: esas llamadas calientan cachés e imports
+                # perezosos que, si no, contarían en el pico de memoria
+                segundos = medir_tiempo(implementacion.funcion, repeticiones)
+                pico, resultado = medir_memoria(implementacion.funcion)
+                valor = caso.extraer(resultado)
+                if referencia is None:
+                    referencia = valor
+                medida = Medida(segundos, pico, _coincide(referencia, valor))
+                coincide = medida.coincide
+                resultados[f"{nombre}/{n}/{implementacion.clave}"] = medida
+
+                base = resultados[f"{nombre}/{n}/{caso.implementaciones[0].clave}"]
+                relacion = 'referencia' if implementacion is caso.implementaciones[0] else \
+                    f"x{base.segundos / medida.segundos:.1f}"
+                salida(f"  {implementacion.descripcion:<56} {_tiempo(medida.segundos):>10} "
+                       f"{medida.pico / 1024:>10.1f} KiB  {relacion}{'' if coincide else '  DISTINTO'}")
+    return resultados
+
+
+def _tiempo(segundos):
+    if segundos >= 1:
+        return f"{segundos:.2f} s"
+    if segundos >= 1e-3:
+        return f"{segundos * 1e3:.2f} ms"
+    return f"{segundos * 1e6:.2f} µs"
+
+
+def maquina():
+    """Identificador de la máquina y versiones: los tiempos solo se comparan con la misma"""
+    return (f"{platform.node()} {platform.machine()} python {platform.python_version()} "
+            f"numpy {np.__version__} pandas {pd.__version__}")
+
+
+def cargar_base(ruta=BASE):
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def guardar_base(resultados, ruta=BASE):
+    """Añadir o sustituir los resultados de esta máquina en el fichero de bases"""
+    bases = cargar_base(ruta)
+    actual = bases.setdefault(maquina(), {})
+    for clave, medida in resultados.items():
+        actual[clave] = {'segundos': medida.segundos, 'pico': medida.pico}
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(bases, f, indent=1, sort_keys=True)
+
+
+def regresiones(resultados, base, tolerancia=TOLERANCIA_TIEMPO, tolerancia_memoria=TOLERANCIA_MEMORIA):
+    """Mensajes de las medidas que empeoran respecto a la base o ya no coinciden con la referencia"""
+    mensajes = []
+    for clave, medida in resultados.items():
+        if not medida.coincide:
+            mensajes.append(f"{clave}: el resultado no coincide con la implementación de referencia")
+        anterior = base.get(clave)
+        if anterior is None:
+            continue
+        if medida.segundos > anterior['segundos'] * (1 + tolerancia):
+            mensajes.append(f"{clave}: {_tiempo(medida.segundos)} por llamada, base "
+                            f"{_tiempo(anterior['segundos'])} (+{(medida.segundos / anterior['segundos'] - 1) * 100:.0f}%)")
+        if medida.pico > anterior['pico'] * (1 + tolerancia_memoria) + HOLGURA_MEMORIA:
+            mensajes.append(f"{clave}: pico de {medida.pico / 1024:.1f} KiB, base {anterior['pico'] / 1024:.1f} KiB")
+    return mensajes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de parseo, indicadores y precisión")
+    parser.add_argument('--casos', help=f"Separados por comas: {','.join(CASOS)}")
+    parser.add_argument('--tamanos', help="Velas por caso, separadas por comas (por defecto 200,1000,100000)")
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES)
+    parser.add_argument('--base', default=BASE, help="Fichero de bases por máquina")
+    parser.add_argument('--guardar', action='store_true', help="Guardar los resultados como base de esta máquina")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_TIEMPO,
+                        help="Empeoramiento de tiempo admitido (0.3 = 30 %%)")
+    args = parser.parse_args()
+
+    casos = args.casos.split(',') if args.casos else list(CASOS)
+    desconocidos = [c for c in casos if c not in CASOS]
+    if desconocidos:
+        parser.error(f"Casos desconocidos: {', '.join(desconocidos)}")
+    tamanos = tuple(int(t) for t in args.tamanos.split(',')) if args.tamanos else TAMANOS
+
+    print(maquina())
+    resultados = ejecutar(casos, tamanos, args.repeticiones)
+
+    base = cargar_base(args.base).get(maquina(), {})
+    mensajes = regresiones(resultados, base, args.tolerancia)
+    if not base:
+        print(f"\nSin base para esta máquina en {args.base}" + ("" if args.guardar else " (usar --guardar)"))
+    if args.guardar:
+        # Una base nunca se guarda con resultados incorrectos
+        if any(not medida.coincide for medida in resultados.values()):
+            print("\nNo se guarda la base: hay implementaciones que no coinciden con la referencia")
+        else:
+            guardar_base(resultados, args.base)
+            print(f"\nBase guardada en {args.base}")
+            mensajes = [m for m in mensajes if 'no coincide' in m]
+
+    if mensajes:
+        print(f"\n{'!' * 20} REGRESIÓN {'!' * 20}")
+        for mensaje in mensajes:
+            print(f"  {mensaje}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
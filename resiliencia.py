@@ -0,0 +1,176 @@
+"""Reintentos con backoff exponencial, interruptor de circuito y pausas de los bucles
+
+Los errores se clasifican en transitorios (red, timeouts, errores internos
+del servidor), de límite de frecuencia y permanentes (parámetros, saldo...).
+Solo los transitorios cuentan para el interruptor: tras varios seguidos se
+abre y las llamadas fallan al instante; pasado el enfriamiento deja pasar una
+única sonda (semiabierto) y, si responde, todo vuelve a ir a ritmo normal.
+"""
+import threading
+import logging
+import random
+import time
+
+from planificador import CODIGOS_LIMITE
+
+TRANSITORIO = 'transitorio'
+LIMITE = 'limite'
+PERMANENTE = 'permanente'
+
+# retCode de la API v5 que indican un problema del servidor y no de la petición
+CODIGOS_TRANSITORIOS = {10000, 10016, 10019, 170007, 170146}
+
+UMBRAL_FALLOS = 5        # Fallos transitorios seguidos que abren el circuito
+ENFRIAMIENTO = 2.0       # Segundos hasta la primera sonda; se dobla si la sonda falla
+ENFRIAMIENTO_MAX = 60.0
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+
+class CircuitoAbierto(ConnectionError):
+    """La API se considera caída; la llamada no se ha enviado"""
+
+    def __init__(self, espera):
+        super().__init__(f"Circuito abierto, próxima sonda en {espera:.1f}s")
+        self.espera = espera
+
+
+def clasificar(error=None, respuesta=None):
+    """Categoría de un error (excepción) o de una respuesta de la API con retCode != 0"""
+    if respuesta is not None:
+        codigo = respuesta.get('retCode') if isinstance(respuesta, dict) else None
+        if codigo in CODIGOS_LIMITE:
+            return LIMITE
+        return TRANSITORIO if codigo in CODIGOS_TRANSITORIOS else PERMANENTE
+
+    # ErrorTransporte y CircuitoAbierto son ConnectionError
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return TRANSITORIO
+    texto = str(error).lower()
+    if 'timed out' in texto or 'timeout' in texto or 'connection' in texto:
+        return TRANSITORIO
+    if 'too many visits' in texto or 'rate limit' in texto:
+        return LIMITE
+    return PERMANENTE
+
+
+class Backoff:
+    """Esperas exponenciales con jitter (entre la mitad y el techo), con contador por clave"""
+
+    def __init__(self, base=BACKOFF_BASE, maximo=BACKOFF_MAX, factor=2.0):
+        self.base = base
+        self.maximo = maximo
+        self.factor = factor
+        self.intentos = {}
+        self.lock = threading.Lock()
+
+    def siguiente(self, clave):
+        with self.lock:
+            intento = self.intentos.get(clave, 0)
+            self.intentos[clave] = intento + 1
+        techo = min(self.maximo, self.base * self.factor ** intento)
+        return random.uniform(techo / 2, techo)
+
+    def reiniciar(self, clave):
+        with self.lock:
+            self.intentos.pop(clave, None)
+
+
+class Interruptor:
+    """Interruptor de circuito cerrado / abierto / semiabierto compartido por todas las llamadas"""
+
+    CERRADO = 'cerrado'
+    ABIERTO = 'abierto'
+    SEMIABIERTO = 'semiabierto'
+
+    def __init__(self, umbral=UMBRAL_FALLOS, enfriamiento=ENFRIAMIENTO, enfriamiento_max=ENFRIAMIENTO_MAX):
+        self.umbral = umbral
+        self.enfriamiento_base = enfriamiento
+        self.enfriamiento_max = enfriamiento_max
+        self.enfriamiento = enfriamiento
+        self.estado = self.CERRADO
+        self.fallos = 0
+        self.reapertura = 0.0
+        self.sonda_en_curso = False
+        self.lock = threading.Lock()
+
+    def permitir(self):
+        """True si la llamada puede salir; en semiabierto solo sale una sonda a la vez"""
+        with self.lock:
+            if self.estado == self.CERRADO:
+                return True
+            if self.estado == self.ABIERTO and time.monotonic() >= self.reapertura:
+                self.estado = self.SEMIABIERTO
+                self.sonda_en_curso = False
+            if self.estado == self.SEMIABIERTO and not self.sonda_en_curso:
+                self.sonda_en_curso = True
+                return True
+            return False
+
+    @property
+    def cerrado(self):
+        return self.estado == self.CERRADO
+
+    def espera(self):
+        """Segundos hasta que se permita la próxima sonda (0 si el circuito está cerrado)"""
+        with self.lock:
+            if self.estado == self.CERRADO:
+                return 0.0
+            return max(self.reapertura - time.monotonic(), 0.0)
+
+    def exito(self):
+        with self.lock:
+            if self.estado != self.CERRADO:
+                logging.info("API disponible de nuevo, circuito cerrado")
+            self.estado = self.CERRADO
+            self.fallos = 0
+            self.sonda_en_curso = False
+            self.enfriamiento = self.enfriamiento_base
+
+    def fallo(self):
+        with self.lock:
+            self.fallos += 1
+            if self.estado == self.SEMIABIERTO:
+                # Sonda fallida: otro enfriamiento, más largo
+                self.enfriamiento = min(self.enfriamiento * 2, self.enfriamiento_max)
+            elif self.fallos < self.umbral:
+                return
+            if self.estado != self.ABIERTO:
+                logging.warning(f"API sin respuesta ({self.fallos} fallos), circuito abierto {self.enfriamiento:.1f}s")
+            self.estado = self.ABIERTO
+            self.sonda_en_curso = False
+            self.reapertura = time.monotonic() + self.enfriamiento
+
+    def liberar_sonda(self):
+        """La sonda terminó sin veredicto (error inesperado o cancelación): permitir otra"""
+        with self.lock:
+            self.sonda_en_curso = False
+
+
+# Estado de la API compartido por el transporte y los bucles de los bots
+interruptor_api = Interruptor()
+
+
+class PausaErrores:
+    """Pausa de un bucle principal tras un error, en lugar de un sleep fijo
+
+    Errores transitorios: backoff exponencial con jitter. Circuito abierto:
+    se duerme justo hasta la próxima sonda. Permanentes: la pausa normal del
+    bucle. Un ciclo correcto (exito) vuelve a la pausa mínima.
+    """
+
+    def __init__(self, normal=10.0, maximo=60.0, interruptor=None):
+        self.normal = normal
+        self.interruptor = interruptor or interruptor_api
+        self.backoff = Backoff(base=1.0, maximo=maximo)
+
+    def error(self, error):
+        if isinstance(error, CircuitoAbierto):
+            return max(error.espera, 0.1)
+        if clasificar(error) == PERMANENTE:
+            return self.normal
+        espera = self.interruptor.espera()
+        return espera if espera > 0 else self.backoff.siguiente('bucle')
+
+    def exito(self):
+        self.backoff.reiniciar('bucle')
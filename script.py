@@ -1,8 +1,8 @@
-from pybit.unified_trading import HTTP
+from transporte import ClienteHTTP
 import pandas as pd
-import math
-from decimal import Decimal, ROUND_DOWN, ROUND_FLOOR
 import time
+from precision import rejilla, FLOOR
+from resiliencia import PausaErrores
 
 # Configuracion de la API
 api_key= input("por favor ingrese api key ")
@@ -14,7 +14,7 @@ usdt = 10  # Cantidad de dolares para abrir posicion.
 tp_porcent = 0.5  # Take profit porcentaje
 sl_porcent = 1  # Stop loss porcentaje
 
-client = HTTP(api_key=api_key, api_secret=api_secret, testnet=False)
+client = ClienteHTTP(api_key=api_key, api_secret=api_secret, testnet=False)
 
 # Datos de la moneda precio y pasos.
 step = client.get_instruments_info(category="linear", symbol=symbol)
@@ -42,18 +42,12 @@ def calcular_bandas_bollinger(data, ventana=20, desviacion=2):
     return data.iloc[-1]
 
 def qty_precision(qty, precision):
-    qty = math.floor(qty / precision) * precision
-    return qty
+    """Cantidad redondeada hacia abajo al qtyStep, como texto exacto para la orden"""
+    return rejilla(precision).formatear(qty, FLOOR)
 
 def qty_step(price):
-    precision = Decimal(f"{10 ** scala_precio}")
-    tickdec = Decimal(f"{ticksize}")
-    precio_final = (Decimal(f"{price}") * precision) / precision
-    precide = precio_final.quantize(Decimal(f"{1 / precision}"), rounding=ROUND_FLOOR)
-    operaciondec = (precide / tickdec).quantize(Decimal('1'), rounding=ROUND_FLOOR) * tickdec
-    result = float(operaciondec)
-
-    return result
+    """Precio redondeado hacia abajo al tickSize (ya es múltiplo de la escala de precio)"""
+    return rejilla(ticksize).formatear(price, FLOOR)
 
 def crear_orden(symbol, side, order_type, qty):
     response = client.place_order(
@@ -97,6 +91,7 @@ def establecer_take_profit(symbol, tp, side, qty):
 stop = False
 tipo = ""
 qty = 0
+pausa = PausaErrores()
 while True:
     try:
         posiciones = client.get_positions(category="linear", symbol=symbol)
@@ -132,8 +127,6 @@ while True:
                 precision = precision_step
                 qty = usdt / precio
                 qty = qty_precision(qty, precision)
-                if qty.is_integer():
-                    qty = int(qty)
                 print("Cantidad de monedas: " + str(qty))
                 if tipo == "long" or tipo == "":
                     crear_orden(symbol,"Sell", "Market", qty)
@@ -143,14 +136,14 @@ while True:
                 precision = precision_step
                 qty = usdt / precio
                 qty = qty_precision(qty, precision)
-                if qty.is_integer():
-                    qty = int(qty)
                 print("Cantidad de monedas: " + str(qty))
                 if tipo == "short" or tipo == "":
                     crear_orden(symbol,"Buy", "Market", qty)
                     tipo = "long"
+        pausa.exito()
     except Exception as e:
-        print(f"Error en el bot: {e}")
-        time.sleep(60)
+        espera = pausa.error(e)
+        print(f"Error en el bot: {e}. Reintento en {espera:.1f}s")
+        time.sleep(espera)
 
 
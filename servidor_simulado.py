@@ -0,0 +1,674 @@
+"""Servidor local con la API v5 de Bybit (REST y WebSocket) para pruebas de carga sin red
+
+Atiende los endpoints REST que usan los bots y los topics públicos
+(kline, tickers) y privados (position, order, execution, wallet) sobre el
+mismo exchange simulado del backtest (ClienteSimulado y MercadoSimulado),
+pero con el reloj real: los precios siguen caminos sintéticos o grabados
+desplazados para que la vela en curso sea la de ahora.
+
+Se puede inyectar latencia con jitter, errores (HTTP 502 y retCode 10016),
+peticiones colgadas que superan el timeout del cliente, cortes de WebSocket
+y los límites de frecuencia de la API (por UID y endpoint, con las
+cabeceras X-Bapi-Limit-*, y por IP con HTTP 403).
+
+Uso:
+    python servidor_simulado.py --simbolos 300 --interval 1 --latencia 30 --jitter 20 --errores 0.01
+    python motor.py SIM000USDT SIM001USDT --timeframe 1 --servidor http://127.0.0.1:8500
+"""
+from urllib.parse import urlsplit
+import contextlib
+import threading
+import argparse
+import itertools
+import asyncio
+import logging
+import hashlib
+import random
+import hmac
+import json
+import time
+
+import aiohttp
+from aiohttp import web
+import numpy as np
+
+from backtest import ClienteSimulado, MercadoSimulado, cargar_velas_csv, _respuesta, _error
+from flujo_velas import intervalo_ms
+from planificador import LIMITES, LIMITE_DESCONOCIDO
+from transporte import ENDPOINTS
+
+HOST = '127.0.0.1'
+PUERTO = 8500
+INTERVALO_WS = 1.0           # Segundos entre envíos de kline y tickers
+RETRASO_SUSCRIPCION = 0.2    # pybit registra el topic después de enviar la suscripción
+ESPERA_COLGADA = 30.0        # Segundos de una petición colgada (más que cualquier timeout del cliente)
+LIMITE_IP = (600, 5)         # Peticiones por ventana de segundos y dirección IP
+INTERVALO_RESUMEN = 60       # Segundos entre resúmenes en el log
+PUNTOS_VELA = 12             # Puntos del camino sintético por vela
+RECV_WINDOW = 5000
+
+# Endpoints que el exchange simulado sabe atender (el resto responde 404)
+ATENDIDOS = (
+    'get_kline', 'get_tickers', 'get_instruments_info', 'get_server_time', 'get_wallet_balance',
+    'get_positions', 'get_open_orders', 'place_order', 'cancel_order', 'set_trading_stop', 'set_leverage'
+)
+PARAMETROS_ENTEROS = ('limit', 'start', 'end')
+
+
+def velas_sinteticas(n, timeframe, inicio_ms, precio=1.0, volatilidad=0.003, puntos=PUNTOS_VELA, semilla=None):
+    """Paseo aleatorio geométrico: velas y camino de precios de `puntos` ticks por vela
+
+    La volatilidad es la desviación del retorno por vela. Devuelve las velas
+    (mismo formato que cargar_velas_csv) y los tickers (timestamps, precios).
+    """
+    intervalo = intervalo_ms(timeframe)
+    rng = np.random.default_rng(semilla)
+    retornos = rng.normal(0.0, volatilidad / np.sqrt(puntos), n * puntos)
+    camino = precio * np.exp(np.cumsum(retornos))
+    matriz = camino.reshape(n, puntos)
+    ts = inicio_ms + np.arange(n, dtype=np.int64) * intervalo
+    volumen = rng.gamma(2.0, 50000.0, n)
+    velas = {
+        'timestamp': ts,
+        'open': matriz[:, 0],
+        'high': matriz.max(axis=1),
+        'low': matriz.min(axis=1),
+        'close': matriz[:, -1],
+        'volume': volumen,
+        'turnover': volumen * matriz.mean(axis=1)
+    }
+    ts_camino = (ts[:, None] + np.arange(puntos, dtype=np.int64) * (intervalo // puntos)).ravel()
+    return velas, (ts_camino, camino)
+
+
+def desplazar_velas(velas, timeframe, barras, ahora_ms, tickers=None):
+    """Mover una serie grabada para que la vela `barras` sea la vela en curso"""
+    intervalo = intervalo_ms(timeframe)
+    if len(velas['timestamp']) <= barras:
+        raise ValueError(f"Hacen falta más de {barras} velas grabadas")
+    desfase = (ahora_ms // intervalo) * intervalo - int(velas['timestamp'][barras])
+    velas = dict(velas, timestamp=velas['timestamp'] + desfase)
+    if tickers is not None:
+        tickers = (tickers[0] + desfase, tickers[1])
+    return velas, tickers
+
+
+def _recortar(velas, tickers, fin_ms):
+    """Quitar las velas (y ticks) posteriores a fin_ms"""
+    n = int(np.searchsorted(velas['timestamp'], fin_ms, side='right'))
+    velas = {campo: valores[:n] for campo, valores in velas.items()}
+    if tickers is not None:
+        m = int(np.searchsorted(tickers[0], fin_ms, side='right'))
+        tickers = (tickers[0][:m], tickers[1][:m])
+    return velas, tickers
+
+
+class ExchangeSimulado(ClienteSimulado):
+    """ClienteSimulado que además anota los cambios para los topics privados"""
+
+    def __init__(self, mercados, balance=1000.0, **opciones):
+        super().__init__(time, mercados, balance, **opciones)
+        self.ejecuciones = []
+        self.cambios_ordenes = []
+        self.simbolos_cambiados = set()
+        self.cartera_cambiada = False
+
+    def _procesar_precio(self, symbol, precio, t_ms):
+        pendientes = {o['orderId']: o for o in self.ordenes.values() if o['symbol'] == symbol}
+        super()._procesar_precio(symbol, precio, t_ms)
+        for order_id, orden in pendientes.items():
+            if order_id not in self.ordenes:
+                self._anotar_orden(orden, 'Filled', t_ms)
+
+    def _ejecutar(self, symbol, side, qty, precio, comision, t_ms, take_profit=None, stop_loss=None):
+        super()._ejecutar(symbol, side, qty, precio, comision, t_ms, take_profit, stop_loss)
+        self.ejecuciones.append({
+            'category': 'linear', 'symbol': symbol, 'side': side, 'execQty': repr(qty),
+            'execPrice': repr(precio), 'execFee': repr(qty * precio * comision),
+            'execType': 'Trade', 'execTime': str(t_ms), 'isMaker': comision < 0.0005
+        })
+        self.simbolos_cambiados.add(symbol)
+        self.cartera_cambiada = True
+
+    def _anotar_orden(self, orden, estado, t_ms):
+        self.cambios_ordenes.append({
+            'category': 'linear', 'orderId': orden['orderId'], 'symbol': orden['symbol'],
+            'side': orden['side'], 'orderType': orden.get('orderType', 'Limit'),
+            'price': repr(orden['precio'] or 0), 'qty': repr(orden['qty']), 'orderStatus': estado,
+            'takeProfit': repr(orden.get('takeProfit') or 0), 'stopLoss': repr(orden.get('stopLoss') or 0),
+            'updatedTime': str(t_ms)
+        })
+
+    def place_order(self, symbol, side, orderType, qty, price=None, **kwargs):
+        respuesta = super().place_order(symbol, side, orderType, qty, price, **kwargs)
+        if respuesta['retCode'] == 0:
+            order_id = respuesta['result']['orderId']
+            orden = self.ordenes.get(order_id)
+            if orden is None:
+                # Market: ya ejecutada
+                orden = {'orderId': order_id, 'symbol': symbol, 'side': side, 'orderType': orderType,
+                         'qty': float(qty), 'precio': self.mercados[symbol].precio(self._t_ms())}
+                self._anotar_orden(orden, 'Filled', self._t_ms())
+            else:
+                self._anotar_orden(orden, 'New', self._t_ms())
+        return respuesta
+
+    def cancel_order(self, symbol, orderId=None, **kwargs):
+        orden = self.ordenes.get(orderId)
+        respuesta = super().cancel_order(symbol, orderId, **kwargs)
+        if respuesta['retCode'] == 0:
+            self._anotar_orden(orden, 'Cancelled', self._t_ms())
+        return respuesta
+
+    def set_trading_stop(self, symbol, **kwargs):
+        respuesta = super().set_trading_stop(symbol, **kwargs)
+        if respuesta['retCode'] == 0:
+            self.simbolos_cambiados.add(symbol)
+        return respuesta
+
+    def eventos(self):
+        """Mensajes (topic, datos) pendientes para el flujo privado, vaciando la lista"""
+        eventos = []
+        if self.cambios_ordenes:
+            eventos.append(('order', self.cambios_ordenes))
+            self.cambios_ordenes = []
+        if self.ejecuciones:
+            eventos.append(('execution', self.ejecuciones))
+            self.ejecuciones = []
+        if self.simbolos_cambiados:
+            posiciones = []
+            for symbol in sorted(self.simbolos_cambiados):
+                for posicion in self.get_positions(symbol=symbol)['result']['list']:
+                    posiciones.append({**posicion, 'category': 'linear'})
+            eventos.append(('position', posiciones))
+            self.simbolos_cambiados = set()
+        if self.cartera_cambiada:
+            eventos.append(('wallet', self.get_wallet_balance()['result']['list']))
+            self.cartera_cambiada = False
+        return eventos
+
+
+class LimitesPeticiones:
+    """Ventanas fijas de un segundo por (clave, endpoint), como los límites por UID de la API"""
+
+    def __init__(self, limites=None):
+        self.limites = {**LIMITES, **(limites or {})}
+        self.ventanas = {}
+
+    def consumir(self, clave, nombre, ahora):
+        """(permitida, límite, restantes, reinicio en ms epoch)"""
+        limite = int(self.limites.get(nombre, LIMITE_DESCONOCIDO)[0])
+        inicio = int(ahora)
+        ventana = self.ventanas.get((clave, nombre))
+        if ventana is None or ventana[0] != inicio:
+            ventana = self.ventanas[(clave, nombre)] = [inicio, 0]
+        ventana[1] += 1
+        reinicio = (inicio + 1) * 1000
+        return ventana[1] <= limite, limite, max(limite - ventana[1], 0), reinicio
+
+
+class ConexionWS:
+    """Estado de una conexión WebSocket: topics suscritos y última vela enviada por topic"""
+
+    def __init__(self, ws, id_conexion, autenticada):
+        self.ws = ws
+        self.id = id_conexion
+        self.autenticada = autenticada
+        self.topics = set()
+        self.iniciados = set()
+        self.velas = {}
+
+
+class ServidorSimulado:
+    """Aplicación aiohttp con REST y WebSocket v5 sobre un ExchangeSimulado, en un bucle de fondo
+
+    Latencias en segundos; `jitter` es la media de un retraso exponencial que
+    se suma a la latencia (cola larga). `errores`, `colgadas` y `cortes` son
+    probabilidades por petición (las dos primeras) y por conexión y segundo.
+    Con api_key/api_secret se comprueban las firmas como en la API real.
+    """
+
+    def __init__(self, mercados, balance=1000.0, latencia=0.0, jitter=0.0, errores=0.0, colgadas=0.0,
+                 cortes=0.0, limites=True, api_key=None, api_secret=None, intervalo_ws=INTERVALO_WS,
+                 semilla=None):
+        self.exchange = ExchangeSimulado(mercados, balance)
+        self.mercados = self.exchange.mercados
+        self.latencia = latencia
+        self.jitter = jitter
+        self.errores = errores
+        self.colgadas = colgadas
+        self.cortes = cortes
+        self.limites = LimitesPeticiones() if limites else None
+        self.limite_ip = LIMITE_IP if limites else None
+        self.ventanas_ip = {}
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.intervalo_ws = intervalo_ws
+        self.azar = random.Random(semilla)
+        self.publicas = set()
+        self.privadas = set()
+        self.ids = itertools.count(1)
+        self.contadores = {}
+        self.loop = None
+        self.hilo = None
+        self.runner = None
+        self.tarea = None
+        self.url = None
+
+    # Ciclo de vida
+
+    def aplicacion(self):
+        app = web.Application()
+        for nombre in ATENDIDOS:
+            endpoint = ENDPOINTS[nombre]
+            app.router.add_route(endpoint.metodo, endpoint.ruta, self._manejador(nombre))
+        app.router.add_get('/v5/public/linear', self._ws_publico)
+        app.router.add_get('/v5/private', self._ws_privado)
+        return app
+
+    def iniciar(self, host=HOST, puerto=PUERTO):
+        """Arrancar en un hilo de fondo; devuelve la URL base (puerto 0: uno libre)"""
+        self.loop = asyncio.new_event_loop()
+        self.hilo = threading.Thread(target=self.loop.run_forever, name='servidor-simulado', daemon=True)
+        self.hilo.start()
+        asyncio.run_coroutine_threadsafe(self._arrancar(host, puerto), self.loop).result()
+        logging.info(f"Servidor simulado en {self.url} con {len(self.mercados)} símbolos")
+        return self.url
+
+    async def _arrancar(self, host, puerto):
+        self.runner = web.AppRunner(self.aplicacion(), access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, puerto).start()
+        self.url = f"http://{host}:{self.runner.addresses[0][1]}"
+        self.tarea = asyncio.ensure_future(self._difundir())
+
+    def detener(self):
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._parar(), self.loop).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.hilo.join(timeout=5)
+        self.loop.close()
+        self.loop = self.hilo = None
+
+    async def _parar(self):
+        self.tarea.cancel()
+        for conexion in list(self.publicas | self.privadas):
+            await conexion.ws.close()
+        await self.runner.cleanup()
+
+    def _contar(self, clave):
+        self.contadores[clave] = self.contadores.get(clave, 0) + 1
+
+    def resumen(self):
+        return dict(sorted(self.contadores.items()))
+
+    # REST
+
+    def _manejador(self, nombre):
+        async def manejar(request):
+            return await self._atender(nombre, request)
+        return manejar
+
+    async def _atender(self, nombre, request):
+        self._contar(f"rest.{nombre}")
+        ahora = time.time()
+        if self.limite_ip is not None and not self._permitir_ip(request.remote, ahora):
+            self._contar('limite.ip')
+            return web.Response(status=403, text='access too frequent')
+
+        endpoint = ENDPOINTS[nombre]
+        cuerpo = await request.text() if endpoint.metodo == 'POST' else ''
+        cabeceras = {}
+        if endpoint.firmado:
+            rechazo = self._autenticar(request, cuerpo)
+            if rechazo is not None:
+                self._contar('rechazo.firma')
+                return web.json_response(rechazo)
+            if self.limites is not None:
+                clave = request.headers.get('X-BAPI-API-KEY', '')
+                permitida, limite, restantes, reinicio = self.limites.consumir(clave, nombre, ahora)
+                cabeceras = {
+                    'X-Bapi-Limit': str(limite),
+                    'X-Bapi-Limit-Status': str(restantes),
+                    'X-Bapi-Limit-Reset-Timestamp': str(reinicio)
+                }
+                if not permitida:
+                    self._contar('limite.uid')
+                    return web.json_response(_error("Too many visits!", 10006), headers=cabeceras)
+
+        retraso = self.latencia + (self.azar.expovariate(1 / self.jitter) if self.jitter else 0.0)
+        if retraso > 0:
+            await asyncio.sleep(retraso)
+        if self.errores and self.azar.random() < self.errores:
+            self._contar('inyectado.error')
+            if self.azar.random() < 0.5:
+                return web.Response(status=502, text='<html><body>502 Bad Gateway</body></html>')
+            return web.json_response(_error("Internal System Error.", 10016))
+
+        try:
+            params = dict(request.query) if endpoint.metodo == 'GET' else json.loads(cuerpo or '{}')
+            respuesta = self._llamar(nombre, params)
+        except (ValueError, TypeError) as e:
+            respuesta = _error(f"params error: {str(e)}", 10001)
+        respuesta['time'] = int(time.time() * 1000)
+
+        if self.colgadas and self.azar.random() < self.colgadas:
+            # La petición se ha ejecutado pero la respuesta no llega a tiempo
+            self._contar('inyectado.colgada')
+            await asyncio.sleep(ESPERA_COLGADA)
+        return web.json_response(respuesta, headers=cabeceras)
+
+    def _llamar(self, nombre, params):
+        if nombre == 'get_server_time':
+            ahora = time.time_ns()
+            return _respuesta({'timeSecond': str(ahora // 10 ** 9), 'timeNano': str(ahora)})
+        for campo in PARAMETROS_ENTEROS:
+            if campo in params:
+                params[campo] = int(params[campo])
+        if nombre == 'get_kline':
+            mercado = self.mercados.get(params.get('symbol'))
+            if mercado is not None and str(params.get('interval')) != mercado.timeframe:
+                return _error(f"Invalid period! (servidor con velas de {mercado.timeframe})", 10001)
+        return getattr(self.exchange, nombre)(**params)
+
+    def _permitir_ip(self, ip, ahora):
+        limite, segundos = self.limite_ip
+        inicio = int(ahora // segundos)
+        ventana = self.ventanas_ip.get(ip)
+        if ventana is None or ventana[0] != inicio:
+            ventana = self.ventanas_ip[ip] = [inicio, 0]
+        ventana[1] += 1
+        return ventana[1] <= limite
+
+    def _autenticar(self, request, cuerpo):
+        """None si la firma es válida (o no se comprueba); si no, la respuesta de error"""
+        clave = request.headers.get('X-BAPI-API-KEY')
+        if not clave:
+            return _error("API key is invalid.", 10003)
+        if self.api_key is None or self.api_secret is None:
+            return None
+        if clave != self.api_key:
+            return _error("API key is invalid.", 10003)
+        timestamp = request.headers.get('X-BAPI-TIMESTAMP', '')
+        ventana = request.headers.get('X-BAPI-RECV-WINDOW', str(RECV_WINDOW))
+        carga = request.query_string if request.method == 'GET' else cuerpo
+        esperada = hmac.new(self.api_secret.encode(), (timestamp + clave + ventana + carga).encode(),
+                            hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(esperada, request.headers.get('X-BAPI-SIGN', '')):
+            return _error(f"error sign! origin_string[{timestamp + clave + ventana + carga}]", 10004)
+        try:
+            if abs(time.time() * 1000 - int(timestamp)) > int(ventana):
+                return _error("invalid request, please check your server timestamp or recv_window param", 10002)
+        except ValueError:
+            return _error("invalid request, please check your server timestamp or recv_window param", 10002)
+        return None
+
+    # WebSocket
+
+    async def _ws_publico(self, request):
+        return await self._atender_ws(request, self.publicas, privada=False)
+
+    async def _ws_privado(self, request):
+        return await self._atender_ws(request, self.privadas, privada=True)
+
+    async def _atender_ws(self, request, conexiones, privada):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        conexion = ConexionWS(ws, f"sim-{next(self.ids)}", autenticada=not privada)
+        conexiones.add(conexion)
+        self._contar('ws.privada' if privada else 'ws.publica')
+        try:
+            async for mensaje in ws:
+                if mensaje.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                try:
+                    peticion = json.loads(mensaje.data)
+                except ValueError:
+                    continue
+                await self._operacion_ws(conexion, peticion, privada)
+        finally:
+            conexiones.discard(conexion)
+        return ws
+
+    async def _operacion_ws(self, conexion, peticion, privada):
+        op = peticion.get('op')
+        respuesta = {'success': True, 'ret_msg': '', 'conn_id': conexion.id,
+                     'req_id': peticion.get('req_id', ''), 'op': op}
+        if op == 'ping':
+            respuesta['ret_msg'] = 'pong'
+        elif op == 'auth':
+            if not self._autenticar_ws(peticion.get('args') or []):
+                respuesta.update(success=False, ret_msg='Params Error')
+            conexion.autenticada = respuesta['success']
+        elif op == 'subscribe':
+            topics = peticion.get('args') or []
+            invalidos = [t for t in topics if not self._topic_valido(t, privada)]
+            if invalidos or not conexion.autenticada:
+                respuesta.update(success=False, ret_msg=f"error:handler not found,topic:{','.join(invalidos)}")
+            asyncio.ensure_future(self._confirmar_suscripcion(conexion, respuesta, topics))
+            return
+        elif op == 'unsubscribe':
+            conexion.topics.difference_update(peticion.get('args') or [])
+        await conexion.ws.send_str(json.dumps(respuesta))
+
+    async def _confirmar_suscripcion(self, conexion, respuesta, topics):
+        await asyncio.sleep(RETRASO_SUSCRIPCION)
+        if conexion.ws.closed:
+            return
+        await conexion.ws.send_str(json.dumps(respuesta))
+        if respuesta['success']:
+            conexion.topics.update(topics)
+
+    def _autenticar_ws(self, args):
+        if len(args) != 3:
+            return False
+        if self.api_key is None or self.api_secret is None:
+            return True
+        clave, expira, firma = args
+        esperada = hmac.new(self.api_secret.encode(), f"GET/realtime{expira}".encode(), hashlib.sha256).hexdigest()
+        return clave == self.api_key and hmac.compare_digest(esperada, str(firma))
+
+    def _topic_valido(self, topic, privada):
+        if privada:
+            return topic in ('position', 'order', 'execution', 'wallet')
+        partes = topic.split('.')
+        if partes[0] == 'tickers' and len(partes) == 2:
+            return partes[1] in self.mercados
+        if partes[0] == 'kline' and len(partes) == 3:
+            mercado = self.mercados.get(partes[2])
+            return mercado is not None and mercado.timeframe == partes[1]
+        return False
+
+    async def _difundir(self):
+        """Cada intervalo: avanzar el exchange, publicar velas y tickers y los cambios de cuenta"""
+        resumen = time.monotonic()
+        while True:
+            await asyncio.sleep(self.intervalo_ws)
+            try:
+                self.exchange.avanzar()
+                ahora_ms = int(time.time() * 1000)
+                for conexion in list(self.publicas):
+                    await self._publicar(conexion, ahora_ms)
+                eventos = self.exchange.eventos()
+                for conexion in list(self.privadas):
+                    for topic, datos in eventos:
+                        if topic in conexion.topics:
+                            await self._enviar(conexion, {'id': f"{conexion.id}-{next(self.ids)}",
+                                                          'topic': topic, 'creationTime': ahora_ms,
+                                                          'data': datos})
+                if self.cortes:
+                    for conexion in list(self.publicas | self.privadas):
+                        if self.azar.random() < self.cortes * self.intervalo_ws:
+                            self._contar('inyectado.corte')
+                            await conexion.ws.close()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Error en la difusión del servidor simulado: {str(e)}")
+
+            if time.monotonic() - resumen >= INTERVALO_RESUMEN:
+                resumen = time.monotonic()
+                logging.info(f"Servidor simulado: {self.resumen()}")
+
+    async def _publicar(self, conexion, ahora_ms):
+        for topic in list(conexion.topics):
+            partes = topic.split('.')
+            mercado = self.mercados[partes[-1]]
+            if partes[0] == 'kline':
+                for datos in self._velas_topic(conexion, topic, mercado, ahora_ms):
+                    await self._enviar(conexion, {'topic': topic, 'data': [datos], 'ts': ahora_ms,
+                                                  'type': 'snapshot'})
+            else:
+                precio = repr(mercado.precio(ahora_ms))
+                datos = {'symbol': mercado.symbol, 'lastPrice': precio, 'markPrice': precio,
+                         'bid1Price': precio, 'ask1Price': precio}
+                tipo = 'delta' if topic in conexion.iniciados else 'snapshot'
+                conexion.iniciados.add(topic)
+                await self._enviar(conexion, {'topic': topic, 'type': tipo, 'data': datos,
+                                              'cs': next(self.ids), 'ts': ahora_ms})
+
+    def _velas_topic(self, conexion, topic, mercado, ahora_ms):
+        """Vela cerrada (confirm) si ha cambiado la vela desde el último envío, y la vela viva"""
+        k = mercado.indice_vela(ahora_ms)
+        if k < 0:
+            return []
+        anterior = conexion.velas.get(topic)
+        conexion.velas[topic] = k
+        filas = []
+        if anterior is not None and anterior < k:
+            filas.append((mercado.filas[k - 1], True))
+        fila = mercado.fila_viva(ahora_ms)
+        if fila is not None:
+            filas.append((fila, False))
+        return [{
+            'start': int(fila[0]), 'end': int(fila[0]) + mercado.intervalo - 1, 'interval': mercado.timeframe,
+            'open': fila[1], 'close': fila[4], 'high': fila[2], 'low': fila[3],
+            'volume': fila[5], 'turnover': fila[6], 'confirm': confirmada, 'timestamp': ahora_ms
+        } for fila, confirmada in filas]
+
+    async def _enviar(self, conexion, mensaje):
+        if not conexion.ws.closed:
+            self._contar('ws.mensajes')
+            await conexion.ws.send_str(json.dumps(mensaje))
+
+
+@contextlib.contextmanager
+def apuntar_a(url):
+    """Dirigir al servidor los ClienteHTTP y WebSocket de pybit que se creen dentro del bloque"""
+    import transporte
+    from pybit import unified_trading
+
+    partes = urlsplit(url)
+    ws = f"{'wss' if partes.scheme == 'https' else 'ws'}://{partes.netloc}"
+    cambios = [
+        (transporte, 'URL_PRINCIPAL', url),
+        (transporte, 'URL_TESTNET', url),
+        (unified_trading, 'PUBLIC_WSS', ws + '/v5/public/{CHANNEL_TYPE}'),
+        (unified_trading, 'PRIVATE_WSS', ws + '/v5/private'),
+    ]
+    originales = [(modulo, nombre, getattr(modulo, nombre)) for modulo, nombre, _ in cambios]
+    for modulo, nombre, valor in cambios:
+        setattr(modulo, nombre, valor)
+    try:
+        yield url
+    finally:
+        for modulo, nombre, valor in originales:
+            setattr(modulo, nombre, valor)
+
+
+def crear_mercados(simbolos, timeframe, barras=200, horas=24, velas=None, tickers=None, tick_size='0.0001',
+                   qty_step='1', semilla=0):
+    """MercadoSimulado por símbolo: la serie grabada dada o un paseo sintético por símbolo
+
+    La vela `barras` es la vela en curso al arrancar; hay `horas` de camino por delante.
+    """
+    intervalo = intervalo_ms(timeframe)
+    if not intervalo:
+        raise ValueError(f"Intervalo no soportado: {timeframe}")
+    ahora_ms = int(time.time() * 1000)
+    actual = (ahora_ms // intervalo) * intervalo
+    fin_ms = actual + int(horas * 3600 * 1000)
+    n = barras + int(horas * 3600 * 1000) // intervalo + 1
+
+    mercados = []
+    for i, symbol in enumerate(simbolos):
+        if velas is None:
+            # Precios repartidos entre 0.01 y 100 para probar varias escalas de tick
+            exponente = (i % 5) - 2
+            precio = 10.0 ** exponente
+            serie, camino = velas_sinteticas(n, timeframe, actual - barras * intervalo, precio,
+                                             semilla=None if semilla is None else semilla + i)
+            tick = f"{10.0 ** (exponente - 4):.{4 - exponente}f}"
+        else:
+            serie, camino = desplazar_velas(velas, timeframe, barras, ahora_ms, tickers)
+            serie, camino = _recortar(serie, camino, fin_ms)
+            tick = tick_size
+        mercados.append(MercadoSimulado(symbol, serie, timeframe, tick, qty_step, camino))
+    return mercados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local con la API v5 de Bybit para pruebas sin red")
+    parser.add_argument('symbols', nargs='*', help="Símbolos (por defecto SIM000USDT... según --simbolos)")
+    parser.add_argument('--simbolos', type=int, default=10, help="Número de símbolos sintéticos")
+    parser.add_argument('--interval', default='5')
+    parser.add_argument('--velas', help="CSV de velas grabadas (se usa el mismo camino para todos los símbolos)")
+    parser.add_argument('--almacen', help="Directorio de AlmacenVelas con las velas grabadas de cada símbolo")
+    parser.add_argument('--tickers', help="CSV timestamp,lastPrice con el camino de precios grabado")
+    parser.add_argument('--barras', type=int, default=200, help="Velas de histórico antes de la vela en curso")
+    parser.add_argument('--horas', type=float, default=24, help="Horas de camino de precios por delante")
+    parser.add_argument('--tick-size', default='0.0001')
+    parser.add_argument('--qty-step', default='1')
+    parser.add_argument('--balance', type=float, default=10000.0)
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--puerto', type=int, default=PUERTO)
+    parser.add_argument('--latencia', type=float, default=0.0, help="Latencia REST en ms")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Media en ms del retraso exponencial añadido")
+    parser.add_argument('--errores', type=float, default=0.0, help="Probabilidad de error por petición")
+    parser.add_argument('--colgadas', type=float, default=0.0, help="Probabilidad de respuesta que no llega")
+    parser.add_argument('--cortes', type=float, default=0.0, help="Probabilidad de corte por conexión WS y segundo")
+    parser.add_argument('--sin-limites', action='store_true', help="No aplicar límites de frecuencia")
+    parser.add_argument('--api-key', help="Comprobar firmas con esta clave")
+    parser.add_argument('--api-secret')
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    simbolos = args.symbols or [f"SIM{i:03d}USDT" for i in range(args.simbolos)]
+    tickers = None
+    if args.tickers:
+        from backtest import cargar_tickers_csv
+        tickers = cargar_tickers_csv(args.tickers)
+
+    if args.almacen:
+        from almacen_velas import AlmacenVelas
+        almacen = AlmacenVelas(None, args.almacen)
+        mercados = []
+        for symbol in simbolos:
+            mercados.extend(crear_mercados([symbol], args.interval, args.barras, args.horas,
+                                           almacen.columnas(symbol, args.interval), None,
+                                           args.tick_size, args.qty_step))
+    else:
+        velas = cargar_velas_csv(args.velas) if args.velas else None
+        mercados = crear_mercados(simbolos, args.interval, args.barras, args.horas, velas, tickers,
+                                  args.tick_size, args.qty_step, args.semilla)
+
+    servidor = ServidorSimulado(
+        mercados, args.balance, args.latencia / 1000, args.jitter / 1000, args.errores, args.colgadas,
+        args.cortes, not args.sin_limites, args.api_key, args.api_secret, semilla=args.semilla
+    )
+    servidor.iniciar(args.host, args.puerto)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.detener()
+        for clave, valor in servidor.resumen().items():
+            print(f"{clave:>28}: {valor}")
+
+
+if __name__ == "__main__":
+    main()
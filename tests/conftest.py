@@ -0,0 +1,9 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitacora import configurar_logging
+
+# Antes de importar los bots: sin fichero ni consola, trading_bot.log queda intacto
+configurar_logging(None, consola=False)
@@ -0,0 +1,57 @@
+import numpy as np
+
+import almacen_velas
+from almacen_velas import AlmacenVelas, ANCHO
+
+PASO = 300000
+
+
+def _velas(desde, n):
+    ts = 1700000000000 + (desde + np.arange(n)) * PASO
+    filas = np.tile(np.arange(1, ANCHO, dtype=np.float64), (n, 1)) + (desde + np.arange(n))[:, None]
+    return np.column_stack([ts, filas])
+
+
+def test_vista_de_columnas_sobrevive_a_agregar(tmp_path):
+    almacen = AlmacenVelas(None, str(tmp_path))
+    almacen.agregar('OMUSDT', '5', _velas(0, 10))
+    vista = almacen.columnas('OMUSDT', '5')
+    cierres = vista['close'].copy()
+
+    # Velas nuevas al final: se escriben en sitio, sin reemplazar el fichero mapeado
+    almacen.agregar('OMUSDT', '5', _velas(10, 1))
+    assert len(almacen.versiones('OMUSDT', '5')) == 1
+    assert len(almacen.serie('OMUSDT', '5')) == 11
+    np.testing.assert_array_equal(vista['close'], cierres)
+
+    # Relleno de un hueco: versión nueva del fichero, la vista sigue intacta
+    almacen.agregar('OMUSDT', '5', np.concatenate([_velas(0, 5), _velas(12, 2)]))
+    almacen.agregar('OMUSDT', '5', _velas(11, 1))
+    np.testing.assert_array_equal(vista['close'], cierres)
+    assert len(vista['close']) == 10
+    assert len(almacen.serie('OMUSDT', '5')) == 14
+    # La versión anterior se borra cuando nadie la tiene abierta (en POSIX, enseguida)
+    assert list(almacen.versiones('OMUSDT', '5')) == [2]
+
+
+def test_reapertura_ignora_la_reserva(tmp_path):
+    almacen = AlmacenVelas(None, str(tmp_path))
+    almacen.agregar('OMUSDT', '5', _velas(0, 10))
+    almacen.agregar('OMUSDT', '5', _velas(10, 3))
+
+    serie = AlmacenVelas(None, str(tmp_path)).serie('OMUSDT', '5')
+    np.testing.assert_array_equal(np.asarray(serie), _velas(0, 13))
+    assert not (np.asarray(serie)[:, 0] == 0).any()
+
+
+def test_reserva_agotada_pasa_a_una_version_nueva(tmp_path, monkeypatch):
+    monkeypatch.setattr(almacen_velas, 'RESERVA', 4)
+    almacen = AlmacenVelas(None, str(tmp_path))
+    almacen.agregar('OMUSDT', '5', _velas(0, 2))
+    for i in range(2, 12):
+        almacen.agregar('OMUSDT', '5', _velas(i, 1))
+
+    np.testing.assert_array_equal(np.asarray(almacen.serie('OMUSDT', '5')), _velas(0, 12))
+    assert max(almacen.versiones('OMUSDT', '5')) >= 2
+    np.testing.assert_array_equal(np.asarray(AlmacenVelas(None, str(tmp_path)).serie('OMUSDT', '5')),
+                                  _velas(0, 12))
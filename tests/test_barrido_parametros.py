@@ -0,0 +1,29 @@
+from barrido_parametros import TablaResultados, METRICAS
+
+
+def _metricas(**valores):
+    return {**{clave: 0.0 for clave in METRICAS}, 'operaciones': 20, **valores}
+
+
+def test_drawdown_se_ordena_de_menor_a_mayor():
+    tabla = TablaResultados('max_drawdown_pct', top=2)
+    for i, drawdown in enumerate([30.0, 5.0, 50.0, 10.0]):
+        tabla.agregar({'i': i}, _metricas(max_drawdown_pct=drawdown))
+
+    assert [m['max_drawdown_pct'] for _, m in tabla.ordenadas()] == [5.0, 10.0]
+
+
+def test_retorno_se_ordena_de_mayor_a_menor():
+    tabla = TablaResultados('retorno_pct', top=2)
+    for i, retorno in enumerate([3.0, -1.0, 8.0, 5.0]):
+        tabla.agregar({'i': i}, _metricas(retorno_pct=retorno))
+
+    assert [m['retorno_pct'] for _, m in tabla.ordenadas()] == [8.0, 5.0]
+
+
+def test_minimizar_explicito():
+    tabla = TablaResultados('retorno_pct', top=1, minimizar=True)
+    for i, retorno in enumerate([3.0, -1.0, 8.0]):
+        tabla.agregar({'i': i}, _metricas(retorno_pct=retorno))
+
+    assert [m['retorno_pct'] for _, m in tabla.ordenadas()] == [-1.0]
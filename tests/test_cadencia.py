@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+import bot_mejorado4
+import estado_cuenta
+import flujo_velas
+import instantanea_mercado
+import registro_instrumentos
+from backtest import ClienteSimulado, RelojSimulado, reloj_simulado
+from servidor_simulado import crear_mercados
+
+PROCESO = 3.0  # Segundos simulados entre la señal y el ack de la orden
+
+
+class ClienteLento(ClienteSimulado):
+    """La orden se confirma unos segundos después de enviarse"""
+
+    def place_order(self, **kwargs):
+        self.reloj.sleep(PROCESO)
+        return super().place_order(**kwargs)
+
+
+@pytest.fixture
+def bot_simulado(tmp_path, monkeypatch):
+    """Bot sobre ClienteLento con el reloj simulado; anota las evaluaciones fuera de enfriamiento"""
+    monkeypatch.chdir(tmp_path)
+    reloj = RelojSimulado(time.time())
+    cliente = ClienteLento(reloj, crear_mercados(['OMUSDT'], '5', horas=1))
+    modulos = [bot_mejorado4, estado_cuenta, instantanea_mercado, flujo_velas, registro_instrumentos]
+    with reloj_simulado(reloj, modulos):
+        registro = registro_instrumentos.RegistroInstrumentos(cliente, ruta=None)
+        registro.cargar()
+        bot = bot_mejorado4.TradingBot('OMUSDT', client=cliente, registro=registro, timeframe='5')
+        bot.evaluaciones = []
+        monkeypatch.setattr(bot, 'obtener_datos_historicos', lambda: bot.evaluaciones.append(reloj.time()))
+        yield bot, reloj
+
+
+def _orden(bot, reloj, segundos_en_vela):
+    """Orden enviada `segundos_en_vela` después de abrir una vela; devuelve el inicio de la vela"""
+    vela = bot.cadencia.proximo_cierre(reloj.time()) - bot.cadencia.desfase
+    reloj.ahora = vela + segundos_en_vela
+    precio = bot.mercado.precio('OMUSDT')
+    _, respuesta = bot.gestionar_orden('Buy', precio, precio * 0.99, t_senal=reloj.time())
+    assert respuesta['retCode'] == 0
+    assert reloj.time() == vela + segundos_en_vela + PROCESO
+    return vela
+
+
+def test_orden_al_cierre_no_cuesta_una_vela(bot_simulado):
+    bot, reloj = bot_simulado
+    vela = _orden(bot, reloj, bot.cadencia.desfase)
+
+    # Dentro de la misma vela sigue en enfriamiento
+    reloj.sleep(60)
+    bot.ejecutar_estrategia()
+    assert bot.evaluaciones == []
+
+    # El cierre siguiente se evalúa aunque no hayan pasado 300 s desde el ack
+    reloj.sleep(bot.cadencia.espera(reloj.time()))
+    assert reloj.time() - (vela + bot.cadencia.desfase + PROCESO) < bot_mejorado4.COOLDOWN_PERIOD
+    bot.ejecutar_estrategia()
+    assert bot.evaluaciones == [reloj.time()]
+
+
+def test_orden_intrabarra_espera_el_periodo_completo(bot_simulado):
+    bot, reloj = bot_simulado
+    vela = _orden(bot, reloj, 290.0)
+    fin = vela + 290 + bot_mejorado4.COOLDOWN_PERIOD
+
+    # El cierre siguiente llega 12 s después de la señal: sigue en enfriamiento
+    reloj.sleep(bot.cadencia.espera(reloj.time()))
+    assert reloj.time() == vela + 300 + bot.cadencia.desfase
+    bot.ejecutar_estrategia()
+    assert bot.evaluaciones == []
+
+    # Ni con un tick intrabarra un minuto antes de cumplirse el periodo
+    reloj.ahora = fin - 60
+    bot.ejecutar_estrategia()
+    assert bot.evaluaciones == []
+
+    # Cumplido el periodo desde la señal, se vuelve a evaluar
+    reloj.ahora = fin
+    bot.ejecutar_estrategia()
+    assert bot.evaluaciones == [reloj.time()]
@@ -0,0 +1,112 @@
+import time
+
+from estado_cuenta import EstadoCuenta
+from ciclo_operaciones import GestorOperaciones
+
+
+class ClienteVacio:
+    """REST sin posiciones ni órdenes abiertas"""
+
+    def get_positions(self, **kwargs):
+        return {'retCode': 0, 'result': {'list': []}}
+
+    def get_open_orders(self, **kwargs):
+        return {'retCode': 0, 'result': {'list': []}}
+
+    def get_wallet_balance(self, **kwargs):
+        return {'retCode': 0, 'result': {'list': []}}
+
+
+def _gestor(plazo_pendiente=60):
+    cuenta = EstadoCuenta(ClienteVacio())
+    return cuenta, GestorOperaciones(cuenta, plazo_pendiente=plazo_pendiente)
+
+
+def test_entrada_rechazada_libera_el_simbolo():
+    cuenta, gestor = _gestor()
+    operacion = gestor.abrir('OMUSDT', 'Buy', 10, 1.0, timeout=4 * 3600, order_id='e1')
+    assert gestor.activa('OMUSDT')
+
+    cuenta._on_order({'data': [{'orderId': 'e1', 'symbol': 'OMUSDT', 'side': 'Buy',
+                                'orderStatus': 'Cancelled', 'cumExecQty': '0'}]})
+
+    assert operacion.resultado(timeout=1).estado == 'rechazada'
+    assert not gestor.activa('OMUSDT')
+
+
+def test_abre_y_cierra_entre_actualizaciones_de_posicion():
+    cuenta, gestor = _gestor()
+    operacion = gestor.abrir('OMUSDT', 'Sell', 10, 1.0, timeout=4 * 3600, order_id='e1')
+
+    # La entrada y el stop loss se ejecutan sin que llegue una posición con tamaño
+    cuenta._on_execution({'data': [{'orderId': 'e1', 'symbol': 'OMUSDT', 'side': 'Sell',
+                                    'execType': 'Trade', 'execQty': '10'}]})
+    assert not operacion.terminada
+    cuenta._on_execution({'data': [{'orderId': 'sl1', 'symbol': 'OMUSDT', 'side': 'Buy',
+                                    'execType': 'Trade', 'execQty': '10'}]})
+
+    assert operacion.resultado(timeout=1).estado == 'cerrada'
+    assert not gestor.activa('OMUSDT')
+
+
+def test_reconciliacion_sin_posicion_ni_orden_libera_el_simbolo():
+    cuenta, gestor = _gestor()
+    operacion = gestor.abrir('OMUSDT', 'Buy', 10, 1.0, timeout=4 * 3600, order_id='e1')
+    assert not operacion.terminada
+
+    cuenta.reconciliar()
+
+    assert operacion.resultado(timeout=1).estado == 'sin_ejecutar'
+
+
+def test_plazo_pendiente_corto():
+    cuenta, gestor = _gestor(plazo_pendiente=0.05)
+    operacion = gestor.abrir('OMUSDT', 'Buy', 10, 1.0, timeout=4 * 3600, order_id='e1')
+
+    assert operacion.resultado(timeout=2).estado == 'sin_ejecutar'
+    assert not gestor.activa('OMUSDT')
+
+
+def test_posicion_abierta_no_se_libera_por_el_plazo_pendiente():
+    cuenta, gestor = _gestor(plazo_pendiente=0.05)
+    operacion = gestor.abrir('OMUSDT', 'Buy', 10, 1.0, timeout=4 * 3600, order_id='e1')
+    cuenta._on_position({'data': [{'symbol': 'OMUSDT', 'positionIdx': 0, 'size': '10'}]})
+    assert operacion.estado == 'abierta'
+    time.sleep(0.1)
+    assert gestor.activa('OMUSDT')
+
+    cuenta._on_position({'data': [{'symbol': 'OMUSDT', 'positionIdx': 0, 'size': '0'}]})
+    assert operacion.resultado(timeout=1).estado == 'cerrada'
+
+
+def test_entrada_limit_en_reposo_sobrevive_al_plazo_pendiente():
+    cuenta, gestor = _gestor(plazo_pendiente=0.05)
+    operacion = gestor.abrir('OMUSDT', 'Buy', 10, 1.0, timeout=4 * 3600, order_id='e1')
+    cuenta._on_order({'data': [{'orderId': 'e1', 'symbol': 'OMUSDT', 'side': 'Buy',
+                                'orderStatus': 'New', 'cumExecQty': '0'}]})
+
+    # Varios plazos pendientes vencidos con la orden aún viva
+    time.sleep(0.3)
+    assert operacion.estado == 'pendiente'
+    assert gestor.activa('OMUSDT')
+
+    # Se ejecuta: la posición aparece y el plazo ya no aplica
+    cuenta._on_order({'data': [{'orderId': 'e1', 'symbol': 'OMUSDT', 'side': 'Buy',
+                                'orderStatus': 'Filled', 'cumExecQty': '10'}]})
+    cuenta._on_position({'data': [{'symbol': 'OMUSDT', 'positionIdx': 0, 'size': '10'}]})
+    time.sleep(0.1)
+    assert operacion.estado == 'abierta'
+    assert gestor.activa('OMUSDT')
+
+
+def test_entrada_limit_cancelada_tras_el_plazo_pendiente():
+    cuenta, gestor = _gestor(plazo_pendiente=0.05)
+    operacion = gestor.abrir('OMUSDT', 'Buy', 10, 1.0, timeout=4 * 3600, order_id='e1')
+    cuenta._on_order({'data': [{'orderId': 'e1', 'symbol': 'OMUSDT', 'side': 'Buy',
+                                'orderStatus': 'New', 'cumExecQty': '0'}]})
+    time.sleep(0.2)
+    assert gestor.activa('OMUSDT')
+
+    cuenta._on_order({'data': [{'orderId': 'e1', 'symbol': 'OMUSDT', 'side': 'Buy',
+                                'orderStatus': 'Cancelled', 'cumExecQty': '0'}]})
+    assert operacion.resultado(timeout=1).estado == 'rechazada'
@@ -0,0 +1,52 @@
+import time
+
+from backtest import ClienteSimulado, RelojSimulado
+from servidor_simulado import crear_mercados
+from registro_instrumentos import RegistroInstrumentos
+from flujo_velas import FlujoVelas
+from bot_mejorado4 import TradingBot
+import diario
+
+
+class DiarioEnMemoria:
+    def __init__(self):
+        self.registros = []
+
+    def anotar(self, registro):
+        self.registros.append(registro)
+
+
+def test_reproduccion_sin_divergencias_con_kline_entre_lecturas(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cliente = ClienteSimulado(RelojSimulado(time.time()), crear_mercados(['OMUSDT'], '5', horas=1))
+    registro = RegistroInstrumentos(cliente, ruta=None)
+    registro.cargar()
+    bot = TradingBot('OMUSDT', client=cliente, registro=registro)
+    bot.diario = DiarioEnMemoria()
+
+    # Flujo sin WebSocket: las klines se aplican a mano
+    bot.flujo = FlujoVelas(cliente, 'OMUSDT', '5')
+    bot.flujo.buffer.registrar(bot.bollinger)
+    bot.flujo.buffer.registrar(bot.atr)
+    bot.flujo.backfill()
+
+    # Una kline llega entre la copia de las velas y la lectura de los indicadores
+    precio_original = bot.mercado.precio
+
+    def precio_con_kline(symbol):
+        vela = bot.flujo.buffer.ultima()
+        cierre = vela.close * 1.03
+        bot.flujo.buffer.aplicar(vela._replace(high=max(vela.high, cierre), close=cierre))
+        return precio_original(symbol)
+
+    monkeypatch.setattr(bot.mercado, 'precio', precio_con_kline)
+    monkeypatch.setattr(bot, 'en_enfriamiento', lambda ahora: False)
+    monkeypatch.setattr(bot, 'gestionar_orden', lambda *args, **kwargs: None)
+    bot.ejecutar_estrategia()
+
+    assert len(bot.diario.registros) == 1
+    registrado = bot.diario.registros[0]
+    assert diario.velas(registrado)[-1, 4] == bot.flujo.buffer.ultima().close
+    total, divergencias = diario.reproducir(bot.diario.registros)
+    assert total == 1
+    assert divergencias == []
@@ -0,0 +1,46 @@
+import time
+
+from backtest import ClienteSimulado, RelojSimulado
+from servidor_simulado import crear_mercados
+from flujo_velas import FlujoVelas, Vela
+from indicadores import BollingerIncremental
+
+
+def _flujo():
+    cliente = ClienteSimulado(RelojSimulado(time.time()), crear_mercados(['OMUSDT'], '5', horas=1))
+    flujo = FlujoVelas(cliente, 'OMUSDT', '5')
+    bollinger = BollingerIncremental(20, 2)
+    flujo.buffer.registrar(bollinger)
+    flujo.backfill()
+    return flujo, bollinger
+
+
+def _siguiente(vela, cierre):
+    return Vela(vela.timestamp + 300000, vela.close, max(vela.close, cierre), min(vela.close, cierre),
+                cierre, 1.0, cierre)
+
+
+def test_datos_es_una_copia_que_no_cambia_con_el_websocket():
+    flujo, _ = _flujo()
+    datos = flujo.datos()
+    assert datos is not flujo.buffer.serie
+    cierres = datos['close'].copy()
+    ultima = flujo.buffer.ultima()
+
+    flujo.buffer.aplicar(_siguiente(ultima, ultima.close * 1.01))
+
+    assert (datos['close'] == cierres).all()
+    assert flujo.datos()['close'][-1] == ultima.close * 1.01
+
+
+def test_instantanea_de_bollinger_es_inmutable():
+    flujo, bollinger = _flujo()
+    with flujo.buffer.lock:
+        estado = bollinger.instantanea()
+    ultima = flujo.buffer.ultima()
+
+    flujo.buffer.aplicar(_siguiente(ultima, ultima.close * 1.05))
+
+    assert estado.cierre_anterior != bollinger.cierre_anterior
+    assert estado.actual != bollinger.actual
+    assert estado.anterior != bollinger.anterior
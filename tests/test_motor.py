@@ -0,0 +1,23 @@
+import time
+
+from backtest import ClienteSimulado, RelojSimulado
+from servidor_simulado import crear_mercados
+from motor import MotorMultisimbolo
+
+
+def test_bots_comparten_componentes_del_motor(tmp_path, monkeypatch):
+    # Cachés y directorios relativos (instrumentos, histórico) fuera del repositorio
+    monkeypatch.chdir(tmp_path)
+    simbolos = ['AAAUSDT', 'BBBUSDT', 'CCCUSDT']
+    cliente = ClienteSimulado(RelojSimulado(time.time()), crear_mercados(simbolos, '5', horas=1))
+    motor = MotorMultisimbolo(simbolos, client=cliente)
+
+    # La instantánea del motor aún no tiene tickers: vacía, y por tanto falsa
+    assert len(motor.mercado) == 0
+    assert set(motor.bots) == set(simbolos)
+    for bot in motor.bots.values():
+        assert bot.mercado is motor.mercado
+        assert bot.registro is motor.registro
+        assert bot.cuenta is motor.cuenta
+        assert bot.almacen is motor.almacen
+        assert bot.client is cliente
@@ -0,0 +1,29 @@
+import time
+
+from backtest import ClienteSimulado, RelojSimulado
+from servidor_simulado import crear_mercados
+from registro_instrumentos import RegistroInstrumentos
+from precision import Precision
+from bot_mejorado4 import TradingBot
+
+
+def _bot(tmp_path, monkeypatch, min_qty):
+    monkeypatch.chdir(tmp_path)
+    cliente = ClienteSimulado(RelojSimulado(time.time()), crear_mercados(['OMUSDT'], '5', horas=1),
+                              balance=100.0)
+    registro = RegistroInstrumentos(cliente, ruta=None)
+    registro.cargar()
+    bot = TradingBot('OMUSDT', client=cliente, registro=registro)
+    bot.precision = Precision(bot.espec._replace(qty_step=1.0, min_qty=min_qty))
+    return bot
+
+
+def test_size_posicion_por_debajo_del_minimo_devuelve_cero(tmp_path, monkeypatch):
+    # Riesgo de 1 USDT con 0.1 de distancia al stop: 10 pasos de qtyStep
+    bot = _bot(tmp_path, monkeypatch, min_qty=50.0)
+    assert bot.size_posicion(1.0, 0.9) == 0
+
+
+def test_size_posicion_en_el_minimo(tmp_path, monkeypatch):
+    bot = _bot(tmp_path, monkeypatch, min_qty=10.0)
+    assert bot.size_posicion(1.0, 0.9) == 10
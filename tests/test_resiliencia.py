@@ -0,0 +1,131 @@
+import random
+
+import pytest
+
+import resiliencia
+from resiliencia import Backoff, Interruptor, CircuitoAbierto, clasificar, TRANSITORIO, LIMITE, PERMANENTE
+
+
+class RelojFalso:
+    """Sustituye al módulo time en resiliencia: monotonic() solo avanza a mano"""
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def monotonic(self):
+        return self.ahora
+
+    def avanzar(self, segundos):
+        self.ahora += segundos
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = RelojFalso()
+    monkeypatch.setattr(resiliencia, 'time', reloj)
+    return reloj
+
+
+def _abrir(interruptor):
+    for _ in range(interruptor.umbral):
+        assert interruptor.permitir()
+        interruptor.fallo()
+
+
+def test_se_abre_tras_umbral_de_fallos_seguidos(reloj):
+    interruptor = Interruptor(umbral=3, enfriamiento=2.0)
+    interruptor.fallo()
+    interruptor.fallo()
+    assert interruptor.cerrado
+    interruptor.exito()  # Un éxito reinicia la cuenta
+    interruptor.fallo()
+    interruptor.fallo()
+    assert interruptor.cerrado
+
+    interruptor.fallo()
+    assert interruptor.estado == Interruptor.ABIERTO
+    assert not interruptor.permitir()
+    assert interruptor.espera() == pytest.approx(2.0)
+    reloj.avanzar(1.5)
+    assert not interruptor.permitir()
+    assert interruptor.espera() == pytest.approx(0.5)
+
+
+def test_semiabierto_deja_pasar_una_unica_sonda(reloj):
+    interruptor = Interruptor(umbral=2, enfriamiento=2.0)
+    _abrir(interruptor)
+    reloj.avanzar(2.0)
+
+    assert interruptor.permitir()
+    assert interruptor.estado == Interruptor.SEMIABIERTO
+    assert not interruptor.permitir()
+    assert not interruptor.permitir()
+
+    # Sonda sin veredicto (cancelada): puede salir otra
+    interruptor.liberar_sonda()
+    assert interruptor.permitir()
+    assert not interruptor.permitir()
+
+    interruptor.exito()
+    assert interruptor.cerrado
+    assert interruptor.permitir() and interruptor.permitir()
+    assert interruptor.espera() == 0.0
+
+
+def test_sonda_fallida_dobla_el_enfriamiento_hasta_el_maximo(reloj):
+    interruptor = Interruptor(umbral=1, enfriamiento=2.0, enfriamiento_max=5.0)
+    _abrir(interruptor)
+
+    reloj.avanzar(2.0)
+    assert interruptor.permitir()
+    interruptor.fallo()
+    assert interruptor.estado == Interruptor.ABIERTO
+    assert interruptor.espera() == pytest.approx(4.0)
+
+    reloj.avanzar(4.0)
+    assert interruptor.permitir()
+    interruptor.fallo()
+    assert interruptor.espera() == pytest.approx(5.0)
+
+    # Al cerrarse vuelve al enfriamiento inicial
+    reloj.avanzar(5.0)
+    assert interruptor.permitir()
+    interruptor.exito()
+    _abrir(interruptor)
+    assert interruptor.espera() == pytest.approx(2.0)
+
+
+def test_backoff_con_jitter_entre_la_mitad_y_el_techo(monkeypatch):
+    monkeypatch.setattr(resiliencia, 'random', random.Random(7))
+    backoff = Backoff(base=0.5, maximo=3.0)
+    techos = [0.5, 1.0, 2.0, 3.0, 3.0]
+    for _ in range(200):
+        backoff.reiniciar('kline')
+        for techo in techos:
+            espera = backoff.siguiente('kline')
+            assert techo / 2 <= espera <= techo
+
+    # Contador por clave y reinicio
+    backoff.reiniciar('kline')
+    backoff.siguiente('kline')
+    backoff.siguiente('kline')
+    assert backoff.siguiente('tickers') <= 0.5
+    backoff.reiniciar('kline')
+    assert backoff.siguiente('kline') <= 0.5
+
+
+def test_clasificar_respuestas():
+    assert clasificar(respuesta={'retCode': 10016, 'retMsg': 'Internal System Error.'}) == TRANSITORIO
+    assert clasificar(respuesta={'retCode': 10006, 'retMsg': 'Too many visits!'}) == LIMITE
+    assert clasificar(respuesta={'retCode': 10018}) == LIMITE
+    assert clasificar(respuesta={'retCode': 110007, 'retMsg': 'ab not enough for new order'}) == PERMANENTE
+    assert clasificar(respuesta={'retCode': 10001}) == PERMANENTE
+
+
+def test_clasificar_excepciones():
+    assert clasificar(TimeoutError()) == TRANSITORIO
+    assert clasificar(ConnectionError('reset')) == TRANSITORIO
+    assert clasificar(CircuitoAbierto(1.0)) == TRANSITORIO
+    assert clasificar(Exception('Read timed out')) == TRANSITORIO
+    assert clasificar(Exception('Too many visits! (ErrCode: 10006)')) == LIMITE
+    assert clasificar(Exception('Qty invalid (ErrCode: 10001)')) == PERMANENTE
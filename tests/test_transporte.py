@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from servidor_simulado import ServidorSimulado, LimitesPeticiones, crear_mercados
+from transporte import ClienteHTTP, ErrorTransporte, REINTENTOS, REINTENTOS_LIMITE
+from resiliencia import Backoff, Interruptor
+
+CLAVE = 'clave-prueba'
+SECRETO = 'secreto-prueba'
+SIMBOLO = 'SIMUSDT'
+
+
+class AzarFallo:
+    """Sustituto de random.Random del servidor: inyecta siempre un HTTP 502"""
+
+    def random(self):
+        return 0.0
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorSimulado(crear_mercados([SIMBOLO], '5', horas=1), api_key=CLAVE, api_secret=SECRETO)
+    servidor.iniciar(puerto=0)
+    yield servidor
+    servidor.detener()
+
+
+@pytest.fixture
+def cliente(servidor):
+    # Interruptor propio (el global lo comparten los bots) y esperas cortas entre reintentos
+    cliente = ClienteHTTP(CLAVE, SECRETO, url=servidor.url, interruptor=Interruptor(umbral=100))
+    cliente.transporte.backoff = Backoff(base=0.01, maximo=0.05)
+    yield cliente
+    cliente.cerrar()
+
+
+def test_peticiones_firmadas_aceptadas_por_el_servidor(servidor, cliente):
+    assert cliente.get_wallet_balance(accountType='UNIFIED')['retCode'] == 0
+    # POST: la firma cubre el cuerpo JSON tal cual se envía
+    respuesta = cliente.place_order(category='linear', symbol=SIMBOLO, side='Buy', orderType='Market', qty=1.0)
+    assert respuesta['retCode'] == 0, respuesta
+    assert 'rechazo.firma' not in servidor.resumen()
+
+
+def test_firma_con_otro_secreto_rechazada_sin_reintentos(servidor):
+    cliente = ClienteHTTP(CLAVE, 'otro-secreto', url=servidor.url, interruptor=Interruptor(umbral=100))
+    try:
+        assert cliente.get_wallet_balance(accountType='UNIFIED')['retCode'] == 10004
+    finally:
+        cliente.cerrar()
+    resumen = servidor.resumen()
+    assert resumen['rechazo.firma'] == 1
+    assert resumen['rest.get_wallet_balance'] == 1
+
+
+def test_get_en_la_query_y_post_en_cuerpo_json(servidor, cliente):
+    transporte = cliente.transporte
+    endpoint, url, cuerpo, cabeceras = transporte.preparar(
+        'get_positions', {'category': 'linear', 'symbol': SIMBOLO, 'cursor': None, 'limit': 5})
+    assert endpoint.metodo == 'GET'
+    assert url == f"{servidor.url}/v5/position/list?category=linear&symbol={SIMBOLO}&limit=5"
+    assert cuerpo is None
+    assert 'X-BAPI-SIGN' in cabeceras
+
+    endpoint, url, cuerpo, cabeceras = transporte.preparar(
+        'place_order', {'category': 'linear', 'symbol': SIMBOLO, 'side': 'Buy', 'orderType': 'Market',
+                        'qty': 0.5, 'price': None, 'reduceOnly': True})
+    assert endpoint.metodo == 'POST'
+    assert url == f"{servidor.url}/v5/order/create"
+    # Números de CAMPOS_TEXTO como texto, booleanos JSON y sin los None
+    assert json.loads(cuerpo) == {'category': 'linear', 'symbol': SIMBOLO, 'side': 'Buy',
+                                  'orderType': 'Market', 'qty': '0.5', 'reduceOnly': True}
+
+    # Los parámetros de la query llegan al servidor (limit se respeta)
+    velas = cliente.get_kline(category='linear', symbol=SIMBOLO, interval='5', limit=3)
+    assert velas['retCode'] == 0
+    assert len(velas['result']['list']) == 3
+
+
+def test_502_reintenta_lecturas_y_no_ordenes(servidor, cliente):
+    servidor.errores = 1.0
+    servidor.azar = AzarFallo()
+
+    with pytest.raises(ErrorTransporte, match='HTTP 502'):
+        cliente.get_wallet_balance(accountType='UNIFIED')
+    # Una orden podría haberse ejecutado: nunca se reenvía
+    with pytest.raises(ErrorTransporte, match='HTTP 502'):
+        cliente.place_order(category='linear', symbol=SIMBOLO, side='Buy', orderType='Market', qty=1.0)
+
+    resumen = servidor.resumen()
+    assert resumen['rest.get_wallet_balance'] == 1 + REINTENTOS
+    assert resumen['rest.place_order'] == 1
+
+
+def test_limite_superado_pausa_el_planificador(servidor, cliente):
+    # Límite 0: cada petición a este endpoint responde retCode 10006 con X-Bapi-Limit-*
+    servidor.limites = LimitesPeticiones({'get_wallet_balance': (0, 0)})
+    avisos = []
+    planificador = cliente.transporte.planificador
+    original = planificador.limite_superado
+
+    def limite_superado(nombre, cabeceras):
+        avisos.append((nombre, cabeceras.get('X-Bapi-Limit-Reset-Timestamp')))
+        original(nombre, cabeceras)
+
+    planificador.limite_superado = limite_superado
+
+    respuesta = cliente.get_wallet_balance(accountType='UNIFIED')
+
+    assert respuesta['retCode'] == 10006
+    assert len(avisos) == REINTENTOS_LIMITE
+    assert all(nombre == 'get_wallet_balance' and reinicio for nombre, reinicio in avisos)
+    assert servidor.resumen()['rest.get_wallet_balance'] == 1 + REINTENTOS_LIMITE
+    # La petición limitada no cuenta como fallo de la API
+    assert cliente.transporte.interruptor.cerrado
@@ -0,0 +1,276 @@
+"""Transporte HTTP asíncrono para la API v5 de Bybit
+
+Una única aiohttp.ClientSession con conexiones keep-alive vive en un bucle
+asyncio propio (hilo de fondo), así que las conexiones TLS se reutilizan entre
+llamadas y entre bots. TransporteAsync.solicitar es una corrutina y permite
+tener muchas peticiones en vuelo, con el ritmo y las prioridades que marca el
+Planificador; ClienteHTTP expone los mismos métodos de
+pybit HTTP que usan los bots y sustituye al cliente sin cambiar las llamadas.
+"""
+from collections import namedtuple
+from urllib.parse import urlencode
+import threading
+import asyncio
+import hashlib
+import logging
+import hmac
+import json
+import time
+
+import aiohttp
+from yarl import URL
+
+from planificador import Planificador
+from resiliencia import Backoff, CircuitoAbierto, clasificar, interruptor_api, TRANSITORIO, LIMITE
+from metricas import metricas
+
+URL_PRINCIPAL = 'https://api.bybit.com'
+URL_TESTNET = 'https://api-testnet.bybit.com'
+RECV_WINDOW = 5000
+MAX_CONEXIONES = 16   # Conexiones keep-alive abiertas con el host (= plazas del planificador)
+KEEPALIVE = 60        # Segundos que una conexión ociosa sigue abierta
+REINTENTOS_LIMITE = 2  # Reintentos tras una respuesta de límite superado
+REINTENTOS = 3         # Reintentos de lecturas ante errores transitorios
+
+# Segundos de espera por grupo de endpoints: las órdenes no deben quedarse colgadas
+TIMEOUTS = {'mercado': 5, 'cuenta': 10, 'orden': 5}
+
+Endpoint = namedtuple('Endpoint', ['metodo', 'ruta', 'firmado', 'grupo'])
+
+ENDPOINTS = {
+    'get_kline': Endpoint('GET', '/v5/market/kline', False, 'mercado'),
+    'get_tickers': Endpoint('GET', '/v5/market/tickers', False, 'mercado'),
+    'get_instruments_info': Endpoint('GET', '/v5/market/instruments-info', False, 'mercado'),
+    'get_server_time': Endpoint('GET', '/v5/market/time', False, 'mercado'),
+    'get_wallet_balance': Endpoint('GET', '/v5/account/wallet-balance', True, 'cuenta'),
+    'get_positions': Endpoint('GET', '/v5/position/list', True, 'cuenta'),
+    'get_open_orders': Endpoint('GET', '/v5/order/realtime', True, 'cuenta'),
+    'get_executions': Endpoint('GET', '/v5/execution/list', True, 'cuenta'),
+    'place_order': Endpoint('POST', '/v5/order/create', True, 'orden'),
+    'amend_order': Endpoint('POST', '/v5/order/amend', True, 'orden'),
+    'cancel_order': Endpoint('POST', '/v5/order/cancel', True, 'orden'),
+    'cancel_all_orders': Endpoint('POST', '/v5/order/cancel-all', True, 'orden'),
+    'set_trading_stop': Endpoint('POST', '/v5/position/trading-stop', True, 'orden'),
+    'set_leverage': Endpoint('POST', '/v5/position/set-leverage', True, 'orden'),
+}
+
+# Campos que la API v5 espera como texto aunque se pasen como número (igual que pybit)
+CAMPOS_TEXTO = {
+    'qty', 'price', 'triggerPrice', 'takeProfit', 'stopLoss', 'tpLimitPrice', 'slLimitPrice',
+    'tpTriggerPrice', 'slTriggerPrice', 'trailingStop', 'activePrice', 'tpSize', 'slSize',
+    'buyLeverage', 'sellLeverage'
+}
+
+
+class ErrorTransporte(ConnectionError):
+    """Fallo de red, timeout o respuesta no JSON (los retCode de la API se devuelven tal cual)"""
+
+
+def _valor_query(valor):
+    if isinstance(valor, bool):
+        return 'true' if valor else 'false'
+    return valor
+
+
+def _cuerpo(params):
+    return {k: (str(v) if k in CAMPOS_TEXTO and not isinstance(v, str) else v) for k, v in params.items()}
+
+
+class TransporteAsync:
+    """Sesión aiohttp compartida, firmada con HMAC v5, en un bucle asyncio de fondo"""
+
+    def __init__(self, api_key='', api_secret='', testnet=False, recv_window=RECV_WINDOW,
+                 timeouts=None, max_conexiones=MAX_CONEXIONES, planificador=None, interruptor=None, url=None):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        # url: otro host con la misma API (p. ej. servidor_simulado.py)
+        self.url = url or (URL_TESTNET if testnet else URL_PRINCIPAL)
+        self.recv_window = str(recv_window)
+        self.timeouts = {**TIMEOUTS, **(timeouts or {})}
+        self.max_conexiones = max_conexiones
+        # Nunca hay más peticiones en vuelo que conexiones: la cola del conector
+        # es FIFO y las órdenes quedarían detrás de las peticiones de mercado
+        self.planificador = planificador or Planificador(max_conexiones)
+        self.interruptor = interruptor or interruptor_api
+        self.backoff = Backoff()
+        self.loop = None
+        self.hilo = None
+        self.session = None
+        self.lock = threading.Lock()
+
+    def iniciar(self):
+        """Arrancar el bucle y la sesión (idempotente; se llama sola en la primera petición)"""
+        with self.lock:
+            if self.loop is not None:
+                return
+            self.loop = asyncio.new_event_loop()
+            self.hilo = threading.Thread(target=self.loop.run_forever, name='transporte-http', daemon=True)
+            self.hilo.start()
+            asyncio.run_coroutine_threadsafe(self._crear_sesion(), self.loop).result()
+
+    async def _crear_sesion(self):
+        conector = aiohttp.TCPConnector(
+            limit=self.max_conexiones,
+            limit_per_host=self.max_conexiones,
+            keepalive_timeout=KEEPALIVE,
+            ttl_dns_cache=300
+        )
+        self.session = aiohttp.ClientSession(connector=conector)
+
+    def cerrar(self):
+        with self.lock:
+            if self.loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self.session.close(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.hilo.join(timeout=5)
+            self.loop.close()
+            self.loop = self.hilo = self.session = None
+
+    def _firmar(self, carga):
+        timestamp = str(int(time.time() * 1000))
+        mensaje = timestamp + self.api_key + self.recv_window + carga
+        firma = hmac.new(self.api_secret.encode(), mensaje.encode(), hashlib.sha256).hexdigest()
+        return {
+            'X-BAPI-API-KEY': self.api_key,
+            'X-BAPI-TIMESTAMP': timestamp,
+            'X-BAPI-RECV-WINDOW': self.recv_window,
+            'X-BAPI-SIGN': firma,
+            'X-BAPI-SIGN-TYPE': '2'
+        }
+
+    def preparar(self, nombre, params):
+        """URL, cuerpo y cabeceras de una llamada; la firma usa exactamente lo que se envía"""
+        endpoint = ENDPOINTS[nombre]
+        params = {k: v for k, v in params.items() if v is not None}
+        if endpoint.metodo == 'GET':
+            carga = urlencode({k: _valor_query(v) for k, v in params.items()})
+            url = self.url + endpoint.ruta + ('?' + carga if carga else '')
+            cuerpo = None
+        else:
+            carga = json.dumps(_cuerpo(params), separators=(',', ':'))
+            url = self.url + endpoint.ruta
+            cuerpo = carga
+
+        cabeceras = {'Content-Type': 'application/json'}
+        if endpoint.firmado:
+            cabeceras.update(self._firmar(carga))
+        return endpoint, url, cuerpo, cabeceras
+
+    async def solicitar(self, nombre, **params):
+        """Corrutina: respuesta JSON de la API como dict (mismo formato que pybit)
+
+        Las lecturas (GET) se reintentan con backoff ante errores transitorios;
+        las órdenes no, porque podrían haberse ejecutado. Si la API responde que
+        se superó el límite de frecuencia la petición no se ejecutó: se espera al
+        reinicio de la cubeta y se reintenta. Con el circuito abierto se falla
+        al instante con CircuitoAbierto.
+        """
+        reintentable = ENDPOINTS[nombre].metodo == 'GET'
+        intentos = intentos_limite = 0
+        while True:
+            if not self.interruptor.permitir():
+                raise CircuitoAbierto(self.interruptor.espera())
+            try:
+                datos, cabeceras = await self._solicitar_una(nombre, params)
+            except ErrorTransporte as e:
+                self.interruptor.fallo()
+                # Con el circuito ya abierto no se insiste: el resto de llamadas falla rápido
+                if not reintentable or intentos >= REINTENTOS or not self.interruptor.cerrado:
+                    raise
+                intentos += 1
+                espera = self.backoff.siguiente(nombre)
+                logging.warning(f"{str(e)}; reintento {intentos} en {espera:.2f}s")
+                await asyncio.sleep(espera)
+                continue
+            except BaseException:
+                self.interruptor.liberar_sonda()
+                raise
+
+            categoria = clasificar(respuesta=datos) if datos.get('retCode', 0) != 0 else None
+            if categoria == TRANSITORIO:
+                self.interruptor.fallo()
+                if reintentable and intentos < REINTENTOS and self.interruptor.cerrado:
+                    intentos += 1
+                    await asyncio.sleep(self.backoff.siguiente(nombre))
+                    continue
+                return datos
+
+            # Cualquier otra respuesta demuestra que la API está viva
+            self.interruptor.exito()
+            self.backoff.reiniciar(nombre)
+            if categoria == LIMITE and intentos_limite < REINTENTOS_LIMITE:
+                intentos_limite += 1
+                self.planificador.limite_superado(nombre, cabeceras)
+                continue
+            return datos
+
+    async def _solicitar_una(self, nombre, params):
+        # Latencias separadas: espera de turno en el planificador y petición HTTP
+        marca = metricas.marca()
+        async with self.planificador.turno(nombre):
+            metricas.desde(f"cola.{nombre}", marca)
+            # Se firma al obtener turno para que el timestamp no envejezca esperando
+            endpoint, url, cuerpo, cabeceras = self.preparar(nombre, params)
+            espera = self.timeouts[endpoint.grupo]
+            marca = metricas.marca()
+            try:
+                async with self.session.request(
+                    endpoint.metodo,
+                    URL(url, encoded=True),
+                    data=cuerpo,
+                    headers=cabeceras,
+                    timeout=aiohttp.ClientTimeout(total=espera)
+                ) as respuesta:
+                    self.planificador.registrar(nombre, respuesta.headers)
+                    if respuesta.status == 403:
+                        # Bloqueo por IP: la respuesta no es JSON
+                        self.planificador.limite_superado(nombre, respuesta.headers)
+                    try:
+                        return await respuesta.json(content_type=None), respuesta.headers
+                    except ValueError:
+                        texto = await respuesta.text()
+                        raise ErrorTransporte(f"{nombre}: HTTP {respuesta.status} {texto[:200]}")
+            except asyncio.TimeoutError:
+                raise ErrorTransporte(f"{nombre}: sin respuesta en {espera}s")
+            except aiohttp.ClientError as e:
+                raise ErrorTransporte(f"{nombre}: {type(e).__name__} {str(e)}")
+            finally:
+                metricas.desde(f"api.{nombre}", marca)
+
+    def enviar(self, nombre, **params):
+        """Lanzar una llamada desde código síncrono; devuelve un concurrent.futures.Future"""
+        if self.loop is None:
+            self.iniciar()
+        return asyncio.run_coroutine_threadsafe(self.solicitar(nombre, **params), self.loop)
+
+
+class ClienteHTTP:
+    """Fachada síncrona con la interfaz de pybit HTTP sobre un TransporteAsync
+
+    Varios ClienteHTTP (o varios bots) pueden compartir el mismo transporte.
+    Para lanzar varias llamadas a la vez sin esperar cada una, usar
+    cliente.transporte.enviar(...) y recoger los futures.
+    """
+
+    def __init__(self, api_key='', api_secret='', testnet=False, transporte=None, **opciones):
+        self.transporte = transporte or TransporteAsync(api_key, api_secret, testnet, **opciones)
+
+    def _llamar(self, nombre, params):
+        return self.transporte.enviar(nombre, **params).result()
+
+    def cerrar(self):
+        self.transporte.cerrar()
+
+
+def _metodo(nombre):
+    def llamada(self, **params):
+        return self._llamar(nombre, params)
+    llamada.__name__ = nombre
+    llamada.__doc__ = f"{ENDPOINTS[nombre].metodo} {ENDPOINTS[nombre].ruta}"
+    return llamada
+
+
+for _nombre in ENDPOINTS:
+    setattr(ClienteHTTP, _nombre, _metodo(_nombre))
+del _nombre